@@ -0,0 +1,175 @@
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import gspread
+import requests
+from googleapiclient.errors import HttpError
+
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Per-minute quotas of the service account (Google's published per-user limits) and bucket sizes.
+# Buckets hold a quarter of a minute's quota, so a burst can't use up a whole minute at once.
+QUOTAS = {
+    "sheets_read": (60, 15),
+    "sheets_write": (60, 15),
+    "drive": (12000, 1000),
+}
+
+# Priority classes: interactive calls (a user waiting on a page) go before background work
+INTERACTIVE = 0
+BACKGROUND = 1
+
+# Share of each bucket that only interactive calls may use
+INTERACTIVE_RESERVE = 0.25
+
+# Retries of throttled (429) and failed (5xx) calls, with jittered exponential backoff
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 1
+MAX_BACKOFF_SECONDS = 32
+SERVER_ERROR_STATUSES = (500, 502, 503, 504)
+
+_context = threading.local()
+
+
+def current_priority():
+    return getattr(_context, "priority", INTERACTIVE)
+
+
+@contextmanager
+def background():
+    """Marks the API calls made by this thread inside the block as background work."""
+    previous = current_priority()
+    _context.priority = BACKGROUND
+    try:
+        yield
+    finally:
+        _context.priority = previous
+
+
+def error_status(error):
+    """HTTP status of a Sheets, Drive or requests error, or None."""
+    if isinstance(error, gspread.exceptions.APIError):
+        return error.code
+    if isinstance(error, HttpError):
+        return error.resp.status
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code
+    return None
+
+
+class TokenBucket:
+    """Token bucket refilled at a per-minute rate, where background callers leave a reserve for interactive ones."""
+
+    def __init__(self, per_minute, capacity):
+        self.rate = per_minute / 60
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._interactive_waiting = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority=INTERACTIVE, cost=1):
+        """Blocks until `cost` tokens can be taken at `priority`; returns the seconds spent waiting."""
+        cost = min(cost, self.capacity)
+        started = time.monotonic()
+        with self._cond:
+            interactive = priority == INTERACTIVE
+            if interactive:
+                self._interactive_waiting += 1
+            try:
+                while True:
+                    self._refill()
+                    needed = cost if interactive else cost + self.capacity * INTERACTIVE_RESERVE
+                    if self.tokens >= needed and (interactive or not self._interactive_waiting):
+                        self.tokens -= cost
+                        return time.monotonic() - started
+                    self._cond.wait(max((needed - self.tokens) / self.rate, 0.05))
+            finally:
+                if interactive:
+                    self._interactive_waiting -= 1
+                    self._cond.notify_all()
+
+    def drain(self):
+        """Empties the bucket after the server said we are over quota."""
+        with self._cond:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0)
+
+
+class ApiGateway:
+    """Single choke point for Sheets and Drive calls.
+
+    Every call takes a token from its API's bucket first, so sustained throughput stays at
+    the quota instead of bursting into 429s and stalling. Background work (outbox flushes,
+    mirror syncs) waits while interactive calls need the tokens. 429s are retried with
+    jittered exponential backoff and drain the bucket; 5xx errors are retried only for
+    idempotent calls, since e.g. an append may have been applied before the error.
+    """
+
+    def __init__(self, quotas=QUOTAS):
+        self.buckets = {api: TokenBucket(per_minute, capacity) for api, (per_minute, capacity) in quotas.items()}
+        self._lock = threading.Lock()
+        self._metrics = {api: Counter() for api in quotas}
+
+    def _count(self, api, **increments):
+        with self._lock:
+            self._metrics[api].update(increments)
+
+    def reserve(self, api, priority=None, cost=1):
+        """Waits for and takes the quota of one call ahead of making it; the call then passes reserved=True.
+
+        Lets a caller wait for quota before taking a lock that it makes the call under.
+        """
+        priority = current_priority() if priority is None else priority
+        waited = self.buckets[api].acquire(priority, cost)
+        self._count(api, calls=1, throttle_wait_seconds=waited, throttled=int(waited > 0.001))
+
+    def call(self, api, func, idempotent=True, priority=None, cost=1, max_retries=MAX_RETRIES, name=None, reserved=False):
+        """Runs func() against `api`'s quota, retrying throttled and failed calls.
+
+        Each attempt is traced as `name` (default: the API), with the row count of list results.
+        """
+        bucket = self.buckets[api]
+        priority = current_priority() if priority is None else priority
+        for attempt in range(max_retries + 1):
+            if not (reserved and attempt == 0):
+                self.reserve(api, priority, cost)
+            try:
+                with span(name or api) as s:
+                    result = func()
+                    s.rows = len(result) if isinstance(result, list) else 0
+                return result
+            except Exception as e:
+                status = error_status(e)
+                retryable = status == 429 or (idempotent and status in SERVER_ERROR_STATUSES)
+                if not retryable or attempt == max_retries:
+                    self._count(api, errors=1)
+                    raise
+                if status == 429:
+                    bucket.drain()
+                    self._count(api, rate_limited=1)
+                self._count(api, retries=1)
+                delay = min(BACKOFF_BASE_SECONDS * 2 ** attempt, MAX_BACKOFF_SECONDS) * random.uniform(0.5, 1.5)
+                logger.info("%s call failed with %s, retrying in %.1fs", api, status, delay)
+                time.sleep(delay)
+
+    def stats(self):
+        """Counters per API: calls, retries, rate_limited, errors, throttled and throttle_wait_seconds."""
+        with self._lock:
+            stats = {api: dict(counter) for api, counter in self._metrics.items()}
+        for api, bucket in self.buckets.items():
+            with bucket._cond:
+                bucket._refill()
+                stats[api]["tokens_available"] = round(bucket.tokens, 2)
+        return stats
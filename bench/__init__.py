@@ -0,0 +1 @@
+"""Offline benchmarks of the app's slow paths, run against in-process fakes of the Google and mail services."""
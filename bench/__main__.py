@@ -0,0 +1,133 @@
+"""Runs the offline benchmark suite and writes the results as JSON.
+
+    python -m bench --out before.json
+    python -m bench --scenarios view_reports --sizes view_reports=1000,50000 --latency sheets=0.3
+    python -m bench --latency drive=0.4 --errors drive=0.05:503 --out slow-drive.json
+    python -m bench.compare before.json after.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.fakes import SERVICES
+from bench.scenarios import DEFAULT_SIZES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def service_values(pairs, option, parse=float):
+    """{service: value} from SERVICE=VALUE arguments."""
+    values = {}
+    for pair in pairs or []:
+        service, _, value = pair.partition("=")
+        if service not in SERVICES or not value:
+            raise SystemExit(f"{option} expects SERVICE=VALUE with SERVICE one of {', '.join(SERVICES)}, got {pair!r}")
+        values[service] = parse(value)
+    return values
+
+
+def fault_config(args):
+    faults = {service: {} for service in SERVICES}
+    for service, value in service_values(args.latency, "--latency").items():
+        faults[service]["latency"] = value
+    for service, value in service_values(args.jitter, "--jitter").items():
+        faults[service]["jitter"] = value
+    for service, value in service_values(args.bandwidth, "--bandwidth").items():
+        faults[service]["bytes_per_second"] = value
+    for service, (rate, status) in service_values(args.errors, "--errors", lambda v: v.partition(":")[::2]).items():
+        faults[service]["error_rate"] = float(rate)
+        if status:
+            faults[service]["error_status"] = int(status)
+    return faults
+
+
+def git_revision():
+    def git(*command):
+        return subprocess.run(["git", *command], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def run_case(config):
+    """Runs one case in a fresh interpreter and returns its result (or the error it died with)."""
+    with tempfile.TemporaryDirectory(prefix="raf_bench_result_") as tmp:
+        result_path = os.path.join(tmp, "result.json")
+        started = time.perf_counter()
+        process = subprocess.run([sys.executable, "-m", "bench.scenarios", json.dumps(config), result_path],
+                                 cwd=ROOT, capture_output=True, text=True, timeout=config["timeout"] * 4)
+        if process.returncode == 0 and os.path.exists(result_path):
+            with open(result_path) as result_file:
+                result = json.load(result_file)
+        else:
+            result = {"scenario": config["scenario"], "size": config["size"],
+                      "failed": process.stderr.strip().splitlines()[-20:] or [f"exit code {process.returncode}"]}
+        result["process_seconds"] = round(time.perf_counter() - started, 3)
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks of the RAF app against in-process fakes of Sheets, Drive, image hosting and SMTP.")
+    parser.add_argument("--scenarios", default=",".join(DEFAULT_SIZES), help="comma-separated scenarios (default: all)")
+    parser.add_argument("--sizes", action="append", metavar="SCENARIO=N,N", help="data sizes to sweep for a scenario")
+    parser.add_argument("--repeat", type=int, default=5, help="warm reruns timed per case (default: 5)")
+    parser.add_argument("--latency", action="append", metavar="SERVICE=SECONDS", help=f"added latency per call; services: {', '.join(SERVICES)}")
+    parser.add_argument("--jitter", action="append", metavar="SERVICE=SECONDS", help="random extra latency of up to SECONDS per call")
+    parser.add_argument("--bandwidth", action="append", metavar="SERVICE=BYTES_PER_SECOND", help="transfer speed of uploads and downloads")
+    parser.add_argument("--errors", action="append", metavar="SERVICE=RATE[:STATUS]", help="share of calls that fail, with the HTTP status (SMTP code for smtp)")
+    parser.add_argument("--keep-rate-limits", action="store_true", help="keep the app's API quotas and mail rate limit instead of lifting them")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the injected jitter and errors")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds allowed for one page run or background wait")
+    parser.add_argument("--out", help="write the JSON results here instead of to stdout")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in scenarios if name not in DEFAULT_SIZES]
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(unknown)} (known: {', '.join(DEFAULT_SIZES)})")
+    sizes = dict(DEFAULT_SIZES)
+    for pair in args.sizes or []:
+        name, _, values = pair.partition("=")
+        if name not in DEFAULT_SIZES:
+            raise SystemExit(f"--sizes: unknown scenario {name!r}")
+        sizes[name] = [int(v) for v in values.split(",") if v]
+
+    faults = fault_config(args)
+    results = []
+    for scenario in scenarios:
+        for size in sizes[scenario]:
+            config = {"scenario": scenario, "size": size, "repeat": args.repeat, "faults": faults, "seed": args.seed,
+                      "keep_rate_limits": args.keep_rate_limits, "timeout": args.timeout}
+            print(f"{scenario} size={size} ...", file=sys.stderr, flush=True)
+            result = run_case(config)
+            results.append(result)
+            summary = ", ".join(f"{name} {value * 1000:.1f} ms" for name, value in result.get("seconds", {}).items())
+            print(f"  {summary or 'FAILED: ' + ' | '.join(result['failed'][-1:])}", file=sys.stderr, flush=True)
+
+    output = {
+        "meta": {
+            **git_revision(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "faults": faults,
+            "keep_rate_limits": args.keep_rate_limits,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    text = json.dumps(output, indent=2)
+    if args.out:
+        with open(args.out, "w") as out_file:
+            out_file.write(text + "\n")
+    else:
+        print(text)
+    return 1 if any("failed" in result for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
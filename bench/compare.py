@@ -0,0 +1,56 @@
+"""Compares two benchmark result files, e.g. from before and after a change.
+
+    python -m bench.compare before.json after.json --threshold 0.2
+
+Prints every timing side by side and exits with status 1 if any got slower by more
+than the threshold (and by more than --min-delta, so sub-millisecond noise is ignored).
+"""
+import argparse
+import json
+import sys
+
+
+def timings(path):
+    with open(path) as results_file:
+        data = json.load(results_file)
+    values = {}
+    for result in data["results"]:
+        for name, seconds in result.get("seconds", {}).items():
+            values[(result["scenario"], result["size"], name)] = seconds
+    return data["meta"], values
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown counted as a regression (default: 0.2)")
+    parser.add_argument("--min-delta", type=float, default=0.005, help="seconds a slowdown must exceed as well (default: 0.005)")
+    args = parser.parse_args()
+
+    before_meta, before = timings(args.before)
+    after_meta, after = timings(args.after)
+    print(f"before: {(before_meta.get('commit') or 'unknown')[:12]}  after: {(after_meta.get('commit') or 'unknown')[:12]}")
+    print(f"{'scenario':<18}{'size':>7}  {'timing':<14}{'before ms':>11}{'after ms':>11}{'change':>13}")
+
+    regressions = 0
+    for key in sorted(set(before) | set(after), key=lambda k: (k[0], k[1], k[2])):
+        old, new = before.get(key), after.get(key)
+        if old is None or new is None:
+            change = "only " + ("after" if old is None else "before")
+        else:
+            ratio = (new - old) / old if old else 0.0
+            change = f"{ratio:+.0%}"
+            if ratio > args.threshold and new - old > args.min_delta:
+                change += " !"
+                regressions += 1
+        fmt = lambda value: "-" if value is None else f"{value * 1000:.1f}"
+        print(f"{key[0]:<18}{key[1]:>7}  {key[2]:<14}{fmt(old):>11}{fmt(new):>11}{change:>13}")
+
+    if regressions:
+        print(f"{regressions} timings regressed by more than {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,450 @@
+"""In-process stand-ins for Google Sheets, Google Drive, image hosting and SMTP.
+
+Each fake answers the calls the app makes with the same shapes the real client
+libraries return, after sleeping for a configurable latency, and fails a
+configurable share of calls with the error the real service would raise. They
+are installed with `install(backend)` before the app is imported.
+"""
+import io
+import itertools
+import json
+import random
+import re
+import smtplib
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+import gspread
+import httplib2
+import requests
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaUploadProgress
+from gspread.utils import a1_to_rowcol
+from PIL import Image
+from requests.adapters import HTTPAdapter
+
+SERVICES = ("sheets", "drive", "images", "smtp")
+
+# Status each service fails with by default when errors are injected
+DEFAULT_ERROR_STATUS = {"sheets": 503, "drive": 503, "images": 503, "smtp": 451}
+
+
+@dataclass
+class Faults:
+    """Latency and errors injected into one fake service."""
+
+    latency: float = 0.0  # seconds per call
+    jitter: float = 0.0  # up to this many seconds added at random
+    error_rate: float = 0.0  # share of calls that fail
+    error_status: int = None  # HTTP status (SMTP reply code for smtp) of the failures
+    bytes_per_second: float = 0.0  # transfer speed of uploads and downloads, 0 for unlimited
+
+
+class Backend:
+    """State shared by the fakes: worksheet contents, Drive files, call counts and faults."""
+
+    def __init__(self, faults=None, seed=0):
+        self.faults = {service: Faults() for service in SERVICES}
+        self.faults.update(faults or {})
+        self.random = random.Random(seed)
+        self.sheets = {}  # title -> list of rows (row 1 is the header)
+        self.drive_files = {}  # file id -> bytes
+        self.mail = []  # (recipient, message) accepted by the SMTP fake
+        self.calls = Counter()
+        self.errors = Counter()
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.image_bytes = sample_jpeg()
+
+    def call(self, service, name, nbytes=0):
+        """Counts a call and applies its service's latency; returns the status to fail with, or None."""
+        faults = self.faults[service]
+        with self.lock:
+            self.calls[f"{service}.{name}"] += 1
+            jitter = self.random.uniform(0, faults.jitter) if faults.jitter else 0.0
+            failed = faults.error_rate and self.random.random() < faults.error_rate
+            if failed:
+                self.errors[f"{service}.{name}"] += 1
+        delay = faults.latency + jitter
+        if faults.bytes_per_second and nbytes:
+            delay += nbytes / faults.bytes_per_second
+        if delay:
+            time.sleep(delay)
+        if failed:
+            return faults.error_status or DEFAULT_ERROR_STATUS[service]
+        return None
+
+    def new_id(self):
+        return f"fake{next(self._ids):08d}"
+
+    def stats(self):
+        with self.lock:
+            return {"calls": dict(self.calls), "errors": dict(self.errors),
+                    "drive_files": len(self.drive_files), "mail_sent": len(self.mail),
+                    "sheet_rows": {title: len(rows) - 1 for title, rows in self.sheets.items()}}
+
+
+def sample_jpeg(seed=0, width=1600, height=1200):
+    """A photo-sized JPEG with enough detail that it doesn't compress to nothing; each seed gives a different one."""
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width // 8, height // 8))
+    image.putdata([(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(image.width * image.height)])
+    buffer = io.BytesIO()
+    image.resize((width, height)).save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+# Google Sheets (gspread)
+def sheets_error(status):
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps({"error": {"code": status, "message": "Injected by the benchmark fake",
+                                              "status": "UNAVAILABLE"}}).encode()
+    return gspread.exceptions.APIError(response)
+
+
+def _parse_range(a1):
+    """(first_row, first_col, last_row, last_col) of an A1 range like A2:C9, 2:5001, C7 or C2:C; None means open."""
+    parts = a1.split("!")[-1].split(":")
+    bounds = []
+    for part in parts:
+        match = re.fullmatch(r"([A-Za-z]*)(\d*)", part)
+        letters, digits = match.groups()
+        row = int(digits) if digits else None
+        col = a1_to_rowcol(f"{letters}1")[1] if letters else None
+        bounds.append((row, col))
+    (r1, c1), (r2, c2) = bounds[0], bounds[-1]
+    if len(parts) == 1:
+        return r1, c1, r1, c1
+    return r1, c1, r2, c2
+
+
+class FakeWorksheet:
+    def __init__(self, backend, title):
+        self.backend = backend
+        self.title = title
+
+    @property
+    def _rows(self):
+        return self.backend.sheets.setdefault(self.title, [])
+
+    def _call(self, name, nbytes=0):
+        status = self.backend.call("sheets", name, nbytes)
+        if status:
+            raise sheets_error(status)
+
+    @property
+    def col_count(self):
+        return max([26] + [len(row) for row in self._rows])
+
+    def _set(self, row, col, value):
+        rows = self._rows
+        while len(rows) < row:
+            rows.append([])
+        while len(rows[row - 1]) < col:
+            rows[row - 1].append("")
+        rows[row - 1][col - 1] = value
+
+    def _read(self, a1):
+        r1, c1, r2, c2 = _parse_range(a1)
+        with self.backend.lock:
+            rows = self._rows
+            r1, c1 = r1 or 1, c1 or 1
+            r2 = min(r2 or len(rows), len(rows))
+            values = []
+            for row in rows[r1 - 1:r2]:
+                cells = row[c1 - 1:c2] if c2 else row[c1 - 1:]
+                values.append(list(cells))
+        # Sheets leaves out trailing empty rows and cells
+        while values and not any(values[-1]):
+            values.pop()
+        return [[str(v) for v in row] for row in values]
+
+    # Reads
+    def row_values(self, row):
+        self._call("row_values")
+        with self.backend.lock:
+            values = list(self._rows[row - 1]) if row - 1 < len(self._rows) else []
+        while values and values[-1] == "":
+            values.pop()
+        return [str(v) for v in values]
+
+    def col_values(self, col):
+        self._call("col_values")
+        with self.backend.lock:
+            values = [str(row[col - 1]) if col - 1 < len(row) else "" for row in self._rows]
+        while values and values[-1] == "":
+            values.pop()
+        return values
+
+    def get_all_values(self):
+        self._call("get_all_values")
+        with self.backend.lock:
+            return [[str(v) for v in row] for row in self._rows]
+
+    def get_all_records(self):
+        values = self.get_all_values()
+        if not values:
+            return []
+        headers = values[0]
+        return [dict(zip(headers, row + [""] * (len(headers) - len(row)))) for row in values[1:]]
+
+    def get(self, range_name):
+        self._call("get")
+        return self._read(range_name)
+
+    def batch_get(self, ranges):
+        self._call("batch_get")
+        return [self._read(a1) for a1 in ranges]
+
+    # Writes
+    def append_row(self, values, **kwargs):
+        return self.append_rows([values], **kwargs)
+
+    def append_rows(self, values, **kwargs):
+        self._call("append_rows")
+        with self.backend.lock:
+            self._rows.extend(list(row) for row in values)
+        return {"updates": {"updatedRows": len(values)}}
+
+    def update(self, values=None, range_name=None, **kwargs):
+        self._call("update")
+        r1, c1, _, _ = _parse_range(range_name)
+        with self.backend.lock:
+            for i, row in enumerate(values):
+                for j, value in enumerate(row):
+                    self._set(r1 + i, (c1 or 1) + j, value)
+
+    def update_cell(self, row, col, value):
+        self._call("update_cell")
+        with self.backend.lock:
+            self._set(row, col, value)
+
+    def batch_update(self, data, **kwargs):
+        self._call("batch_update")
+        with self.backend.lock:
+            for update in data:
+                r1, c1, _, _ = _parse_range(update["range"])
+                for i, row in enumerate(update["values"]):
+                    for j, value in enumerate(row):
+                        self._set(r1 + i, c1 + j, value)
+
+    def add_cols(self, cols):
+        self._call("add_cols")
+
+
+class FakeSpreadsheet:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def worksheet(self, title):
+        status = self.backend.call("sheets", "worksheet")
+        if status:
+            raise sheets_error(status)
+        if title not in self.backend.sheets:
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return FakeWorksheet(self.backend, title)
+
+
+class FakeClient:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def open_by_url(self, url):
+        status = self.backend.call("sheets", "open_by_url")
+        if status:
+            raise sheets_error(status)
+        return FakeSpreadsheet(self.backend)
+
+
+# Google Drive (googleapiclient)
+def drive_error(status):
+    return HttpError(httplib2.Response({"status": status}), b'{"error": {"message": "Injected by the benchmark fake"}}')
+
+
+class FakeRequest:
+    """One Drive API request; `execute` (or `next_chunk` for uploads) runs it."""
+
+    def __init__(self, backend, name, action, media=None):
+        self.backend = backend
+        self.name = name
+        self.action = action
+        self.media = media
+        self._sent = 0
+
+    def execute(self, http=None, num_retries=0):
+        size = self.media.size() if self.media is not None else 0
+        status = self.backend.call("drive", self.name, size)
+        if status:
+            raise drive_error(status)
+        return self.action(self.media.getbytes(0, size) if self.media is not None else None)
+
+    def next_chunk(self, http=None, num_retries=0):
+        size = self.media.size()
+        chunk = self.media.getbytes(self._sent, self.media.chunksize())
+        status = self.backend.call("drive", f"{self.name}.chunk", len(chunk))
+        if status:
+            raise drive_error(status)
+        self._sent += len(chunk)
+        if self._sent < size:
+            return MediaUploadProgress(self._sent, size), None
+        return None, self.action(self.media.getbytes(0, size))
+
+
+class FakeBatch:
+    def __init__(self, backend, callback):
+        self.backend = backend
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id=None):
+        self.requests.append((request_id, request))
+
+    def execute(self, http=None):
+        status = self.backend.call("drive", "batch")
+        if status:
+            raise drive_error(status)
+        for request_id, request in self.requests:
+            self.callback(request_id, request.action(None), None)
+
+
+class FakeFiles:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def create(self, body=None, media_body=None, fields=None):
+        def create(data):
+            file_id = self.backend.new_id()
+            with self.backend.lock:
+                self.backend.drive_files[file_id] = data or b""
+            return {"id": file_id}
+        return FakeRequest(self.backend, "files.create", create, media_body)
+
+    def delete(self, fileId=None):
+        def delete(_):
+            with self.backend.lock:
+                self.backend.drive_files.pop(fileId, None)
+            return ""
+        return FakeRequest(self.backend, "files.delete", delete)
+
+
+class FakePermissions:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def create(self, fileId=None, body=None, fields=None):
+        return FakeRequest(self.backend, "permissions.create", lambda _: {"id": "anyoneWithLink"})
+
+
+class FakeDrive:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def files(self):
+        return FakeFiles(self.backend)
+
+    def permissions(self):
+        return FakePermissions(self.backend)
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatch(self.backend, callback)
+
+
+# Image downloads (requests)
+class FakeImageAdapter(HTTPAdapter):
+    """Transport adapter answering every GET with a photo: files uploaded to the fake Drive, else the sample JPEG."""
+
+    backend = None
+
+    def send(self, request, **kwargs):
+        backend = FakeImageAdapter.backend
+        match = re.search(r"[?&]id=([^&]+)", request.url)
+        with backend.lock:
+            content = backend.drive_files.get(match.group(1)) if match else None
+        content = content or backend.image_bytes
+        status = backend.call("images", "get", len(content))
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.status_code = status or 200
+        response._content = b"" if status else content
+        response.headers["Content-Type"] = "image/jpeg"
+        return response
+
+
+# SMTP (smtplib)
+class FakeSMTP:
+    """Replacement for smtplib.SMTP that accepts mail in memory."""
+
+    backend = None
+
+    def __init__(self, host="", port=0, timeout=None, **kwargs):
+        status = self.backend.call("smtp", "connect")
+        if status:
+            raise smtplib.SMTPConnectError(status, b"Injected by the benchmark fake")
+        self.closed = False
+
+    def _reply(self, name):
+        if self.closed:
+            raise smtplib.SMTPServerDisconnected("Connection closed")
+        return self.backend.call("smtp", name)
+
+    def ehlo(self, name=""):
+        return 250, b"fake"
+
+    def starttls(self, *args, **kwargs):
+        return 220, b"ready"
+
+    def login(self, user, password, **kwargs):
+        return 235, b"ok"
+
+    def noop(self):
+        return 250, b"ok"
+
+    def sendmail(self, from_addr, to_addrs, msg, *args, **kwargs):
+        status = self._reply("sendmail")
+        if status:
+            if status >= 500:
+                raise smtplib.SMTPRecipientsRefused({to: (status, b"Injected by the benchmark fake") for to in to_addrs})
+            raise smtplib.SMTPDataError(status, b"Injected by the benchmark fake")
+        with self.backend.lock:
+            self.backend.mail.extend((to, msg) for to in to_addrs)
+        return {}
+
+    def quit(self):
+        self.closed = True
+        return 221, b"bye"
+
+    def close(self):
+        self.closed = True
+
+
+class FakeCredentials:
+    valid = True
+
+    def with_scopes(self, scopes):
+        return self
+
+    def refresh(self, request):
+        pass
+
+    def before_request(self, request, method, url, headers):
+        pass
+
+
+def install(backend):
+    """Points gspread, the Drive client, image downloads and smtplib at the fakes."""
+    import googleapiclient.discovery
+    from google.oauth2 import service_account
+
+    import image_cache
+
+    gspread.authorize = lambda credentials: FakeClient(backend)
+    service_account.Credentials.from_service_account_info = staticmethod(lambda info: FakeCredentials())
+    googleapiclient.discovery.build = lambda *args, **kwargs: FakeDrive(backend)
+    FakeImageAdapter.backend = backend
+    image_cache.HTTPAdapter = FakeImageAdapter
+    FakeSMTP.backend = backend
+    smtplib.SMTP = FakeSMTP
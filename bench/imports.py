@@ -0,0 +1,100 @@
+"""Startup import-time report: what importing the app, and then each page, costs.
+
+    python -m bench.imports --out imports.json
+    python -m bench.compare imports-before.json imports.json
+
+Each target is imported in a fresh interpreter under `python -X importtime`. A page's cost
+is what it adds on top of `app` (the modules `app` didn't already import). The heaviest of
+those are listed so a new top-level import shows up straight away. The results use the
+same JSON layout as `python -m bench`, so bench.compare can diff two reports.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.__main__ import ROOT, git_revision
+
+# Import lines look like "import time:       245 |       1234 |     package.module"
+PREFIX = "import time:"
+
+
+def import_times(statement, data_dir):
+    """{module: (self_us, cumulative_us, nesting depth)} for every module `statement` imports."""
+    env = dict(os.environ, RAF_DATA_DIR=data_dir)
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], cwd=ROOT, env=env,
+                             capture_output=True, text=True)
+    if process.returncode:
+        raise SystemExit(f"{statement!r} failed:\n{process.stderr[-2000:]}")
+    modules = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith(PREFIX) or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len(PREFIX):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+
+def median_times(statement, repeat, data_dir):
+    runs = [import_times(statement, data_dir) for _ in range(repeat)]
+    names = set.intersection(*(set(run) for run in runs))
+    return {name: tuple(statistics.median(run[name][i] for run in runs) for i in range(3)) for name in names}
+
+
+def added_cost(times, baseline):
+    """Milliseconds spent on the modules not in `baseline`, their count, and the top-level packages they came from, heaviest first."""
+    added = {name: t for name, t in times.items() if name not in baseline}
+    packages = {}
+    for name, (self_us, _, _) in added.items():
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us / 1000
+    heaviest = sorted(packages.items(), key=lambda item: -item[1])
+    return sum(t[0] for t in added.values()) / 1000, len(added), heaviest
+
+
+def main():
+    from app import HIDDEN_PAGES, PAGES
+
+    parser = argparse.ArgumentParser(description="Report the import cost of the app and of each of its pages.")
+    parser.add_argument("--repeat", type=int, default=3, help="interpreters started per target; the median is reported (default: 3)")
+    parser.add_argument("--top", type=int, default=8, help="heaviest imports listed per target (default: 8)")
+    parser.add_argument("--out", help="also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="raf_imports_") as data_dir:
+        interpreter = median_times("pass", args.repeat, data_dir)
+        app = median_times("import app", args.repeat, data_dir)
+        app_ms, app_count, app_heaviest = added_cost(app, interpreter)
+        results.append({"scenario": "import:app", "size": 0, "seconds": {"import": app_ms / 1000},
+                        "modules": app_count, "heaviest": app_heaviest[:args.top]})
+        pages = [module for module, *_ in PAGES.values()] + [module for module, _ in HIDDEN_PAGES.values()]
+        for module in pages:
+            page = median_times(f"import app, {module}", args.repeat, data_dir)
+            page_ms, page_count, page_heaviest = added_cost(page, app)
+            results.append({"scenario": f"import:{module}", "size": 0, "seconds": {"import": page_ms / 1000},
+                            "modules": page_count, "heaviest": page_heaviest[:args.top]})
+
+    for result in results:
+        print(f"{result['scenario']:<32}{result['seconds']['import'] * 1000:>9.1f} ms  {result['modules']:>5} modules")
+        for name, ms in result["heaviest"]:
+            print(f"    {name:<40}{ms:>9.1f} ms")
+
+    if args.out:
+        output = {"meta": {**git_revision(), "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                           "python": platform.python_version(), "platform": platform.platform(), "repeat": args.repeat},
+                  "results": [{**r, "seconds": {k: round(v, 6) for k, v in r["seconds"].items()},
+                               "heaviest": [[name, round(ms, 3)] for name, ms in r["heaviest"]]} for r in results]}
+        with open(args.out, "w") as out_file:
+            json.dump(output, out_file, indent=2)
+            out_file.write("\n")
+
+
+if __name__ == "__main__":
+    main()
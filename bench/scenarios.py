@@ -0,0 +1,302 @@
+"""Benchmark scenarios, each driving the app's page functions headlessly with Streamlit's AppTest.
+
+Run one case with `python -m bench.scenarios CONFIG_JSON RESULT_PATH`; `python -m bench`
+runs every case this way, each in a fresh process with its own data directory, so
+cached resources, local databases and background workers never leak between cases.
+"""
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+
+DEFAULT_SIZES = {
+    "save_report": [1, 5, 20],  # accident photos attached to the report
+    "view_reports": [100, 1000, 10000],  # rows in the AccidentReports sheet
+    "case_numbers": [100, 1000, 10000],  # rows in the AccidentReports sheet
+    "create_pdf": [1, 5, 20],  # images in the report
+    "send_invitations": [1, 10, 50],  # recipients
+}
+
+# Rows in the AccidentReports sheet for scenarios that aren't sized by it
+BASE_ROWS = 100
+
+# Column layout of the seeded worksheets, as the app expects them
+SHEET_HEADERS = {
+    "AccidentReports": ["case_number", "accident_date", "num_vehicles", "road_name", "accident_time", "police_station",
+                        "police_reference_number", "speed_limit", "weather", "road_condition", "vehicle_info",
+                        "driver_a_info", "driver_b_info", "witness_info", "accident_image_urls", "accident_video_url",
+                        "voice_note_urls"],
+    "InjuryAssessment": ["patient_name", "patient_id", "claim_number", "contact_number", "assessment_date",
+                         "accident_date", "medical_practitioner_name", "practice_number", "practitioner_contact",
+                         "practitioner_email", "injury_description", "injury_severity", "treatment_given",
+                         "current_symptoms", "diagnosis", "clinical_studies", "medical_history", "personal_history",
+                         "educational_occupational_history", "has_reached_mmi"],
+    "Claims": ["claimant_name", "claimant_id", "claim_number", "claimant_dob", "claimant_residential_address",
+               "claimant_postal_address", "phone_number", "claimant_email", "occupation", "employer_name",
+               "employer_address"],
+    "SupplierClaims": ["supplier_name", "supplier_contact", "supplier_email", "total_amount_claimed", "claim_description"],
+    "MedicalReports": ["hospital_name", "doctor_name", "hospital_location", "case_number", "date", "document_url"],
+    "SAPReports": ["police_station_name", "officer_name", "police_station_location", "case_number", "date", "document_url"],
+}
+
+SECRETS = {
+    "gcp_service_account": {"type": "service_account", "client_email": "bench@example.iam.gserviceaccount.com"},
+    "sheets": {"SHEET_URL": "https://docs.google.com/spreadsheets/d/benchmark"},
+    "gmail": {"GMAIL_USER": "bench@example.com", "GMAIL_PASSWORD": "benchmark"},
+}
+
+# Unless --keep-rate-limits is given, the app's own throttles are lifted so the numbers show the code, not the quota
+UNLIMITED_PER_MINUTE = 1_000_000
+
+
+def accident_rows(count):
+    """`count` AccidentReports rows shaped like the ones the app saves."""
+    from report_records import DRIVER_FIELDS, VEHICLE_FIELDS, WITNESS_FIELDS, encode_list, encode_record
+
+    rows = []
+    for i in range(count):
+        driver = ["Driver", f"{8000000000000 + i}", "None", f"L{i:08d}", "2015-01-01", "", "", "1 Main Road",
+                  "2 Work Street", "Yes", "Acme", "No", "N/A", "Yes", "Insurer", "Yes" if i % 7 == 0 else "No",
+                  f"https://drive.google.com/uc?id=license{i}"]
+        rows.append([
+            f"CASE-{i:06d}", f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}", 2, f"Road {i % 300}", "14:30",
+            f"Station {i % 40}", f"REF{i:06d}", 60, ["Clear", "Rainy", "Foggy"][i % 3], ["Good", "Wet"][i % 2],
+            encode_list([[f"CA{i:05d}", "Toyota", "Corolla", "2018", "White"]], VEHICLE_FIELDS),
+            encode_record(driver, DRIVER_FIELDS), encode_record(driver, DRIVER_FIELDS),
+            encode_list([["Witness", "123", "082 000 0000"]], WITNESS_FIELDS),
+            f"https://drive.google.com/uc?id=photo{i}a, https://drive.google.com/uc?id=photo{i}b", "N/A", "",
+        ])
+    return rows
+
+
+def seed(backend, accident_count):
+    for title, headers in SHEET_HEADERS.items():
+        backend.sheets[title] = [list(headers)]
+    backend.sheets["AccidentReports"].extend(accident_rows(accident_count))
+
+
+# Scripts run by AppTest (their source is run as the app script, so they import what they use)
+def startup_script():
+    import importlib
+
+    importlib.import_module("app")
+
+
+def page_script(page):
+    import app
+
+    app.load_page(*app.PAGES[page][:2])()
+
+
+def case_numbers_script():
+    import streamlit as st
+
+    from views.collaboration import get_case_numbers
+
+    st.write(f"{len(get_case_numbers())} case numbers")
+
+
+def create_pdf_script(image_count):
+    from report_pdfs import create_pdf
+
+    report = {
+        "Accident Case Number": "CASE-000001", "Accident Date": "2024-05-01", "Road Name": "Main Road",
+        "Driver A": {"Name": "Driver A", "License Image": "https://drive.google.com/uc?id=licenseA"},
+        "Driver B": {"Name": "Driver B", "License Image": "https://drive.google.com/uc?id=licenseB"},
+        "Accident Images": [f"https://drive.google.com/uc?id=photo{i}" for i in range(image_count)],
+    }
+    create_pdf({"Officer Name": "Officer", "Role": "Responder", "Department": "EMS"}, report, "benchmark.pdf")
+
+
+# Errors shown by any run of the case, with how often each was shown
+observed_errors = Counter()
+
+
+# Helpers
+def timed(func):
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def timed_run(at):
+    """Seconds one run of the app took; errors it showed are collected in observed_errors."""
+    seconds = timed(at.run)
+    observed_errors.update([str(e.value) for e in at.error] + [e.message for e in at.exception])
+    return seconds
+
+
+def wait_for(predicate, timeout):
+    """Seconds until predicate() is true (polling every 10 ms), or raises TimeoutError."""
+    started = time.perf_counter()
+    while not predicate():
+        if time.perf_counter() - started > timeout:
+            raise TimeoutError("Timed out waiting for background work")
+        time.sleep(0.01)
+    return time.perf_counter() - started
+
+
+def widget(elements, label):
+    return next(element for element in elements if element.label == label)
+
+
+def reruns(at, repeat):
+    """Median and fastest of `repeat` plain reruns (nothing changed, every cache warm)."""
+    times = [timed_run(at) for _ in range(repeat)]
+    return {"rerun_median": statistics.median(times), "rerun_min": min(times)} if times else {}
+
+
+def fake_uploads(photo_count):
+    """st.file_uploader replacement handing the accident form `photo_count` distinct photos and two licence images."""
+    import streamlit as st
+    from streamlit.proto.Common_pb2 import FileURLs
+    from streamlit.runtime.uploaded_file_manager import UploadedFile, UploadedFileRec
+
+    from bench.fakes import sample_jpeg
+
+    photos = [sample_jpeg(seed=i) for i in range(photo_count + 2)]
+
+    def uploaded(name, data):
+        return UploadedFile(UploadedFileRec(name, name, "image/jpeg", data), FileURLs(file_id=name))
+
+    def file_uploader(label, *args, accept_multiple_files=False, key=None, **kwargs):
+        if label.startswith("Upload accident scene photos"):
+            value = [uploaded(f"scene_{i}.jpg", photos[i]) for i in range(photo_count)]
+        elif label.endswith("License Image"):
+            value = uploaded(f"{label}.jpg", photos[photo_count + ("Driver B" in label)])
+        else:
+            value = [] if accept_multiple_files else None
+        # The accident form reads its uploads back from session state when Save Report is pressed
+        if key is not None:
+            st.session_state[key] = value
+        return value
+
+    return file_uploader
+
+
+# Scenarios: each takes (AppTest factory, size, repeat, timeout) and returns its timings in seconds
+def save_report(new_app, size, repeat, timeout):
+    import streamlit as st
+
+    from drafts import READY, SYNCING, get_draft_store
+    from sheet_outbox import get_sheet_outbox
+
+    st.file_uploader = fake_uploads(size)
+    at = new_app(page_script, "Accident Report")
+    seconds = {"first_run": timed_run(at)}
+    widget(at.text_input, "Case Number").set_value(f"BENCH-{size:06d}")
+    seconds["draft_run"] = timed_run(at)  # the draft and its files are kept on the server
+    widget(at.button, "Save Report").click()
+    seconds["save_run"] = timed_run(at)
+    drafts = get_draft_store()
+    seconds["draft_sync"] = wait_for(lambda: not {READY, SYNCING} & set(drafts.counts()), timeout)  # photo processing and uploads
+    outbox = get_sheet_outbox()
+    seconds["sheet_flush"] = wait_for(lambda: not {"pending", "sending"} & set(outbox.counts()), timeout)
+    seconds.update(reruns(at, repeat))
+    return seconds
+
+
+def view_reports(new_app, size, repeat, timeout):
+    from local_store import get_local_store
+
+    at = new_app(page_script, "View Reports")
+    seconds = {"first_run": timed_run(at)}  # straight from the sheet while the mirror loads
+    store = get_local_store()
+    seconds["mirror_sync"] = wait_for(lambda: store.is_mirrored("AccidentReports"), timeout)
+    seconds["mirrored_run"] = timed_run(at)
+    seconds.update(reruns(at, repeat))
+    widget(at.text_input, "Search all fields").set_value("Station 7")
+    seconds["search_run"] = timed_run(at)
+    return seconds
+
+
+def case_numbers(new_app, size, repeat, timeout):
+    at = new_app(case_numbers_script)
+    seconds = {"first_run": timed_run(at)}
+    seconds.update(reruns(at, repeat))
+    return seconds
+
+
+def create_pdf(new_app, size, repeat, timeout):
+    at = new_app(create_pdf_script, size)
+    seconds = {"first_run": timed_run(at)}  # images downloaded
+    seconds.update(reruns(at, repeat))  # images from the local cache
+    return seconds
+
+
+def send_invitations(new_app, size, repeat, timeout):
+    from notification_outbox import get_notification_outbox
+
+    at = new_app(page_script, "Collaboration and Sharing")
+    seconds = {"first_run": timed_run(at)}
+    widget(at.text_area, "Enter email addresses separated by commas").set_value(
+        ", ".join(f"collaborator{i}@example.com" for i in range(size)))
+    widget(at.text_input, "Subject").set_value("Benchmark invitation")
+    at.button(key="send_invitations").click()
+    seconds["invite_run"] = timed_run(at)
+    outbox = get_notification_outbox()
+    seconds["delivery"] = wait_for(lambda: sum(outbox.counts().get(s, 0) for s in ("sent", "failed")) >= size, timeout)
+    seconds.update(reruns(at, repeat))
+    return seconds
+
+
+SCENARIOS = {
+    "save_report": save_report,
+    "view_reports": view_reports,
+    "case_numbers": case_numbers,
+    "create_pdf": create_pdf,
+    "send_invitations": send_invitations,
+}
+
+
+def run_case(config):
+    """Runs one scenario at one size in this process and returns its result."""
+    # The data directory is read when storage is imported, so it is set before any app module loads
+    os.environ["RAF_DATA_DIR"] = tempfile.mkdtemp(prefix="raf_bench_")
+
+    from streamlit.testing.v1 import AppTest
+
+    import notification_outbox
+    import tracing
+    from bench.fakes import Backend, Faults, install
+
+    backend = Backend({service: Faults(**faults) for service, faults in config["faults"].items()}, seed=config["seed"])
+    scenario, size = config["scenario"], config["size"]
+    seed(backend, size if scenario in ("view_reports", "case_numbers") else BASE_ROWS)
+    install(backend)
+
+    secrets = dict(SECRETS)
+    if not config["keep_rate_limits"]:
+        secrets["quotas"] = {f"{api.upper()}_PER_MINUTE": UNLIMITED_PER_MINUTE for api in ("sheets_read", "sheets_write", "drive")}
+        notification_outbox.MESSAGES_PER_MINUTE = notification_outbox.BURST = UNLIMITED_PER_MINUTE
+
+    def new_app(script, *args):
+        at = AppTest.from_function(script, args=args, default_timeout=config["timeout"])
+        at.secrets.update(secrets)
+        return at
+
+    # Importing the app (and creating its shared resources) is timed on its own, so page timings don't include it
+    startup = timed_run(new_app(startup_script))
+    seconds = SCENARIOS[scenario](new_app, size, config["repeat"], config["timeout"])
+    return {
+        "scenario": scenario,
+        "size": size,
+        "seconds": {name: round(value, 6) for name, value in {"startup": startup, **seconds}.items()},
+        "app_errors": dict(observed_errors),
+        "fakes": backend.stats(),
+        "spans": [{key: row[key] if isinstance(row[key], (int, str)) else round(row[key], 3)
+                   for key in ("operation", "count", "errors", "p50_ms", "p95_ms", "max_ms")}
+                  for row in tracing.TRACER.summary()],
+    }
+
+
+if __name__ == "__main__":
+    case_config, result_path = json.loads(sys.argv[1]), sys.argv[2]
+    result = run_case(case_config)
+    with open(result_path, "w") as result_file:
+        json.dump(result, result_file)
+    # Background workers are daemon threads; don't wait for them
+    os._exit(0)
@@ -0,0 +1,625 @@
+"""Bulk import of historical reports from CSV or Excel files into their worksheets.
+
+    python -m bulk_import accidents.csv --type "Accident Report" --map case_number="Case No"
+    python -m bulk_import --resume JOB_ID
+    python -m bulk_import --list
+
+The file is read CHUNK_ROWS rows at a time. Its columns are mapped onto the report type's
+fields in report_type_map (by name, or with --map FIELD=COLUMN), and each chunk is validated
+and coerced with vectorized pandas operations. Accepted rows are appended with one
+append_rows call per chunk, through the API gateway, so the Sheets write quota is respected.
+After each chunk the job records how far it got, so a stopped or failed import resumes from
+the last committed chunk. Rejected rows are written to a CSV report with their row number and
+the reason. The same jobs are started and followed from the Bulk Import page; a job is run by
+one process at a time, whether that is the web server or this command.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import socket
+import threading
+import time
+import uuid
+
+import gspread
+import pandas as pd
+import streamlit as st
+
+import storage
+from api_gateway import background
+from case_index import get_case_index
+from google_services import get_google_services
+from report_records import report_sheet_map, report_type_map
+from sheet_cache import get_worksheet_cache
+from sheet_outbox import DEFINITE_FAILURE_CODES, KEY_HEADER
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Rows read, validated and appended at a time; memory use stays bounded by this, whatever the file size.
+# One append per 1000 rows keeps requests well under Google's recommended 2 MB while a 500k-row file
+# needs only 500 writes (about 9 minutes at the default quota of 60 writes a minute).
+CHUNK_ROWS = 1000
+
+# Attempts at appending one chunk before the job stops (it can be resumed), and the backoff between them
+MAX_CHUNK_ATTEMPTS = 5
+MAX_BACKOFF_SECONDS = 60
+
+# How often the background worker looks for queued jobs
+POLL_INTERVAL_SECONDS = 2
+
+# A running job is leased to the process running it, which renews the lease before every append.
+# Another process (the web server or the command line) only takes over a job whose lease ran out,
+# e.g. because the process running it was killed.
+LEASE_SECONDS = 300
+
+# Typed fields and how they are coerced; every other field is imported as text
+DATE_FIELDS = ["accident_date", "assessment_date", "claim_date", "claimant_dob"]
+DATE_FORMATS = ["%Y-%m-%d", "%d/%m/%Y", "%Y/%m/%d", "%d-%m-%Y", "%d.%m.%Y"]
+TIME_FIELDS = ["accident_time"]
+TIME_FORMATS = ["%H:%M", "%H:%M:%S", "%H.%M"]
+INTEGER_FIELDS = {"num_vehicles": (1, None), "speed_limit": (10, 200)}  # field -> (min, max), as on the form
+AMOUNT_FIELDS = ["total_amount_claimed"]
+CHOICE_FIELDS = {
+    "weather": ["Clear", "Rainy", "Foggy", "Snowy"],
+    "road_condition": ["Good", "Wet", "Icy"],
+    "injury_severity": ["Mild", "Moderate", "Severe"],
+}
+EMAIL_FIELDS = ["claimant_email", "supplier_email"]
+EMAIL_PATTERN = r"^[^@\s]+@[^@\s]+\.[^@\s]+$"
+
+# Report types whose first field must be unique in the worksheet (checked against the case-number index)
+UNIQUE_FIRST_FIELD = ["Accident Report"]
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+PAUSED = "paused"
+DONE = "done"
+FAILED = "failed"
+
+
+# Reading
+def is_excel(name):
+    return str(name).lower().endswith((".xlsx", ".xlsm"))
+
+
+def _excel_rows(source):
+    # Imported here, so CSV imports (and the page itself) don't pay for loading it
+    import openpyxl
+
+    # Read-only mode streams the sheet instead of loading the whole workbook
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            yield ["" if value is None else str(value) for value in row]
+    finally:
+        workbook.close()
+
+
+def read_headers(source, name):
+    """Column names of a CSV or Excel file (a path or an open file)."""
+    if is_excel(name):
+        return [header.strip() for header in next(_excel_rows(source), [])]
+    headers = pd.read_csv(source, nrows=0, encoding="utf-8-sig", encoding_errors="replace").columns
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return [str(header).strip() for header in headers]
+
+
+def read_chunks(source, name, chunk_rows=CHUNK_ROWS, skip_rows=0):
+    """DataFrames of up to chunk_rows rows of text, after skipping the first skip_rows records (not lines)."""
+    if not is_excel(name):
+        # Records are dropped after parsing: skiprows counts lines, which a quoted field with a line break throws off
+        for frame in pd.read_csv(source, dtype=str, keep_default_na=False, chunksize=chunk_rows, encoding="utf-8-sig",
+                                 encoding_errors="replace"):
+            if skip_rows >= len(frame):
+                skip_rows -= len(frame)
+                continue
+            yield frame.iloc[skip_rows:]
+            skip_rows = 0
+        return
+
+    rows = _excel_rows(source)
+    headers = [header.strip() for header in next(rows, [])]
+    batch = []
+    for position, row in enumerate(rows):
+        if position < skip_rows:
+            continue
+        batch.append((row + [""] * len(headers))[:len(headers)])
+        if len(batch) == chunk_rows:
+            yield pd.DataFrame(batch, columns=headers, dtype=str)
+            batch = []
+    if batch:
+        yield pd.DataFrame(batch, columns=headers, dtype=str)
+
+
+def normalize_header(header):
+    """A column name in field form, e.g. "Case Number " -> case_number."""
+    return re.sub(r"[^0-9a-z]+", "_", str(header).strip().lower()).strip("_")
+
+
+def map_columns(headers, report_type, overrides=None):
+    """{field: column} for the report type's fields, matched by name; `overrides` maps fields to columns explicitly."""
+    fields = report_type_map[report_type]
+    by_name = {normalize_header(header): header for header in headers}
+    mapping = {field: by_name[field] for field in fields if field in by_name}
+    for field, column in (overrides or {}).items():
+        if field not in fields:
+            raise ValueError(f"{field!r} is not a field of {report_type} ({', '.join(fields)})")
+        if column not in headers:
+            raise ValueError(f"The file has no column {column!r}")
+        mapping[field] = column
+    return mapping
+
+
+# Validation
+def _parse(values, formats, fallback=False):
+    """Datetimes parsed with the first matching format, NaT where none matched."""
+    parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    for value_format in formats:
+        missing = parsed.isna() & (values != "")
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(values[missing], format=value_format, errors="coerce")
+    missing = parsed.isna() & (values != "")
+    if fallback and missing.any():
+        # Anything else (e.g. "2 March 2021") is parsed value by value, day first
+        parsed[missing] = pd.to_datetime(values[missing], format="mixed", dayfirst=True, errors="coerce")
+    return parsed
+
+
+def number_rows(frame, first_row):
+    """The chunk indexed by source row number (the header is row 1)."""
+    frame.index = pd.RangeIndex(first_row, first_row + len(frame))
+    return frame
+
+
+def validate_chunk(frame, report_type, mapping, existing=None):
+    """Coerces a chunk's mapped columns to the report type's field formats.
+
+    `frame` is indexed by source row number (see number_rows). Returns (rows, rejected):
+    `rows` has a column per field of the report type, `rejected` has the source columns of
+    the rows that failed with their row number and the reasons. `existing` is a set of
+    lower-cased values of the report type's first field already in the worksheet: rows
+    repeating one, or each other, are rejected and accepted ones are added to it.
+    """
+    fields = report_type_map[report_type]
+    rows = pd.DataFrame(index=frame.index)
+    reasons = pd.Series("", index=frame.index)
+
+    def reject(mask, reason):
+        reasons[mask] = reasons[mask] + "; " + reason
+
+    for field in fields:
+        column = mapping.get(field)
+        values = frame[column].astype(str).str.strip() if column else pd.Series("", index=frame.index)
+        present = values != ""
+        if field == fields[0]:
+            reject(~present, f"{field} is empty")
+
+        if field in DATE_FIELDS:
+            # Excel dates arrive as "2021-03-02 00:00:00"
+            parsed = _parse(values.str.split(" ", n=1).str[0], DATE_FORMATS)
+            parsed = parsed.fillna(_parse(values.where(parsed.isna(), ""), [], fallback=True))
+            reject(present & parsed.isna(), f"{field} is not a date")
+            values = parsed.dt.strftime("%Y-%m-%d").fillna("")
+        elif field in TIME_FIELDS:
+            parsed = _parse(values, TIME_FORMATS)
+            reject(present & parsed.isna(), f"{field} is not a time")
+            values = parsed.dt.strftime("%H:%M").fillna("")
+        elif field in INTEGER_FIELDS:
+            low, high = INTEGER_FIELDS[field]
+            numbers = pd.to_numeric(values.where(present), errors="coerce")
+            bad = present & (numbers.isna() | (numbers % 1 != 0) | (numbers < low))
+            if high is not None:
+                bad |= numbers > high
+            reject(bad, f"{field} must be a whole number of at least {low}" + (f" and at most {high}" if high else ""))
+            numbers = numbers.where(~bad).astype("Int64")
+            values = numbers.astype(object).where(numbers.notna(), "")
+        elif field in AMOUNT_FIELDS:
+            # Amounts like "R 1 250,00" or "1,250.00"
+            cleaned = values.str.replace(r"^[Rr]\s*|\s", "", regex=True)
+            cleaned = cleaned.where(~cleaned.str.match(r"^\d+(,\d{1,2})$"), cleaned.str.replace(",", "."))
+            numbers = pd.to_numeric(cleaned.str.replace(",", "").where(present), errors="coerce")
+            bad = present & (numbers.isna() | (numbers < 0))
+            reject(bad, f"{field} is not an amount")
+            values = numbers.astype(object).where(present & ~bad, "")
+        elif field in CHOICE_FIELDS:
+            choices = {choice.lower(): choice for choice in CHOICE_FIELDS[field]}
+            matched = values.str.lower().map(choices)
+            reject(present & matched.isna(), f"{field} must be one of {', '.join(CHOICE_FIELDS[field])}")
+            values = matched.fillna("")
+        elif field in EMAIL_FIELDS:
+            reject(present & ~values.str.match(EMAIL_PATTERN), f"{field} is not an email address")
+        rows[field] = values
+
+    if existing is not None:
+        keys = rows[fields[0]].str.lower()
+        # Looked up key by key: isin() would copy the whole (growing) set into an array for every chunk
+        reject((reasons == "") & keys.map(existing.__contains__).astype(bool), f"{fields[0]} is already in the worksheet")
+        reject((reasons == "") & keys.duplicated(), f"{fields[0]} appears more than once in the file")
+        existing.update(keys[reasons == ""])
+
+    failed = reasons != ""
+    rejected = frame[failed].copy()
+    rejected.insert(0, "reason", reasons[failed].str[2:])
+    rejected.insert(0, "row", rejected.index)
+    return rows[~failed], rejected
+
+
+def job_fingerprint(source, report_type, mapping):
+    """Identifies an import: a hash of the file's bytes (a path or an upload), the report type and the column mapping."""
+    digest = hashlib.sha256()
+    if isinstance(source, str):
+        with open(source, "rb") as source_file:
+            for block in iter(lambda: source_file.read(1024 * 1024), b""):
+                digest.update(block)
+    else:
+        digest.update(source.getbuffer())
+    digest.update(json.dumps([report_type, mapping], sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+class JobTaken(Exception):
+    """The job is being run by another process (or this one lost its lease on it)."""
+
+
+class BulkImporter:
+    """Import jobs, their checkpoints in SQLite, and the background worker that runs queued jobs.
+
+    Every appended row carries a key (job id and row number) in the KEY_HEADER column. A job
+    is marked uncertain before each append and certain again at the chunk's checkpoint, so
+    after an append whose outcome is unknown, including a crash before the checkpoint, the
+    rows that already arrived are read back and not sent again; no row is written twice.
+    Jobs are leased to one runner at a time (see LEASE_SECONDS), and pausing is recorded in
+    the database, so it reaches whichever process runs the job.
+    """
+
+    def __init__(self, services, sheet_cache, case_index, db_name="imports.sqlite3"):
+        self.services = services
+        self.sheet_cache = sheet_cache
+        self.case_index = case_index
+        self._conn = storage.connect(db_name)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS import_jobs ("
+            " job_id TEXT PRIMARY KEY, report_type TEXT NOT NULL, worksheet TEXT NOT NULL, source_path TEXT NOT NULL,"
+            " source_name TEXT NOT NULL, mapping_json TEXT NOT NULL, chunk_rows INTEGER NOT NULL, status TEXT NOT NULL,"
+            " rows_read INTEGER NOT NULL DEFAULT 0, rows_written INTEGER NOT NULL DEFAULT 0,"
+            " rows_rejected INTEGER NOT NULL DEFAULT 0, rejected_bytes INTEGER NOT NULL DEFAULT 0,"
+            " uncertain INTEGER NOT NULL DEFAULT 0, last_error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL,"
+            " finished_at REAL, runner TEXT, heartbeat_at REAL, fingerprint TEXT)"
+        )
+        columns = {column[1] for column in self._conn.execute("PRAGMA table_info(import_jobs)")}
+        for column, kind in (("runner", "TEXT"), ("heartbeat_at", "REAL"), ("fingerprint", "TEXT")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE import_jobs ADD COLUMN {column} {kind}")
+        # One job per file and mapping, even when two processes start the same import at once
+        self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS import_jobs_fingerprint ON import_jobs (fingerprint)")
+        self._conn.commit()
+        # Who this process is, as recorded on the jobs it runs
+        self.runner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # Jobs
+    def create(self, report_type, source, mapping, source_name=None, chunk_rows=CHUNK_ROWS, status=QUEUED):
+        """Records a new job and returns its id. `source` is a file path, or an upload that is copied to the data directory.
+
+        A job created RUNNING is leased to this process, which is expected to run() it straight away.
+        If the same file was already imported with the same type and mapping, that job's id is
+        returned instead (see find) and nothing is recorded, so a double click starts one import.
+        """
+        fingerprint = job_fingerprint(source, report_type, mapping)
+        existing = self.find(fingerprint)
+        if existing is not None:
+            return existing["job_id"]
+
+        job_id = uuid.uuid4().hex[:12]
+        if isinstance(source, str):
+            source_path, source_name = os.path.abspath(source), source_name or os.path.basename(source)
+        else:
+            source_name = source_name or source.name
+            source_path = storage.data_path("imports", job_id + os.path.splitext(source_name)[1])
+            with open(source_path, "wb") as out_file:
+                out_file.write(source.getbuffer())
+        now = time.time()
+        with self._lock:
+            inserted = self._conn.execute(
+                "INSERT OR IGNORE INTO import_jobs (job_id, report_type, worksheet, source_path, source_name, mapping_json,"
+                " chunk_rows, status, created_at, updated_at, runner, heartbeat_at, fingerprint)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, report_type, report_sheet_map[report_type], source_path, source_name, json.dumps(mapping),
+                 chunk_rows, status, now, now, self.runner if status == RUNNING else None, now, fingerprint),
+            ).rowcount
+            self._conn.commit()
+        if not inserted:
+            # Another process created the same job in the meantime
+            if not isinstance(source, str):
+                os.remove(source_path)
+            return self.find(fingerprint)["job_id"]
+        self._wake.set()
+        return job_id
+
+    def find(self, fingerprint):
+        """The job importing the file and mapping with this job_fingerprint, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM import_jobs WHERE fingerprint = ?", (fingerprint,)).fetchone()
+        return self._job(row) if row else None
+
+    def _job(self, row):
+        columns = ["job_id", "report_type", "worksheet", "source_path", "source_name", "mapping_json", "chunk_rows",
+                   "status", "rows_read", "rows_written", "rows_rejected", "rejected_bytes", "uncertain", "last_error",
+                   "created_at", "updated_at", "finished_at", "runner", "heartbeat_at", "fingerprint"]
+        job = dict(zip(columns, row))
+        job["mapping"] = json.loads(job.pop("mapping_json"))
+        job["rejected_path"] = self.rejected_path(job["job_id"])
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM import_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._job(row) if row else None
+
+    def jobs(self):
+        """Every job, newest first."""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM import_jobs ORDER BY created_at DESC").fetchall()
+        return [self._job(row) for row in rows]
+
+    def rejected_path(self, job_id):
+        return storage.data_path("imports", f"{job_id}-rejected.csv")
+
+    def pause(self, job_id):
+        """Stops a job after the chunk it is on, in whichever process runs it; it can be resumed later."""
+        with self._lock:
+            self._conn.execute("UPDATE import_jobs SET status = ? WHERE job_id = ? AND status IN (?, ?)",
+                               (PAUSED, job_id, QUEUED, RUNNING))
+            self._conn.commit()
+
+    def resume(self, job_id):
+        with self._lock:
+            self._conn.execute("UPDATE import_jobs SET status = ?, last_error = NULL WHERE job_id = ? AND status IN (?, ?)",
+                               (QUEUED, job_id, PAUSED, FAILED))
+            self._conn.commit()
+        self._wake.set()
+
+    # Leases
+    def _claim(self, job_id):
+        """Leases a queued job, or a running one whose lease ran out, to this process; False if someone else has it."""
+        now = time.time()
+        with self._lock:
+            claimed = self._conn.execute(
+                "UPDATE import_jobs SET status = ?, runner = ?, heartbeat_at = ?, last_error = NULL, updated_at = ?"
+                " WHERE job_id = ? AND (status = ? OR (status = ? AND (runner = ? OR heartbeat_at IS NULL OR heartbeat_at < ?)))",
+                (RUNNING, self.runner, now, now, job_id, QUEUED, RUNNING, self.runner, now - LEASE_SECONDS),
+            ).rowcount
+            self._conn.commit()
+        return claimed == 1
+
+    def _renew(self, job_id, **values):
+        """Renews this process's lease on a job, saving `values` with it; raises JobTaken if it was taken over."""
+        now = time.time()
+        values.update(heartbeat_at=now, updated_at=now)
+        with self._lock:
+            renewed = self._conn.execute(
+                f"UPDATE import_jobs SET {', '.join(f'{k} = ?' for k in values)} WHERE job_id = ? AND runner = ?",
+                (*values.values(), job_id, self.runner),
+            ).rowcount
+            self._conn.commit()
+        if renewed != 1:
+            raise JobTaken(f"Import {job_id} was taken over by another process")
+
+    def _next_job(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_id FROM import_jobs WHERE status = ? OR (status = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?))"
+                " ORDER BY created_at LIMIT 1",
+                (QUEUED, RUNNING, time.time() - LEASE_SECONDS),
+            ).fetchone()
+        return row[0] if row else None
+
+    # Worker
+    def start(self):
+        if self._thread is None:
+            # Jobs left running by a process that stopped are taken over once their lease runs out
+            self._thread = threading.Thread(target=self._run, name="bulk-import", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(POLL_INTERVAL_SECONDS)
+            self._wake.clear()
+            job_id = self._next_job()
+            if job_id is None:
+                continue
+            try:
+                # Imports yield the API quota to users waiting on a page
+                with background():
+                    self.run(job_id)
+            except JobTaken as e:
+                logger.info("%s", e)
+            except Exception:
+                logger.exception("Import %s failed", job_id)
+            self._wake.set()
+
+    # Running a job
+    def _delivered_keys(self, title, key_column):
+        return set(self.services.call_worksheet(title, lambda ws: ws.col_values(key_column)))
+
+    def _append(self, job_id, title, values, key_column):
+        """Appends rows, retrying with backoff; after an uncertain failure, rows that arrived are not sent again."""
+        for attempt in range(1, MAX_CHUNK_ATTEMPTS + 1):
+            # Until the chunk's checkpoint, the job may have written rows it hasn't recorded
+            self._renew(job_id, uncertain=1)
+            try:
+                self.services.call_worksheet(title, lambda ws: ws.append_rows(values, value_input_option="RAW"),
+                                             write=True, idempotent=False)
+                return
+            except Exception as e:
+                definite = isinstance(e, gspread.exceptions.APIError) and e.code in DEFINITE_FAILURE_CODES
+                logger.warning("Appending %d rows to %s failed (attempt %d): %s", len(values), title, attempt, e)
+                if attempt == MAX_CHUNK_ATTEMPTS:
+                    raise
+                time.sleep(min(2 ** attempt, MAX_BACKOFF_SECONDS) * (0.5 + random.random()))
+                if not definite:
+                    delivered = self._delivered_keys(title, key_column)
+                    values = [row for row in values if row[key_column - 1] not in delivered]
+                    if not values:
+                        return
+
+    def run(self, job_id, on_progress=None):
+        """Runs a job from its last checkpoint until the file ends, it is paused, or a chunk can't be written.
+
+        Raises JobTaken if another process is running the job.
+        """
+        if not self._claim(job_id):
+            raise JobTaken(f"Import {job_id} is not queued, or is being run by another process")
+        job = self.get(job_id)
+        title, report_type = job["worksheet"], job["report_type"]
+        try:
+            # Field -> worksheet column; header_column adds the headers the worksheet doesn't have yet
+            columns = {field: self.services.header_column(title, field) for field in report_type_map[report_type]}
+            key_column = self.services.header_column(title, KEY_HEADER)
+            width = max(*columns.values(), key_column)
+
+            existing = None
+            if report_type in UNIQUE_FIRST_FIELD:
+                self.case_index.refresh(force=True)
+                existing = {value.lower() for value in self.case_index.case_numbers()}
+
+            # An append cut short last time (an error, or the process stopping) may have written some rows of the next chunk
+            delivered = self._delivered_keys(title, key_column) if job["uncertain"] else set()
+
+            # Rejected rows written after the last checkpoint are written again
+            rejected_path = job["rejected_path"]
+            if os.path.exists(rejected_path):
+                with open(rejected_path, "r+b") as rejected_file:
+                    rejected_file.truncate(job["rejected_bytes"])
+
+            rows_read, rows_written, rows_rejected = job["rows_read"], job["rows_written"], job["rows_rejected"]
+            for frame in read_chunks(job["source_path"], job["source_name"], job["chunk_rows"], skip_rows=rows_read):
+                if self.get(job_id)["status"] != RUNNING:
+                    # Paused (or resumed again) since the last chunk, here or from another process
+                    return self.get(job_id)
+
+                frame = number_rows(frame, rows_read + 2)
+                chunk_rows = len(frame)
+                with span("import.chunk") as chunk_span:
+                    chunk_span.rows = chunk_rows
+                    if delivered:
+                        arrived = pd.Series([f"{job_id}-{row}" for row in frame.index], index=frame.index).isin(delivered)
+                        rows_written += int(arrived.sum())
+                        frame = frame[~arrived]
+                        delivered = set()
+                    rows, rejected = validate_chunk(frame, report_type, job["mapping"], existing)
+
+                    if not rows.empty:
+                        table = pd.DataFrame("", index=rows.index, columns=range(1, width + 1), dtype=object)
+                        for field, column in columns.items():
+                            table[column] = rows[field]
+                        table[key_column] = [f"{job_id}-{row}" for row in rows.index]
+                        self._append(job_id, title, table.to_numpy().tolist(), key_column)
+
+                if not rejected.empty:
+                    rejected.to_csv(rejected_path, mode="a", index=False,
+                                    header=not os.path.exists(rejected_path) or not os.path.getsize(rejected_path))
+                rows_read += chunk_rows
+                rows_written += len(rows)
+                rows_rejected += len(rejected)
+                self._renew(job_id, rows_read=rows_read, rows_written=rows_written, rows_rejected=rows_rejected,
+                            rejected_bytes=os.path.getsize(rejected_path) if os.path.exists(rejected_path) else 0,
+                            uncertain=0)
+                if on_progress:
+                    on_progress(self.get(job_id))
+
+            self._renew(job_id, status=DONE, finished_at=time.time())
+        except JobTaken:
+            raise
+        except Exception as e:
+            # uncertain is left as it is: set if an append of this chunk may have reached the sheet
+            self._renew(job_id, status=FAILED, last_error=str(e))
+            raise
+        finally:
+            self.sheet_cache.invalidate(title)
+        return self.get(job_id)
+
+
+@st.cache_resource(show_spinner=False)
+def get_bulk_importer():
+    """Creates the importer and starts its worker once per server process."""
+    importer = BulkImporter(get_google_services(), get_worksheet_cache(), get_case_index())
+    importer.start()
+    return importer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import reports from a CSV or Excel file into their worksheet.")
+    parser.add_argument("file", nargs="?", help="CSV or .xlsx file; the first row holds the column names")
+    parser.add_argument("--type", choices=list(report_type_map), default="Accident Report", help="report type of the rows")
+    parser.add_argument("--map", action="append", metavar="FIELD=COLUMN", help="take FIELD from COLUMN instead of the column named like it")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help=f"rows per append (default: {CHUNK_ROWS})")
+    parser.add_argument("--resume", metavar="JOB_ID", help="carry on with an earlier import from its last committed chunk")
+    parser.add_argument("--list", action="store_true", help="list the import jobs")
+    args = parser.parse_args()
+
+    importer = BulkImporter(get_google_services(), get_worksheet_cache(), get_case_index())
+    if args.list:
+        for job in importer.jobs():
+            print(f"{job['job_id']}  {job['status']:<8} {job['report_type']:<34} {job['source_name']}  "
+                  f"read {job['rows_read']}, written {job['rows_written']}, rejected {job['rows_rejected']}")
+        return
+    if args.resume:
+        job_id = args.resume
+        job = importer.get(job_id)
+        if job is None:
+            raise SystemExit(f"No import job {job_id}")
+        if job["status"] == DONE:
+            raise SystemExit(f"Import {job_id} is already done")
+        importer.resume(job_id)
+    elif args.file:
+        overrides = dict(pair.split("=", 1) for pair in args.map or [])
+        try:
+            mapping = map_columns(read_headers(args.file, args.file), args.type, overrides)
+        except ValueError as e:
+            raise SystemExit(str(e))
+        if report_type_map[args.type][0] not in mapping:
+            raise SystemExit(f"The file has no {report_type_map[args.type][0]} column; pass --map {report_type_map[args.type][0]}=COLUMN")
+        job_id = importer.create(args.type, args.file, mapping, chunk_rows=args.chunk_rows, status=RUNNING)
+        print(f"Import job {job_id}: {', '.join(f'{field} <- {column}' for field, column in mapping.items())}")
+        job = importer.get(job_id)
+        if job["runner"] != importer.runner:
+            # The same file and mapping were imported before; carry on with that job
+            if job["status"] == DONE:
+                raise SystemExit(f"This file was already imported as job {job_id}")
+            importer.resume(job_id)
+    else:
+        parser.error("give a file to import, --resume JOB_ID or --list")
+
+    def progress(job):
+        print(f"  read {job['rows_read']}, written {job['rows_written']}, rejected {job['rows_rejected']}", flush=True)
+
+    try:
+        with background():
+            job = importer.run(job_id, on_progress=progress)
+    except JobTaken as e:
+        raise SystemExit(f"{e}; follow it with: python -m bulk_import --list")
+    except Exception as e:
+        raise SystemExit(f"Import {job_id} stopped: {e}\nResume it with: python -m bulk_import --resume {job_id}")
+    print(f"Import {job_id} {job['status']}: {job['rows_written']} rows written, {job['rows_rejected']} rejected")
+    if job["rows_rejected"]:
+        print(f"Rejected rows: {job['rejected_path']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import bisect
+import threading
+import time
+
+import streamlit as st
+
+from google_services import get_google_services
+from sheet_cache import get_worksheet_cache
+
+# Headers the case number column has gone by
+CASE_NUMBER_HEADERS = ["Case Number", "case_number"]
+
+# Case numbers written by other clients show up after at most this long
+REFRESH_SECONDS = 60
+
+
+class CaseNumberIndex:
+    """Sorted set of the case numbers in AccidentReports, shared by every selectbox.
+
+    It is built from a read of the case-number column alone and rebuilt only when the
+    worksheet's data version changes (the app wrote to it) or REFRESH_SECONDS pass.
+    """
+
+    def __init__(self, services, sheet_cache, title="AccidentReports"):
+        self.services = services
+        self.sheet_cache = sheet_cache
+        self.title = title
+        self._lock = threading.Lock()
+        self._built_for = None  # (data version, built at)
+        self._case_numbers = []
+        self._sorted_keys = []  # lower-cased, sorted, for prefix lookups
+        self._by_key = {}
+
+    def _fresh(self):
+        return (self._built_for is not None and self._built_for[0] == self.sheet_cache.version(self.title)
+                and time.monotonic() - self._built_for[1] < REFRESH_SECONDS)
+
+    def _read_column(self):
+        headers = self.services.call_worksheet(self.title, lambda ws: ws.row_values(1))
+        column = next((headers.index(h) + 1 for h in CASE_NUMBER_HEADERS if h in headers), None)
+        if column is None:
+            return []
+        return self.services.call_worksheet(self.title, lambda ws: ws.col_values(column))[1:]
+
+    def refresh(self, force=False):
+        if self._fresh() and not force:
+            return
+        with self._lock:
+            if self._fresh() and not force:
+                return
+            version = self.sheet_cache.version(self.title)
+            values = [str(v).strip() for v in self._read_column()]
+            case_numbers = sorted(set(v for v in values if v))
+            self._by_key = {v.lower(): v for v in case_numbers}
+            self._sorted_keys = sorted(self._by_key)
+            self._case_numbers = case_numbers
+            self._built_for = (version, time.monotonic())
+
+    def case_numbers(self):
+        """All case numbers, sorted."""
+        self.refresh()
+        return list(self._case_numbers)
+
+    def lookup(self, query, limit=50):
+        """Case numbers starting with `query` (case-insensitive), topped up with ones containing it."""
+        self.refresh()
+        query = (query or "").strip().lower()
+        keys = self._sorted_keys
+        if not query:
+            return [self._by_key[k] for k in keys[:limit]]
+
+        start = bisect.bisect_left(keys, query)
+        matches = []
+        for key in keys[start:]:
+            if not key.startswith(query) or len(matches) >= limit:
+                break
+            matches.append(key)
+        if len(matches) < limit:
+            seen = set(matches)
+            matches += [k for k in keys if query in k and k not in seen][:limit - len(matches)]
+        return [self._by_key[k] for k in matches]
+
+    def __contains__(self, case_number):
+        self.refresh()
+        return str(case_number).strip().lower() in self._by_key
+
+
+@st.cache_resource(show_spinner=False)
+def get_case_index():
+    """Creates the case-number index once per server process."""
+    return CaseNumberIndex(get_google_services(), get_worksheet_cache())
@@ -0,0 +1,477 @@
+import datetime
+import functools
+import hashlib
+import io
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+
+import streamlit as st
+
+import storage
+from api_gateway import background
+from case_index import get_case_index
+from drive_uploads import get_upload_index, upload_files_to_drive
+from google_services import get_google_services
+from image_processing import JPEG_QUALITY, MAX_IMAGE_DIMENSION, prepare_image, thumbnail_name
+from report_records import DRIVER_FIELDS, VEHICLE_FIELDS, WITNESS_FIELDS, encode_list, encode_record
+from sheet_outbox import get_sheet_outbox
+
+logger = logging.getLogger(__name__)
+
+# Syncing: how often the engine wakes up, and the backoff between attempts while offline
+SYNC_INTERVAL_SECONDS = 5
+MAX_BACKOFF_SECONDS = 300
+
+# Sent drafts are listed for this long, then removed
+SENT_RETENTION_SECONDS = 7 * 24 * 3600
+
+# Evidence kept with a draft: group -> extension. Numbered groups hold several files (accident_image_0.jpg, ...);
+# the file names are the names the files get in Drive.
+MEDIA_GROUPS = {
+    "driver a_license": ".jpg",
+    "driver b_license": ".jpg",
+    "accident_video": ".mp4",
+    "accident_image": ".jpg",
+    "voice_note": ".mp3",
+}
+NUMBERED_MEDIA_GROUPS = ("accident_image", "voice_note")
+
+# Draft states
+DRAFT = "draft"  # being filled in
+READY = "ready"  # submitted, waiting to be synced
+SYNCING = "syncing"
+QUEUED = "queued"  # media uploaded and the row handed to the sheet outbox
+CONFLICT = "conflict"  # the case number is already in AccidentReports
+
+
+def media_name(group, position=0):
+    """Drive file name of a draft file, e.g. accident_image_3.jpg or driver a_license.jpg."""
+    if group in NUMBERED_MEDIA_GROUPS:
+        return f"{group}_{position}{MEDIA_GROUPS[group]}"
+    return f"{group}{MEDIA_GROUPS[group]}"
+
+
+def _numbered_urls(urls, group):
+    names = []
+    while media_name(group, len(names)) in urls:
+        names.append(media_name(group, len(names)))
+    return [urls[name] for name in names]
+
+
+def encode_value(value):
+    """JSON-safe form of a form value; dates and times are tagged so they come back as such."""
+    if isinstance(value, datetime.date):
+        return {"__date__": value.isoformat()}
+    if isinstance(value, datetime.time):
+        return {"__time__": value.isoformat()}
+    return value
+
+
+def decode_value(value):
+    if isinstance(value, dict) and "__date__" in value:
+        return datetime.date.fromisoformat(value["__date__"])
+    if isinstance(value, dict) and "__time__" in value:
+        return datetime.time.fromisoformat(value["__time__"])
+    return value
+
+
+def accident_report_row(report, urls):
+    """The AccidentReports row, and its extra thumbnail columns, for a submitted report and its uploaded media."""
+    image_urls = _numbered_urls(urls, "accident_image")
+    # Thumbnail URLs line up with the image URLs; a photo without a thumbnail uses itself
+    thumbnail_urls = [urls.get(thumbnail_name(media_name("accident_image", i))) or url for i, url in enumerate(image_urls)]
+    thumbnail_columns = {
+        "accident_image_thumbnail_urls": ', '.join(thumbnail_urls),
+        "driver_a_license_thumbnail_url": urls.get(thumbnail_name(media_name("driver a_license"))),
+        "driver_b_license_thumbnail_url": urls.get(thumbnail_name(media_name("driver b_license"))),
+    }
+    row = [
+        report["case_number"],
+        report["accident_date"],
+        report["num_vehicles"],
+        report["road_name"],
+        report["accident_time"],
+        report["police_station"],
+        report["police_reference_number"],
+        report["speed_limit"],
+        report["weather"],
+        report["road_condition"],
+        encode_list(report["vehicles"], VEHICLE_FIELDS),  # Vehicle Information (versioned JSON)
+        encode_record(report["driver_a"] + [urls.get(media_name("driver a_license"))], DRIVER_FIELDS),  # Driver A Info
+        encode_record(report["driver_b"] + [urls.get(media_name("driver b_license"))], DRIVER_FIELDS),  # Driver B Info
+        encode_list(report["witnesses"], WITNESS_FIELDS),  # Witness Information (versioned JSON)
+        ', '.join(image_urls),  # Accident Image URLs (Join list into string)
+        urls.get(media_name("accident_video")) or 'N/A',  # Handle missing video URL
+        ', '.join(_numbered_urls(urls, "voice_note")),  # Voice Note URLs (Join list into string)
+    ]
+    return row, {column: url for column, url in thumbnail_columns.items() if url}
+
+
+class UploadError(Exception):
+    """Some of a draft's files could not be uploaded; the draft is retried later."""
+
+
+class DraftStore:
+    """Accident reports kept on this server until they reach Google, keyed by case number.
+
+    The form saves its values (`save_fields`) and files (`save_media`) here as they are
+    entered, so a failed request to Google loses nothing and saving never waits on the
+    network. Every server session shares the store, so each draft records the `owner`
+    token of the form that started it: only that owner can read, list, open, send or
+    discard it. `submit` marks a draft ready; a background engine then syncs
+    ready drafts in dependency order: it checks the case number isn't already in
+    AccidentReports, uploads the files to Drive, and queues the row, with the files'
+    URLs, in the sheet outbox under the draft's receipt. Offline, drafts are retried with
+    backoff. A draft whose case number already exists is held as a conflict until it is
+    sent anyway or discarded.
+    """
+
+    def __init__(self, sheet_outbox, case_index, services, upload_index, image_settings=None, cold_folder_id=None,
+                 db_name="drafts.sqlite3"):
+        self.sheet_outbox = sheet_outbox
+        self.case_index = case_index
+        self.services = services
+        self.upload_index = upload_index
+        self.image_settings = image_settings or {}
+        self.cold_folder_id = cold_folder_id
+        self._conn = storage.connect(db_name)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS drafts ("
+            " case_number TEXT PRIMARY KEY, owner TEXT, fields_json TEXT NOT NULL DEFAULT '{}', report_json TEXT,"
+            " status TEXT NOT NULL, receipt TEXT, force INTEGER NOT NULL DEFAULT 0,"
+            " attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL DEFAULT 0, last_error TEXT,"
+            " created_at REAL NOT NULL, updated_at REAL NOT NULL, submitted_at REAL, synced_at REAL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS draft_media ("
+            " case_number TEXT NOT NULL, name TEXT NOT NULL, media_group TEXT NOT NULL, position INTEGER NOT NULL,"
+            " original_name TEXT, digest TEXT NOT NULL, size INTEGER NOT NULL, PRIMARY KEY (case_number, name))"
+        )
+        if "owner" not in {column[1] for column in self._conn.execute("PRAGMA table_info(drafts)")}:
+            # Drafts saved before drafts had owners can't be opened by anyone; submitted ones still sync
+            self._conn.execute("ALTER TABLE drafts ADD COLUMN owner TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS drafts_due ON drafts (status, next_attempt_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS drafts_owner ON drafts (owner, updated_at)")
+        # Drafts being synced when the process stopped are synced again; the receipt keeps the row from doubling
+        self._conn.execute("UPDATE drafts SET status = ? WHERE status = ?", (READY, SYNCING))
+        self._conn.execute("DELETE FROM drafts WHERE status = ? AND synced_at < ?", (QUEUED, time.time() - SENT_RETENTION_SECONDS))
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._delete_unused_files()
+
+    # Files are stored once per content hash, whichever drafts use them
+    def _file_path(self, digest):
+        return storage.data_path("draft_media", digest)
+
+    def _delete_unused_files(self):
+        folder = os.path.dirname(self._file_path("x"))
+        with self._lock:
+            used = {row[0] for row in self._conn.execute("SELECT digest FROM draft_media")}
+        for digest in set(os.listdir(folder)) - used:
+            path = os.path.join(folder, digest)
+            try:
+                # A file written moments ago may belong to a save_media call that hasn't recorded it yet
+                if os.path.getmtime(path) < time.time() - 3600:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    # Capture side
+    def get(self, case_number, owner):
+        """`owner`'s draft for a case number as a dict (form values decoded), or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT case_number, fields_json, status, receipt, last_error, updated_at FROM drafts"
+                " WHERE case_number = ? AND owner = ?",
+                (case_number, owner),
+            ).fetchone()
+        if row is None:
+            return None
+        fields = {key: decode_value(value) for key, value in json.loads(row[1]).items()}
+        return {"case_number": row[0], "fields": fields, "status": row[2], "receipt": row[3], "last_error": row[4],
+                "updated_at": row[5]}
+
+    def is_taken(self, case_number, owner):
+        """True when someone other than `owner` has a draft, submitted or not, for the case number."""
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM drafts WHERE case_number = ? AND owner IS NOT ?",
+                                      (case_number, owner)).fetchone() is not None
+
+    def drafts(self, owner):
+        """`owner`'s drafts with their status, file count and sync error, most recently changed first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT d.case_number, d.status, d.receipt, d.last_error, d.updated_at, COUNT(m.name) FROM drafts d"
+                " LEFT JOIN draft_media m ON m.case_number = d.case_number WHERE d.owner = ?"
+                " GROUP BY d.case_number ORDER BY d.updated_at DESC",
+                (owner,),
+            ).fetchall()
+        return [{"case_number": r[0], "status": r[1], "receipt": r[2], "last_error": r[3], "updated_at": r[4], "files": r[5]}
+                for r in rows]
+
+    def counts(self):
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM drafts GROUP BY status").fetchall())
+
+    def save_fields(self, case_number, fields, owner, previous=None):
+        """Stores `owner`'s draft form values; returns False, saving nothing, if the case was already
+        submitted here or another owner has a draft for it.
+
+        When the case number was changed from `previous`, that draft (and its files) moves to
+        the new number instead of leaving a stale copy behind.
+        """
+        fields_json = json.dumps({key: encode_value(value) for key, value in fields.items()}, default=str)
+        now = time.time()
+        with self._lock:
+            status = self._conn.execute("SELECT status, owner FROM drafts WHERE case_number = ?", (case_number,)).fetchone()
+            if status and (status[0] not in (DRAFT, CONFLICT) or status[1] != owner):
+                return False
+            if previous and previous != case_number and status is None:
+                self._conn.execute("UPDATE drafts SET case_number = ? WHERE case_number = ? AND owner = ? AND status = ?",
+                                   (case_number, previous, owner, DRAFT))
+                self._conn.execute("UPDATE draft_media SET case_number = ? WHERE case_number = ?"
+                                   " AND NOT EXISTS (SELECT 1 FROM drafts WHERE case_number = ?)",
+                                   (case_number, previous, previous))
+            # Editing a held conflict turns it back into a draft to be submitted again
+            self._conn.execute(
+                "INSERT INTO drafts (case_number, owner, fields_json, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (case_number) DO UPDATE SET fields_json = excluded.fields_json, status = excluded.status,"
+                " updated_at = excluded.updated_at",
+                (case_number, owner, fields_json, DRAFT, now, now),
+            )
+            self._conn.commit()
+        return True
+
+    def save_media(self, case_number, group, files, owner):
+        """Replaces `owner`'s draft files of one group (see MEDIA_GROUPS) with `files`, stored on local disk.
+
+        Returns False, saving nothing, if the case was already submitted here or isn't `owner`'s.
+        """
+        rows = []
+        for position, uploaded_file in enumerate(files):
+            data = uploaded_file.getvalue()
+            digest = hashlib.sha256(data).hexdigest()
+            path = self._file_path(digest)
+            if not os.path.exists(path):
+                with open(path + ".tmp", "wb") as out_file:
+                    out_file.write(data)
+                os.replace(path + ".tmp", path)
+            rows.append((case_number, media_name(group, position), group, position, getattr(uploaded_file, "name", None),
+                         digest, len(data)))
+        with self._lock:
+            status = self._conn.execute("SELECT status FROM drafts WHERE case_number = ? AND owner = ?",
+                                        (case_number, owner)).fetchone()
+            if status is None or status[0] not in (DRAFT, CONFLICT):
+                return False
+            self._conn.execute("DELETE FROM draft_media WHERE case_number = ? AND media_group = ?", (case_number, group))
+            self._conn.executemany(
+                "INSERT INTO draft_media (case_number, name, media_group, position, original_name, digest, size)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.execute("UPDATE drafts SET updated_at = ? WHERE case_number = ?", (time.time(), case_number))
+            self._conn.commit()
+        return True
+
+    def media(self, case_number, owner):
+        """(name, group, original name, size) of `owner`'s draft files."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT m.name, m.media_group, m.original_name, m.size FROM draft_media m"
+                " JOIN drafts d ON d.case_number = m.case_number WHERE m.case_number = ? AND d.owner = ?"
+                " ORDER BY m.media_group, m.position",
+                (case_number, owner),
+            ).fetchall()
+
+    def media_files(self, case_number):
+        """A draft's files as (in-memory file, name) pairs, in the order they are uploaded."""
+        with self._lock:
+            rows = self._conn.execute("SELECT media_group, position, name, digest FROM draft_media WHERE case_number = ?",
+                                      (case_number,)).fetchall()
+        order = list(MEDIA_GROUPS)
+        files = []
+        for _, _, name, digest in sorted(rows, key=lambda row: (order.index(row[0]), row[1])):
+            with open(self._file_path(digest), "rb") as in_file:
+                uploaded_file = io.BytesIO(in_file.read())
+            uploaded_file.name = name
+            files.append((uploaded_file, name))
+        return files
+
+    def submit(self, case_number, report, owner):
+        """Marks `owner`'s draft ready to sync with the report's row values; returns its receipt."""
+        with self._lock:
+            row = self._conn.execute("SELECT receipt FROM drafts WHERE case_number = ? AND owner = ?",
+                                     (case_number, owner)).fetchone()
+            if row is None:
+                raise KeyError(f"No draft for case {case_number}")
+            receipt = row[0] or uuid.uuid4().hex
+            self._conn.execute(
+                "UPDATE drafts SET status = ?, report_json = ?, receipt = ?, attempts = 0, next_attempt_at = 0,"
+                " last_error = NULL, submitted_at = ? WHERE case_number = ? AND owner = ?",
+                (READY, json.dumps(report, default=str), receipt, time.time(), case_number, owner),
+            )
+            self._conn.commit()
+        self._wake.set()
+        return receipt
+
+    def send_anyway(self, case_number, owner):
+        """Syncs `owner`'s conflicting draft although its case number is already in AccidentReports."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE drafts SET status = ?, force = 1, next_attempt_at = 0, last_error = NULL"
+                " WHERE case_number = ? AND owner = ? AND status = ?",
+                (READY, case_number, owner, CONFLICT),
+            )
+            self._conn.commit()
+        self._wake.set()
+
+    def retry_now(self, case_number, owner):
+        with self._lock:
+            self._conn.execute("UPDATE drafts SET next_attempt_at = 0 WHERE case_number = ? AND owner = ? AND status = ?",
+                               (case_number, owner, READY))
+            self._conn.commit()
+        self._wake.set()
+
+    def discard(self, case_number, owner):
+        """Deletes `owner`'s draft and its files (a draft that is being synced is kept)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM drafts WHERE case_number = ? AND owner = ? AND status != ?",
+                               (case_number, owner, SYNCING))
+            self._conn.execute("DELETE FROM draft_media WHERE case_number = ?"
+                               " AND NOT EXISTS (SELECT 1 FROM drafts WHERE case_number = ?)", (case_number, case_number))
+            self._conn.commit()
+        self._delete_unused_files()
+
+    # Sync engine
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="draft-sync", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(SYNC_INTERVAL_SECONDS)
+            self._wake.clear()
+            try:
+                # Syncs yield the API quota to users waiting on a page
+                with background():
+                    while self.sync_once():
+                        pass
+            except Exception:
+                logger.exception("Draft sync failed")
+
+    def _claim_due(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT case_number, report_json, receipt, force, attempts FROM drafts"
+                " WHERE status = ? AND next_attempt_at <= ? ORDER BY submitted_at LIMIT 1",
+                (READY, time.time()),
+            ).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE drafts SET status = ? WHERE case_number = ?", (SYNCING, row[0]))
+                self._conn.commit()
+        return row
+
+    def _finish(self, case_number, status, error=None):
+        with self._lock:
+            self._conn.execute("UPDATE drafts SET status = ?, last_error = ?, synced_at = ? WHERE case_number = ?",
+                               (status, error, time.time() if status == QUEUED else None, case_number))
+            if status == QUEUED:
+                # The files are in Drive now; the local copies are no longer needed
+                self._conn.execute("DELETE FROM draft_media WHERE case_number = ?", (case_number,))
+            self._conn.commit()
+
+    def _retry_later(self, case_number, attempts, error):
+        attempts += 1
+        delay = min(2 ** attempts, MAX_BACKOFF_SECONDS) * (0.5 + random.random())
+        with self._lock:
+            self._conn.execute(
+                "UPDATE drafts SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE case_number = ?",
+                (READY, attempts, time.time() + delay, str(error), case_number),
+            )
+            self._conn.commit()
+
+    def _upload_media(self, case_number):
+        """Uploads a draft's files (photos downscaled, with thumbnails) and returns {name: url}."""
+        files = self.media_files(case_number)
+        evidence, photos = [], []
+        for uploaded_file, name in files:
+            if name.endswith(".jpg"):
+                photos.append((uploaded_file, name))
+                prepared = prepare_image(
+                    uploaded_file,
+                    max_dimension=int(self.image_settings.get("MAX_DIMENSION", MAX_IMAGE_DIMENSION)),
+                    quality=int(self.image_settings.get("JPEG_QUALITY", JPEG_QUALITY)),
+                )
+                evidence.append((prepared.image, name))
+                if prepared.thumbnail is not None:
+                    evidence.append((prepared.thumbnail, thumbnail_name(name)))
+            else:
+                evidence.append((uploaded_file, name))
+        if not evidence:
+            return {}
+
+        # The sync engine runs outside any Streamlit session, so it uses the handles it was given
+        upload = functools.partial(upload_files_to_drive, services=self.services, index=self.upload_index)
+        results = upload([f for f, _ in evidence], [name for _, name in evidence])
+        # Full-size photo originals are also kept in the cold folder when there is one, but never downloaded by the app
+        if self.cold_folder_id and photos:
+            results += upload([f for f, _ in photos], [f"original_{name}" for _, name in photos],
+                              folder_id=self.cold_folder_id)
+        errors = [f"{r.filename}: {r.error}" for r in results if r.error]
+        if errors:
+            raise UploadError("; ".join(errors))
+        return {r.filename: r.url for r in results}
+
+    def sync_once(self):
+        """Syncs one due draft; returns False when nothing was due."""
+        claimed = self._claim_due()
+        if claimed is None:
+            return False
+        case_number, report_json, receipt, force, attempts = claimed
+
+        try:
+            # A draft whose row was already queued before a restart only needs its status updated
+            if self.sheet_outbox.status(receipt) is None:
+                if not force:
+                    self.case_index.refresh(force=True)
+                    if case_number in self.case_index:
+                        self._finish(case_number, CONFLICT, f"Case number {case_number} is already in AccidentReports.")
+                        return True
+                # Media first, so the row goes out with the URLs of its files
+                urls = self._upload_media(case_number)
+                row, extra = accident_report_row(json.loads(report_json), urls)
+                self.sheet_outbox.enqueue("AccidentReports", row, extra=extra, receipt=receipt)
+        except Exception as e:
+            logger.warning("Syncing draft %s failed: %s", case_number, e)
+            self._retry_later(case_number, attempts, e)
+            return True
+
+        self._finish(case_number, QUEUED)
+        return True
+
+
+@st.cache_resource(show_spinner=False)
+def get_draft_store():
+    """Creates the draft store and starts its sync engine once per server process.
+
+    Photo processing is configured in the [images] secrets; full-size originals are also
+    kept in [drive] COLD_FOLDER_ID when it is set.
+    """
+    store = DraftStore(get_sheet_outbox(), get_case_index(), get_google_services(), get_upload_index(),
+                       image_settings=dict(st.secrets.get("images", {})),
+                       cold_folder_id=st.secrets.get("drive", {}).get("COLD_FOLDER_ID"))
+    store.start()
+    return store
@@ -0,0 +1,337 @@
+import hashlib
+import logging
+import mimetypes
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import httplib2
+import streamlit as st
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaIoBaseUpload
+
+import storage
+from google_services import get_google_services
+from tracing import span
+
+logger = logging.getLogger(__name__)
+# Anyone with the link can view uploaded evidence
+PUBLIC_PERMISSION = {'role': 'reader', 'type': 'anyone'}
+
+# Bulk uploads: worker threads sending file bodies, and Drive's limit on calls per batch request
+MAX_UPLOAD_WORKERS = 6
+BATCH_LIMIT = 100
+UPLOAD_TIMEOUT_SECONDS = 120
+
+# Streaming uploads: audio/video (and any large file) go up resumably in chunks of this size
+STREAMED_MIME_PREFIXES = ("video/", "audio/")
+STREAM_THRESHOLD_BYTES = 8 * 1024 * 1024
+CHUNK_SIZE = 4 * 1024 * 1024  # must be a multiple of 256 KB
+MAX_CHUNK_RETRIES = 5
+PROGRESS_INTERVAL_SECONDS = 0.5
+RETRYABLE_STATUSES = (408, 429, 500, 502, 503, 504)
+
+# Outcome of one file in a bulk upload; url is None when error is set
+UploadResult = namedtuple("UploadResult", ["filename", "url", "error"])
+
+_thread_local = threading.local()
+
+
+def drive_file_url(file_id):
+    return f"https://drive.google.com/uc?id={file_id}"
+
+
+def upload_key(uploaded_file, filename):
+    """Content address of an upload: hash of its bytes plus the name it is stored under."""
+    digest = hashlib.sha256(uploaded_file.getbuffer()).hexdigest()
+    return f"{digest}:{filename}"
+
+
+class UploadIndex:
+    """Maps upload keys to Drive files, in memory and in SQLite so it survives restarts."""
+
+    def __init__(self, db_name="uploads.sqlite3"):
+        self._conn = storage.connect(db_name)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS uploads ("
+            " key TEXT PRIMARY KEY, file_id TEXT NOT NULL, url TEXT NOT NULL,"
+            " filename TEXT, size INTEGER, created_at REAL)"
+        )
+        self._conn.commit()
+        self._memory = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def lock_for(self, key):
+        """Lock held while a key is being uploaded and shared, so two sessions never upload the same bytes.
+
+        Callers holding several of these take them in sorted key order, so overlapping uploads can't deadlock.
+        """
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(self, key):
+        url = self._memory.get(key)
+        if url:
+            return url
+        with self._lock:
+            row = self._conn.execute("SELECT url FROM uploads WHERE key = ?", (key,)).fetchone()
+        if row:
+            self._memory[key] = row[0]
+            return row[0]
+        return None
+
+    def put(self, key, file_id, url, filename, size):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO uploads (key, file_id, url, filename, size, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, file_id, url, filename, size, time.time()),
+            )
+            self._conn.commit()
+        self._memory[key] = url
+
+    def forget(self, key):
+        """Removes a key, e.g. when the Drive file it points to was deleted."""
+        with self._lock:
+            self._conn.execute("DELETE FROM uploads WHERE key = ?", (key,))
+            self._conn.commit()
+        self._memory.pop(key, None)
+
+
+@st.cache_resource(show_spinner=False)
+def get_upload_index():
+    """Creates the upload index once per server process."""
+    return UploadIndex()
+
+
+def _thread_http(credentials):
+    """Authorized HTTP object for the current thread; httplib2 connections can't be shared across threads."""
+    http = getattr(_thread_local, "http", None)
+    if http is None:
+        http = AuthorizedHttp(credentials, http=httplib2.Http(timeout=UPLOAD_TIMEOUT_SECONDS))
+        _thread_local.http = http
+    return http
+
+
+def _should_stream(filename, size):
+    mimetype = mimetypes.guess_type(filename)[0] or ""
+    return mimetype.startswith(STREAMED_MIME_PREFIXES) or size > STREAM_THRESHOLD_BYTES
+
+
+def _is_retryable(error):
+    if isinstance(error, HttpError):
+        return error.resp.status in RETRYABLE_STATUSES
+    return isinstance(error, (ConnectionError, TimeoutError, httplib2.HttpLib2Error))
+
+
+def _send_resumable(gateway, request, http=None, on_progress=None):
+    """Sends a resumable upload chunk by chunk, continuing from the last acknowledged byte after errors."""
+    response = None
+    failures = 0
+    while response is None:
+        try:
+            # Chunks are retried here (resuming where Drive left off), so the gateway only meters them
+            status, response = gateway.call("drive", lambda: request.next_chunk(http=http), max_retries=0, name="drive.chunk")
+        except Exception as e:
+            failures += 1
+            if not _is_retryable(e) or failures > MAX_CHUNK_RETRIES:
+                raise
+            # The next call asks Drive how much it already has and resumes from there
+            time.sleep(min(2 ** failures, 30) + random.random())
+            continue
+        failures = 0
+        if status and on_progress:
+            on_progress(status.resumable_progress)
+    return response
+
+
+def _create_drive_file(gateway, drive_service, uploaded_file, filename, folder_id=None, http=None, on_progress=None):
+    """Uploads the bytes to Drive (without sharing them) and returns the new file id.
+
+    The body is read straight from the in-memory upload buffer. Videos, voice notes and
+    anything over STREAM_THRESHOLD_BYTES are sent as a resumable upload in CHUNK_SIZE pieces;
+    `on_progress(bytes_sent)` is called after each acknowledged chunk.
+    """
+    size = uploaded_file.getbuffer().nbytes
+    uploaded_file.seek(0)
+
+    # Set up file metadata for Google Drive
+    file_metadata = {'name': filename}
+    if folder_id:
+        file_metadata['parents'] = [folder_id]  # Optional: specify folder
+
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    if _should_stream(filename, size):
+        media = MediaIoBaseUpload(uploaded_file, mimetype=mimetype, chunksize=CHUNK_SIZE, resumable=True)
+        request = drive_service.files().create(body=file_metadata, media_body=media, fields='id')
+        uploaded_file_drive = _send_resumable(gateway, request, http=http, on_progress=on_progress)
+    else:
+        media = MediaIoBaseUpload(uploaded_file, mimetype=mimetype, resumable=False)
+        request = drive_service.files().create(body=file_metadata, media_body=media, fields='id')
+        # A create that failed with a 5xx may still have made the file, so only 429s are retried
+        uploaded_file_drive = gateway.call("drive", lambda: request.execute(http=http), idempotent=False, name="drive.create")
+        if on_progress:
+            on_progress(size)
+
+    return uploaded_file_drive['id']
+
+
+def _make_public(gateway, drive_service, file_id, http=None):
+    request = drive_service.permissions().create(fileId=file_id, body=PUBLIC_PERMISSION)
+    gateway.call("drive", lambda: request.execute(http=http), name="drive.permissions")
+
+
+def _make_public_batch(gateway, drive_service, file_ids, http=None):
+    """Grants public read access to many files using Drive batch requests; returns {file_id: error}."""
+    errors = {}
+
+    def callback(request_id, response, exception):
+        if exception is not None:
+            errors[request_id] = exception
+
+    for start in range(0, len(file_ids), BATCH_LIMIT):
+        chunk = file_ids[start:start + BATCH_LIMIT]
+        batch = drive_service.new_batch_http_request(callback=callback)
+        for file_id in chunk:
+            batch.add(drive_service.permissions().create(fileId=file_id, body=PUBLIC_PERMISSION), request_id=file_id)
+        # Each request inside a batch counts against the quota separately
+        gateway.call("drive", lambda: batch.execute(http=http), cost=len(chunk), name="drive.permissions_batch")
+    return errors
+
+
+def _delete_unshared(gateway, drive_service, file_ids, http=None):
+    """Deletes files that were uploaded but couldn't be shared, so they aren't left orphaned in Drive."""
+    for file_id in file_ids:
+        request = drive_service.files().delete(fileId=file_id)
+        try:
+            gateway.call("drive", lambda: request.execute(http=http), name="drive.delete")
+        except Exception as e:
+            logger.warning("Deleting unshared Drive file %s failed: %s", file_id, e)
+
+
+def upload_file_to_drive(uploaded_file, filename, folder_id=None, on_progress=None):
+    """Uploads a file to Google Drive and returns the file's public URL.
+
+    Uploads are keyed by a hash of the file's bytes plus `filename`; if that key was
+    uploaded before (in any session, or before a restart) the stored URL is returned
+    without calling Drive. `on_progress(bytes_sent, total_bytes)` reports streamed uploads.
+    """
+    index = get_upload_index()
+    key = upload_key(uploaded_file, filename)
+
+    url = index.get(key)
+    if url:
+        return url
+
+    with index.lock_for(key):
+        # Another session may have finished the same upload while we waited
+        url = index.get(key)
+        if url:
+            return url
+
+        services = get_google_services()
+        drive_service = services.drive
+        # The Drive service is shared by every session; each thread sends on its own connection
+        http = _thread_http(services.credentials)
+        total = uploaded_file.getbuffer().nbytes
+        progress = (lambda sent: on_progress(sent, total)) if on_progress else None
+        file_id = _create_drive_file(services.gateway, drive_service, uploaded_file, filename, folder_id, http=http,
+                                     on_progress=progress)
+        try:
+            _make_public(services.gateway, drive_service, file_id, http=http)
+        except Exception:
+            _delete_unshared(services.gateway, drive_service, [file_id], http=http)
+            raise
+        url = drive_file_url(file_id)
+        index.put(key, file_id, url, filename, uploaded_file.getbuffer().nbytes)
+        return url
+
+
+def upload_files_to_drive(files, filenames, folder_id=None, max_workers=MAX_UPLOAD_WORKERS, on_progress=None,
+                          services=None, index=None):
+    """Uploads many files concurrently and returns an UploadResult per file, in input order.
+
+    File bodies are sent from a bounded thread pool; the public-sharing permissions for all
+    new files are then granted in Drive batch requests instead of one call per file. Files
+    already in the upload index are returned without any API call. `on_progress(bytes_sent,
+    total_bytes)` is called from the calling thread, so it may update Streamlit widgets.
+    Background threads pass `services` and `index` in; pages get the process-wide ones.
+    """
+    index = index or get_upload_index()
+    services = services or get_google_services()
+    drive_service = services.drive
+    keys = [upload_key(f, name) for f, name in zip(files, filenames)]
+    results = [None] * len(keys)
+
+    # Same bytes under the same name only need uploading once per call
+    first_position = {}
+    for position, key in enumerate(keys):
+        first_position.setdefault(key, position)
+
+    def upload_one(position):
+        uploaded_file, filename = files[position], filenames[position]
+        return _create_drive_file(services.gateway, drive_service, uploaded_file, filename, folder_id,
+                                  http=_thread_http(services.credentials),
+                                  on_progress=lambda sent: sent_bytes.__setitem__(position, sent))
+
+    # Every key is locked until its file is shared and indexed, so a concurrent upload of the same bytes waits
+    # for the public URL rather than getting a private one; sorted so overlapping calls can't deadlock
+    locks = [index.lock_for(key) for key in sorted(first_position)]
+    for lock in locks:
+        lock.acquire()
+    try:
+        positions = []
+        for key, position in first_position.items():
+            url = index.get(key)
+            if url:
+                results[position] = UploadResult(filenames[position], url, None)
+            else:
+                positions.append(position)
+        positions.sort()
+
+        new_files = {}  # file_id -> position
+        sent_bytes = {}  # position -> bytes acknowledged so far, written by the workers
+        total_bytes = sum(files[position].getbuffer().nbytes for position in positions)
+        with span("drive.upload_batch") as batch_span, \
+                ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(positions) or 1))) as pool:
+            batch_span.rows, batch_span.bytes = len(positions), total_bytes
+            futures = {pool.submit(upload_one, position): position for position in positions}
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=PROGRESS_INTERVAL_SECONDS, return_when=FIRST_COMPLETED)
+                for future in done:
+                    position = futures[future]
+                    try:
+                        new_files[future.result()] = position
+                    except Exception as e:
+                        results[position] = UploadResult(filenames[position], None, str(e))
+                    sent_bytes[position] = files[position].getbuffer().nbytes
+                if on_progress:
+                    on_progress(sum(sent_bytes.values()), total_bytes)
+
+        if new_files:
+            http = _thread_http(services.credentials)
+            try:
+                errors = _make_public_batch(services.gateway, drive_service, list(new_files), http=http)
+            except Exception as e:
+                errors = {file_id: e for file_id in new_files}
+            for file_id, position in new_files.items():
+                if file_id in errors:
+                    results[position] = UploadResult(filenames[position], None, str(errors[file_id]))
+                    continue
+                url = drive_file_url(file_id)
+                index.put(keys[position], file_id, url, filenames[position], files[position].getbuffer().nbytes)
+                results[position] = UploadResult(filenames[position], url, None)
+            _delete_unshared(services.gateway, drive_service, list(errors), http=http)
+    finally:
+        for lock in locks:
+            lock.release()
+
+    for position, key in enumerate(keys):
+        if results[position] is None:
+            first = results[first_position[key]]
+            results[position] = UploadResult(filenames[position], first.url, first.error)
+    return results
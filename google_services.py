@@ -0,0 +1,212 @@
+import logging
+import threading
+import time
+
+import gspread
+import requests
+import streamlit as st
+from google.auth.transport.requests import Request
+from google.oauth2 import service_account
+
+from api_gateway import QUOTAS, ApiGateway
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Define the scopes for accessing Google Sheets and Google Drive
+SCOPES = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+
+# Worksheets the app reads from and writes to
+WORKSHEET_NAMES = [
+    "AccidentReports",
+    "InjuryAssessment",
+    "Claims",
+    "SupplierClaims",
+    "MedicalReports",
+    "SAPReports",
+]
+
+# Handles older than this are rebuilt on next use, even if nothing failed
+HANDLE_MAX_AGE_SECONDS = 60 * 60
+
+# Errors that mean a cached handle no longer points at anything usable
+STALE_HANDLE_ERRORS = (gspread.exceptions.WorksheetNotFound, gspread.exceptions.SpreadsheetNotFound,
+                       requests.exceptions.ConnectionError)
+
+
+def is_stale_handle_error(error):
+    """True when an error means the handle should be rebuilt rather than reported."""
+    if isinstance(error, STALE_HANDLE_ERRORS):
+        return True
+    return isinstance(error, gspread.exceptions.APIError) and error.code in (401, 404)
+
+
+class GoogleServices:
+    """Process-wide holder for the Sheets client, spreadsheet, worksheets and Drive service."""
+
+    def __init__(self, service_account_info, sheet_url, gateway=None):
+        self.sheet_url = sheet_url
+        # Every Sheets and Drive call goes through the gateway's quota buckets and retries
+        self.gateway = gateway or ApiGateway()
+        self.credentials = service_account.Credentials.from_service_account_info(service_account_info).with_scopes(SCOPES)
+        self._lock = threading.RLock()
+        self._build_locks = {}  # name -> lock held while that handle is built
+        self._header_lock = threading.Lock()
+        self._handles = {}  # name -> (handle, created_at)
+        self._build_seconds = {}  # name -> seconds it took to build that handle
+        self._header_columns = {}  # (title, header) -> 1-based column number
+        self.reruns_served = 0
+
+    # Credentials and handles
+    def _ensure_credentials(self):
+        # Authorized sessions refresh on demand as well, this only avoids building a handle on an expired token
+        if not self.credentials.valid:
+            self.credentials.refresh(Request())
+
+    def _cached(self, name):
+        with self._lock:
+            cached = self._handles.get(name)
+            if cached and time.monotonic() - cached[1] < HANDLE_MAX_AGE_SECONDS:
+                return cached[0]
+            return None
+
+    def _get(self, name, factory, api=None):
+        """The cached handle `name`, built with factory() (an `api` call through the gateway) when missing or old."""
+        handle = self._cached(name)
+        if handle is not None:
+            return handle
+
+        # Quota is waited for before any lock is taken, so a background caller short of tokens
+        # never holds up a user's page; builds of different handles don't wait for each other
+        if api:
+            self.gateway.reserve(api)
+        with self._lock:
+            build_lock = self._build_locks.setdefault(name, threading.Lock())
+        with build_lock:
+            handle = self._cached(name)
+            if handle is not None:
+                return handle
+            self._ensure_credentials()
+            started = time.perf_counter()
+            with span(f"google.build:{name.split(':')[0]}"):
+                handle = self.gateway.call(api, factory, reserved=True) if api else factory()
+            with self._lock:
+                self._build_seconds[name] = time.perf_counter() - started
+                self._handles[name] = (handle, time.monotonic())
+            return handle
+
+    def invalidate(self, name=None):
+        """Drops one cached handle (or all of them) so it is rebuilt on next use."""
+        with self._lock:
+            if name is None:
+                self._handles.clear()
+            elif name == "spreadsheet":
+                # Worksheets hang off the spreadsheet, so they go with it
+                self._handles = {k: v for k, v in self._handles.items() if not k.startswith("worksheet:") and k != "spreadsheet"}
+            else:
+                self._handles.pop(name, None)
+
+    @property
+    def client(self):
+        return self._get("client", lambda: gspread.authorize(self.credentials))
+
+    @property
+    def spreadsheet(self):
+        return self._get("spreadsheet", lambda: self.client.open_by_url(self.sheet_url), api="sheets_read")
+
+    @property
+    def drive(self):
+        # The discovery client is slow to import, and pages that never touch Drive shouldn't pay for it.
+        # The service is shared across threads, so requests are executed with the caller's own http
+        from googleapiclient.discovery import build
+
+        return self._get("drive", lambda: build('drive', 'v3', credentials=self.credentials, cache_discovery=False))
+
+    def worksheet(self, title):
+        """Returns the cached worksheet handle for `title`, opening it on first use."""
+        handle = self._cached(f"worksheet:{title}")
+        if handle is not None:
+            return handle
+        # Opened first, so building the worksheet never waits on the spreadsheet's build
+        spreadsheet = self.spreadsheet
+        return self._get(f"worksheet:{title}", lambda: spreadsheet.worksheet(title), api="sheets_read")
+
+    def call_worksheet(self, title, func, write=False, idempotent=True):
+        """Runs func(worksheet) through the API gateway, rebuilding the handle once if it turned out to be stale.
+
+        Pass write=True for calls that change the sheet (they use the write quota) and
+        idempotent=False for ones that must not be repeated after a server error, like appends.
+        """
+        api = "sheets_write" if write else "sheets_read"
+        try:
+            return self.gateway.call(api, lambda: func(self.worksheet(title)), idempotent=idempotent, name=f"{api}:{title}")
+        except Exception as e:
+            if not is_stale_handle_error(e):
+                raise
+            logger.info("Worksheet handle for %s is stale, rebuilding", title)
+            self.invalidate("spreadsheet")
+            # Google may have applied the call before the connection dropped, so only
+            # calls that are safe to repeat are retried; not-found and 401 were rejected
+            if not idempotent and isinstance(e, requests.exceptions.ConnectionError):
+                raise
+            return self.gateway.call(api, lambda: func(self.worksheet(title)), idempotent=idempotent, name=f"{api}:{title}")
+
+    def header_column(self, title, header):
+        """1-based column of `header` in the worksheet's header row, adding it after the last used column if missing."""
+        key = (title, header)
+        if key in self._header_columns:
+            return self._header_columns[key]
+        # A lock of its own: it is held across Sheets calls, which must not hold up handle lookups
+        with self._header_lock:
+            if key not in self._header_columns:
+                headers = self.call_worksheet(title, lambda ws: ws.row_values(1))
+                if header in headers:
+                    column = headers.index(header) + 1
+                else:
+                    # Rows are often written wider than the header row, so the new column goes after the
+                    # whole grid; after the last header it could land inside existing data. The handle is
+                    # reopened first so its column count is current.
+                    self.invalidate(f"worksheet:{title}")
+
+                    def add_header(ws):
+                        column = max(len(headers), ws.col_count) + 1
+                        ws.add_cols(column - ws.col_count)
+                        ws.update_cell(1, column, header)
+                        return column
+
+                    column = self.call_worksheet(title, add_header, write=True, idempotent=False)
+                self._header_columns[key] = column
+            return self._header_columns[key]
+
+    # Reporting
+    def mark_rerun(self):
+        """Counts a rerun that reused the cached handles instead of building them again."""
+        with self._lock:
+            self.reruns_served += 1
+        logger.debug("Reused Google handles, saved %.3fs on this rerun", self.seconds_saved_per_rerun())
+
+    def seconds_saved_per_rerun(self):
+        """Time a rerun would spend building every handle the app opens at startup."""
+        with self._lock:
+            return sum(self._build_seconds.values())
+
+    def stats(self):
+        with self._lock:
+            per_rerun = sum(self._build_seconds.values())
+            return {
+                "handles": sorted(self._handles),
+                "build_seconds": dict(self._build_seconds),
+                "reruns_served": self.reruns_served,
+                "seconds_saved_per_rerun": per_rerun,
+                "seconds_saved_total": per_rerun * max(self.reruns_served - 1, 0),
+            }
+
+
+@st.cache_resource(show_spinner=False)
+def get_google_services():
+    """Creates the shared Google connection layer once per server process."""
+    # Quotas can be lowered (or raised for a project with a bigger allowance) in the [quotas] secrets
+    overrides = st.secrets.get("quotas", {})
+    quotas = {api: (int(overrides.get(f"{api.upper()}_PER_MINUTE", per_minute)), capacity)
+              for api, (per_minute, capacity) in QUOTAS.items()}
+    return GoogleServices(st.secrets["gcp_service_account"], st.secrets["sheets"]["SHEET_URL"], ApiGateway(quotas))
@@ -0,0 +1,131 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pdfkit
+import streamlit as st
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+try:
+    # In-process renderer, so no document starts a subprocess. It needs the Pango system libraries;
+    # without them the import fails and wkhtmltopdf (through pdfkit) is used instead.
+    from weasyprint import HTML as WeasyHTML
+except (ImportError, OSError) as e:
+    logger.warning("WeasyPrint is not available (%s); rendering PDFs with wkhtmltopdf", e)
+    WeasyHTML = None
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+# Template of each report type
+REPORT_TEMPLATES = {
+    "Accident Report": "accident_report.html",
+    "Serious Injury Assessment Report": "injury_assessment.html",
+    "RAF 1 Form": "raf1_form.html",
+    "SUPPLIER CLAIM FORM": "supplier_claim.html",
+}
+
+# Rendered PDFs kept in memory, so re-downloading an unchanged report costs nothing
+PDF_CACHE_ENTRIES = 64
+
+# wkhtmltopdf processes run at once by render_many, when it falls back to them
+MAX_RENDER_WORKERS = 4
+
+PDFKIT_OPTIONS = {"quiet": "", "encoding": "UTF-8"}
+
+
+class HtmlPdfRenderer:
+    """Renders the HTML report templates and turns them into PDF bytes.
+
+    Templates are compiled once (Jinja2, autoescaped, no reload checks) and reused for
+    every document. PDFs are produced in memory and in-process by WeasyPrint. Only where
+    WeasyPrint can't be loaded does it fall back to a wkhtmltopdf subprocess per document,
+    with its configuration resolved once instead of on every call. Identical documents
+    are served from a small in-memory cache.
+    """
+
+    def __init__(self, template_dir=TEMPLATE_DIR):
+        self.env = Environment(
+            loader=FileSystemLoader(template_dir),
+            autoescape=select_autoescape(["html"]),
+            auto_reload=False,
+        )
+        self._templates = {}
+        self._pdfkit_config = None
+        self._lock = threading.Lock()
+        self._pdf_cache = OrderedDict()
+
+    def template(self, report_type):
+        with self._lock:
+            if report_type not in self._templates:
+                name = REPORT_TEMPLATES.get(report_type)
+                self._templates[report_type] = self.env.get_template(name) if name else None
+            return self._templates[report_type]
+
+    def render_html(self, report_type, first_responder_info, report_data):
+        """The report's HTML, with every field escaped."""
+        template = self.template(report_type)
+        if template is None:
+            return "<p>Report type not recognized</p>"
+        return template.render(responder=first_responder_info or {}, report=report_data or {})
+
+    def _pdfkit_configuration(self):
+        with self._lock:
+            if self._pdfkit_config is None:
+                self._pdfkit_config = pdfkit.configuration()
+            return self._pdfkit_config
+
+    def to_pdf(self, html_content):
+        """PDF bytes for an HTML document."""
+        key = hashlib.sha256(html_content.encode()).hexdigest()
+        with self._lock:
+            if key in self._pdf_cache:
+                self._pdf_cache.move_to_end(key)
+                return self._pdf_cache[key]
+
+        with span("pdf.html_to_pdf") as s:
+            if WeasyHTML is not None:
+                pdf_bytes = WeasyHTML(string=html_content).write_pdf()
+            else:
+                pdf_bytes = pdfkit.from_string(html_content, False, options=PDFKIT_OPTIONS,
+                                               configuration=self._pdfkit_configuration())
+            s.bytes = len(pdf_bytes)
+
+        with self._lock:
+            self._pdf_cache[key] = pdf_bytes
+            while len(self._pdf_cache) > PDF_CACHE_ENTRIES:
+                self._pdf_cache.popitem(last=False)
+        return pdf_bytes
+
+    def render_pdf(self, report_type, first_responder_info, report_data):
+        return self.to_pdf(self.render_html(report_type, first_responder_info, report_data))
+
+    def render_many(self, documents, max_workers=MAX_RENDER_WORKERS):
+        """PDFs for many (report_type, first_responder_info, report_data) documents in one call.
+
+        Returns a list in input order of (pdf_bytes, error) with one of the two None.
+        """
+        html_documents = [self.render_html(*document) for document in documents]
+
+        def render(html_content):
+            try:
+                return self.to_pdf(html_content), None
+            except Exception as e:
+                return None, e
+
+        # WeasyPrint renders in this process; wkhtmltopdf jobs are subprocesses and can overlap
+        workers = 1 if WeasyHTML is not None else max_workers
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(html_documents) or 1))) as pool:
+            return list(pool.map(render, html_documents))
+
+
+@st.cache_resource(show_spinner=False)
+def get_html_pdf_renderer():
+    """Creates the HTML report renderer once per server process."""
+    return HtmlPdfRenderer()
@@ -0,0 +1,146 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+
+import storage
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Downloaded report images are kept on disk up to this size, least recently used evicted first
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+# Images used this recently are never evicted, so a PDF being built can't lose its files
+EVICTION_GRACE_SECONDS = 10 * 60
+
+# Parallel downloads per report, and (connect, read) timeouts in seconds
+MAX_FETCH_WORKERS = 8
+FETCH_TIMEOUT = (5, 30)
+
+# Formats FPDF can embed, recognised by their first bytes
+IMAGE_SIGNATURES = [
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+]
+
+
+def image_extension(content):
+    """The file extension for image bytes, or None if FPDF can't embed them."""
+    return next((ext for signature, ext in IMAGE_SIGNATURES if content.startswith(signature)), None)
+
+
+class ImageCache:
+    """Local copies of report images (licence scans, accident photos) for PDF generation.
+
+    Files are named after the SHA-256 of their URL, so two URLs never collide, and get
+    the extension of their actual format (Drive links have none, and FPDF picks the
+    decoder by extension). Downloads share one pooled requests.Session with timeouts and
+    run in parallel; a URL being downloaded by one thread is waited for, not fetched twice.
+    """
+
+    def __init__(self, directory=None, max_bytes=MAX_CACHE_BYTES):
+        self.directory = directory or storage.data_path("images")
+        os.makedirs(self.directory, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_FETCH_WORKERS * 2, max_retries=2)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._guard = threading.Lock()
+        self._url_locks = {}
+        self._evict_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _lock_for(self, key):
+        with self._guard:
+            return self._url_locks.setdefault(key, threading.Lock())
+
+    def _cached_path(self, key):
+        for ext in dict.fromkeys(ext for _, ext in IMAGE_SIGNATURES):
+            path = os.path.join(self.directory, key + ext)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _evict(self):
+        """Deletes the least recently used images until the cache fits in max_bytes."""
+        cutoff = time.time() - EVICTION_GRACE_SECONDS
+        with self._evict_lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+            total = sum(size for _, size, _ in entries)
+            for mtime, size, name in sorted(entries):
+                if total <= self.max_bytes or mtime > cutoff:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def get(self, url):
+        """Local path of the image at `url`, downloading it only if it isn't cached yet."""
+        key = hashlib.sha256(url.encode()).hexdigest()
+        with self._lock_for(key):
+            path = self._cached_path(key)
+            if path:
+                # Touching the file marks it recently used for eviction
+                os.utime(path, (time.time(), time.time()))
+                self.hits += 1
+                return path
+
+            self.misses += 1
+            with span("image.download") as s:
+                response = self.session.get(url, timeout=FETCH_TIMEOUT)
+                response.raise_for_status()
+                s.bytes = len(response.content)
+            ext = image_extension(response.content)
+            if ext is None:
+                raise ValueError(f"Not a JPEG, PNG or GIF image: {url}")
+
+            # Write under a temporary name so a reader never sees half a file
+            path = os.path.join(self.directory, key + ext)
+            tmp_path = f"{path}.{threading.get_ident()}.part"
+            with open(tmp_path, "wb") as img_file:
+                img_file.write(response.content)
+            os.replace(tmp_path, path)
+
+        self._evict()
+        return path
+
+    def get_many(self, urls, max_workers=MAX_FETCH_WORKERS):
+        """Fetches images in parallel; returns {url: (path, error)} with one of the two None."""
+        unique = list(dict.fromkeys(url for url in urls if url))
+        if not unique:
+            return {}
+
+        def fetch(url):
+            try:
+                return url, (self.get(url), None)
+            except Exception as e:
+                logger.warning("Error downloading image %s: %s", url, e)
+                return url, (None, e)
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(unique))) as pool:
+            return dict(pool.map(fetch, unique))
+
+
+@st.cache_resource(show_spinner=False)
+def get_image_cache():
+    """Creates the image cache once per server process."""
+    return ImageCache()
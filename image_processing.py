@@ -0,0 +1,64 @@
+import io
+from collections import namedtuple
+
+import streamlit as st
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Photos are downscaled so their longest side is at most this many pixels, then re-encoded as JPEG
+MAX_IMAGE_DIMENSION = 2048
+JPEG_QUALITY = 85
+
+# Thumbnails are stored next to each photo and used by PDFs and galleries (sharp enough at 180 mm)
+THUMBNAIL_DIMENSION = 640
+THUMBNAIL_QUALITY = 75
+
+# A photo ready for upload: the downscaled image and its thumbnail (None if the file isn't a readable image)
+PreparedImage = namedtuple("PreparedImage", ["image", "thumbnail"])
+
+
+def _encode_jpeg(image, max_dimension, quality):
+    image = image.copy()
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    output = io.BytesIO()
+    # Saving without exif= drops EXIF (GPS position, device details) from the result
+    image.save(output, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _process(data, max_dimension, quality, thumbnail_dimension, thumbnail_quality):
+    # Cached on the input bytes, so reruns of the form don't re-encode the same photos
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            # Apply the EXIF orientation before the metadata is stripped, so photos stay upright
+            image = ImageOps.exif_transpose(image)
+            if image.mode != "RGB":
+                background = Image.new("RGB", image.size, "white")
+                rgba = image.convert("RGBA")
+                background.paste(rgba, mask=rgba.getchannel("A"))
+                image = background
+            return (_encode_jpeg(image, max_dimension, quality),
+                    _encode_jpeg(image, thumbnail_dimension, thumbnail_quality))
+    except (UnidentifiedImageError, OSError):
+        return None
+
+
+def prepare_image(uploaded_file, max_dimension=MAX_IMAGE_DIMENSION, quality=JPEG_QUALITY,
+                  thumbnail_dimension=THUMBNAIL_DIMENSION, thumbnail_quality=THUMBNAIL_QUALITY):
+    """Downscales an uploaded photo, strips its EXIF data and makes a thumbnail.
+
+    Returns a PreparedImage of in-memory JPEG files. A file Pillow can't read is passed
+    through unchanged with no thumbnail.
+    """
+    data = uploaded_file.getvalue()
+    processed = _process(data, max_dimension, quality, thumbnail_dimension, thumbnail_quality)
+    if processed is None:
+        return PreparedImage(uploaded_file, None)
+    image, thumbnail = processed
+    return PreparedImage(io.BytesIO(image), io.BytesIO(thumbnail))
+
+
+def thumbnail_name(filename):
+    """Drive file name of a photo's thumbnail, e.g. accident_image_0.jpg -> accident_image_0_thumb.jpg."""
+    stem, _, _ = filename.rpartition(".")
+    return f"{stem}_thumb.jpg"
@@ -0,0 +1,330 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+from gspread.utils import rowcol_to_a1
+
+import storage
+from api_gateway import background
+from tracing import traced
+from google_services import WORKSHEET_NAMES, get_google_services
+from sheet_cache import get_worksheet_cache
+
+logger = logging.getLogger(__name__)
+
+# How often reads check the sheet for appended rows, and how often the whole sheet is re-read
+SYNC_INTERVAL_SECONDS = 15
+FULL_SYNC_INTERVAL_SECONDS = 15 * 60
+
+# Rows fetched per range read during an incremental sync
+INCREMENTAL_BATCH_ROWS = 5000
+
+
+def quote(identifier):
+    """Quotes a table or column name for SQLite."""
+    return '"' + str(identifier).replace('"', '""') + '"'
+
+
+def column_names(headers):
+    """Turns a header row into unique, non-empty SQL column names."""
+    names = []
+    for i, header in enumerate(headers):
+        name = str(header).strip() or f"column_{i + 1}"
+        while name in names or name == "_row":
+            name = f"{name}_{i + 1}"
+        names.append(name)
+    return names
+
+
+def like_pattern(term):
+    """LIKE pattern matching `term` anywhere, with its own % and _ taken literally (use ESCAPE '\\')."""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+class LocalStore:
+    """SQLite mirror of the app's worksheets.
+
+    Each worksheet becomes a table with one TEXT column per header and `_row`, the sheet
+    row number. Reads call `ensure_fresh`, which pulls only rows appended since the last
+    sync (a range read starting after the last mirrored row) and rebuilds the table from a
+    full read every FULL_SYNC_INTERVAL_SECONDS, or when the header row changes.
+    """
+
+    def __init__(self, services, sheet_cache, db_name="mirror.sqlite3"):
+        self.services = services
+        self.sheet_cache = sheet_cache
+        self._conn = storage.connect(db_name)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS _sync_state ("
+            " worksheet TEXT PRIMARY KEY, headers_json TEXT NOT NULL, row_count INTEGER NOT NULL,"
+            " synced_at REAL NOT NULL, full_synced_at REAL NOT NULL, cache_version INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = threading.RLock()
+        self._sync_locks = {title: threading.Lock() for title in WORKSHEET_NAMES}
+        self._sync_listeners = []
+        self._background = {}  # title -> thread running a sync
+
+    # State
+    def _state(self, title):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT headers_json, row_count, synced_at, full_synced_at, cache_version FROM _sync_state WHERE worksheet = ?",
+                (title,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"headers": json.loads(row[0]), "row_count": row[1], "synced_at": row[2],
+                "full_synced_at": row[3], "cache_version": row[4]}
+
+    def _save_state(self, title, headers, row_count, full):
+        now = time.time()
+        state = self._state(title)
+        full_synced_at = now if full or state is None else state["full_synced_at"]
+        self._conn.execute(
+            "INSERT OR REPLACE INTO _sync_state VALUES (?, ?, ?, ?, ?, ?)",
+            (title, json.dumps(headers), row_count, now, full_synced_at, self.sheet_cache.version(title)),
+        )
+
+    def columns(self, title, sync=True):
+        """SQL column names of a mirrored worksheet (without `_row`); sync=False skips the freshness check."""
+        if sync:
+            self.ensure_fresh(title)
+        state = self._state(title)
+        return column_names(state["headers"]) if state else []
+
+    def add_sync_listener(self, listener):
+        """Registers listener(title, rows, full) called after rows were mirrored or updated; rows are (row_number, values) pairs."""
+        self._sync_listeners.append(listener)
+
+    # Syncing
+    def _pad(self, rows, width, first_row):
+        return [(first_row + i, (list(values) + [""] * width)[:width]) for i, values in enumerate(rows)]
+
+    def _insert(self, title, names, numbered_rows):
+        placeholders = ", ".join("?" for _ in range(len(names) + 1))
+        self._conn.executemany(
+            f"INSERT OR REPLACE INTO {quote(title)} (_row, {', '.join(quote(n) for n in names)}) VALUES ({placeholders})",
+            [(row_number, *values) for row_number, values in numbered_rows],
+        )
+
+    @traced("mirror.full_sync")
+    def full_sync(self, title):
+        """Rebuilds the mirror of one worksheet from a full read."""
+        values = self.services.call_worksheet(title, lambda ws: ws.get_all_values())
+        headers = values[0] if values else []
+        names = column_names(headers)
+        numbered_rows = self._pad([v for v in values[1:]], len(names), 2)
+        with self._lock:
+            self._conn.execute(f"DROP TABLE IF EXISTS {quote(title)}")
+            columns = ", ".join(f"{quote(n)} TEXT" for n in names)
+            self._conn.execute(f"CREATE TABLE {quote(title)} (_row INTEGER PRIMARY KEY{', ' if columns else ''}{columns})")
+            if numbered_rows:
+                self._insert(title, names, numbered_rows)
+            self._save_state(title, headers, len(numbered_rows), full=True)
+            self._conn.commit()
+        for listener in self._sync_listeners:
+            listener(title, numbered_rows, True)
+        logger.info("Full sync of %s: %d rows", title, len(numbered_rows))
+
+    @traced("mirror.incremental_sync")
+    def incremental_sync(self, title):
+        """Mirrors rows appended since the last sync; falls back to a full sync if the layout changed."""
+        state = self._state(title)
+        if state is None:
+            return self.full_sync(title)
+
+        names = column_names(state["headers"])
+        row_count = state["row_count"]
+        added = []
+        while True:
+            start = row_count + len(added) + 2  # row 1 is the header
+            rows = self.services.call_worksheet(
+                title, lambda ws: ws.get(f"{start}:{start + INCREMENTAL_BATCH_ROWS - 1}")
+            )
+            rows = [list(r) for r in rows]
+            if any(len(r) > len(names) for r in rows):
+                # New columns appeared (e.g. a header was added), re-read everything
+                return self.full_sync(title)
+            added.extend(rows)
+            if len(rows) < INCREMENTAL_BATCH_ROWS:
+                break
+
+        numbered_rows = self._pad(added, len(names), row_count + 2)
+        with self._lock:
+            if numbered_rows:
+                self._insert(title, names, numbered_rows)
+            self._save_state(title, state["headers"], row_count + len(numbered_rows), full=False)
+            self._conn.commit()
+        if numbered_rows:
+            for listener in self._sync_listeners:
+                listener(title, numbered_rows, False)
+
+    def ensure_fresh(self, title):
+        """Syncs a worksheet if it is due, or if the app wrote to it since the last sync."""
+        state = self._state(title)
+        now = time.time()
+        if (state is not None and now - state["synced_at"] < SYNC_INTERVAL_SECONDS
+                and state["cache_version"] == self.sheet_cache.version(title)):
+            return
+
+        with self._sync_locks.setdefault(title, threading.Lock()):
+            # Another session may have synced while we waited
+            state = self._state(title)
+            if (state is not None and time.time() - state["synced_at"] < SYNC_INTERVAL_SECONDS
+                    and state["cache_version"] == self.sheet_cache.version(title)):
+                return
+            if state is None or now - state["full_synced_at"] >= FULL_SYNC_INTERVAL_SECONDS:
+                self.full_sync(title)
+            else:
+                self.incremental_sync(title)
+
+    def is_mirrored(self, title):
+        """True once a worksheet has been synced at least once."""
+        return self._state(title) is not None
+
+    def sync_in_background(self, title):
+        """Starts syncing a worksheet on a background thread (no-op if one is already running)."""
+        with self._lock:
+            if title in self._background:
+                return
+            thread = threading.Thread(target=self._background_sync, args=(title,), name=f"mirror-sync-{title}", daemon=True)
+            self._background[title] = thread
+        thread.start()
+
+    def _background_sync(self, title):
+        try:
+            with background():
+                self.ensure_fresh(title)
+        except Exception:
+            logger.exception("Background sync of %s failed", title)
+        finally:
+            with self._lock:
+                self._background.pop(title, None)
+
+    @contextmanager
+    def transaction(self):
+        """Yields the mirror's connection under its lock and commits afterwards; for indexes built on the mirror."""
+        with self._lock:
+            try:
+                yield self._conn
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+    def has_table(self, name):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = ?", (name,)
+            ).fetchone() is not None
+
+    # Queries
+    def query(self, sql, params=()):
+        """Runs a read-only SQL query against the mirror and returns a DataFrame."""
+        with self._lock:
+            return pd.read_sql_query(sql, self._conn, params=params)
+
+    def dataframe(self, title, where=None, params=(), columns=None, order_by="_row", limit=None, offset=0):
+        """Reads rows of a mirrored worksheet, optionally filtered, projected and paged."""
+        self.ensure_fresh(title)
+        if self._state(title) is None:
+            return pd.DataFrame()
+        selected = ", ".join(quote(c) for c in columns) if columns else "*"
+        sql = f"SELECT {selected} FROM {quote(title)}"
+        if where:
+            sql += f" WHERE {where}"
+        if order_by:
+            sql += f" ORDER BY {order_by}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)} OFFSET {int(offset)}"
+        df = self.query(sql, params)
+        return df.drop(columns=["_row"]) if "_row" in df.columns and not columns else df
+
+    def record(self, title, row_number):
+        """The full mirrored row for sheet row `row_number` as a dict, or None."""
+        df = self.query(f"SELECT * FROM {quote(title)} WHERE _row = ?", (int(row_number),))
+        return None if df.empty else df.drop(columns=["_row"]).iloc[0].to_dict()
+
+    def sheet_page(self, title, page, page_size, columns=None):
+        """Reads one page of rows straight from the sheet with range reads, for use before the mirror exists.
+
+        Only the requested columns are fetched (one range per column, in a single batch_get).
+        The result has a `_row` column with each row's sheet row number.
+        """
+        headers = self.services.call_worksheet(title, lambda ws: ws.row_values(1))
+        names = column_names(headers)
+        wanted = [n for n in (columns or names) if n in names]
+        start = 2 + (max(page, 1) - 1) * page_size
+        end = start + page_size - 1
+
+        def letter(name):
+            return rowcol_to_a1(1, names.index(name) + 1)[:-1]
+
+        ranges = [f"{letter(n)}{start}:{letter(n)}{end}" for n in wanted]
+        value_ranges = self.services.call_worksheet(title, lambda ws: ws.batch_get(ranges)) if ranges else []
+        data = {"_row": list(range(start, end + 1))}
+        for name, values in zip(wanted, value_ranges):
+            cells = [row[0] if row else "" for row in values]
+            data[name] = (cells + [""] * page_size)[:page_size]
+        df = pd.DataFrame(data)
+        # Drop the blank rows past the end of the sheet
+        if wanted:
+            df = df[(df[wanted] != "").any(axis=1)]
+        return df.reset_index(drop=True)
+
+    def sheet_record(self, title, row_number):
+        """The full row `row_number` read straight from the sheet, as a dict."""
+        headers = self.services.call_worksheet(title, lambda ws: ws.row_values(1))
+        values = self.services.call_worksheet(title, lambda ws: ws.row_values(int(row_number)))
+        names = column_names(headers)
+        return dict(zip(names, (values + [""] * len(names))[:len(names)]))
+
+    def locate(self, title, column, value):
+        """Row locator: sheet row number of the first mirrored row whose `column` equals `value`, or None."""
+        if column not in self.columns(title, sync=False):
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT _row FROM {quote(title)} WHERE {quote(column)} = ? ORDER BY _row LIMIT 1", (str(value),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def update_row(self, title, row_number, changes):
+        """Applies changes the app wrote to a sheet row to the mirror as well; unknown columns are ignored."""
+        known = self.columns(title, sync=False)
+        changes = {c: v for c, v in changes.items() if c in known}
+        if changes:
+            with self._lock:
+                self._conn.execute(
+                    f"UPDATE {quote(title)} SET {', '.join(f'{quote(c)} = ?' for c in changes)} WHERE _row = ?",
+                    [str(v) for v in changes.values()] + [int(row_number)],
+                )
+                self._conn.commit()
+            for listener in self._sync_listeners:
+                listener(title, [(int(row_number), None)], False)
+
+    def mark_stale(self, title):
+        """Forces a full sync on the next read, e.g. after a header was added to the sheet."""
+        with self._lock:
+            self._conn.execute("UPDATE _sync_state SET synced_at = 0, full_synced_at = 0 WHERE worksheet = ?", (title,))
+            self._conn.commit()
+
+    def count(self, title, where=None, params=()):
+        self.ensure_fresh(title)
+        if self._state(title) is None:
+            return 0
+        sql = f"SELECT COUNT(*) FROM {quote(title)}" + (f" WHERE {where}" if where else "")
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()[0]
+
+
+@st.cache_resource(show_spinner=False)
+def get_local_store():
+    """Creates the local worksheet mirror once per server process."""
+    return LocalStore(get_google_services(), get_worksheet_cache())
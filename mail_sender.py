@@ -0,0 +1,196 @@
+import logging
+import queue
+import smtplib
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import streamlit as st
+
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+SMTP_HOST = "smtp.gmail.com"
+SMTP_PORT = 587
+SMTP_TIMEOUT_SECONDS = 30
+
+# Open connections kept for reuse; one that sat idle longer than this is checked with NOOP first
+POOL_SIZE = 2
+IDLE_CHECK_SECONDS = 30
+
+
+def is_connection_error(error):
+    """True if the connection is gone, as opposed to the server refusing one message."""
+    # SMTPException subclasses OSError, so socket errors are told apart from SMTP replies here
+    return isinstance(error, smtplib.SMTPServerDisconnected) or (
+        isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException))
+
+
+def is_permanent_failure(error):
+    """True if retrying can't help: the server rejected the recipient or message with a 5xx reply."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        # Bad credentials are a configuration problem; keep the message until they are fixed
+        return False
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+
+def build_message(sender, to_email, subject, content):
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    msg.attach(MIMEText(content, 'html'))
+    return msg
+
+
+class MailSender:
+    """Sends mail over a small pool of authenticated SMTP connections.
+
+    A batch of messages goes out over one connection, so inviting 50 collaborators costs
+    one TLS handshake and login instead of 50. A connection that dropped is re-opened and
+    the message retried once; failures are reported per recipient. For local testing,
+    point host/port at a plain SMTP server (e.g. `python -m aiosmtpd -n -l localhost:1025`)
+    with use_tls off and no password.
+    """
+
+    def __init__(self, user, password=None, host=SMTP_HOST, port=SMTP_PORT, use_tls=True, pool_size=POOL_SIZE):
+        self.user = user
+        self.password = password
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        self.messages_sent = 0
+
+    def _connect(self):
+        with span("smtp.connect"):
+            server = self._open()
+        with self._lock:
+            self.connections_opened += 1
+        return server
+
+    def _open(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT_SECONDS)
+        try:
+            server.ehlo()
+            if self.use_tls:
+                server.starttls()
+                server.ehlo()
+            if self.password:
+                server.login(self.user, self.password)
+        except Exception:
+            server.close()
+            raise
+        return server
+
+    def _acquire(self):
+        """A pooled connection that is still alive, or a new one."""
+        while True:
+            try:
+                server, last_used = self._pool.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - last_used < IDLE_CHECK_SECONDS:
+                return server
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except Exception:
+                pass
+            self._close(server)
+
+    def _release(self, server):
+        try:
+            self._pool.put_nowait((server, time.monotonic()))
+        except queue.Full:
+            self._quit(server)
+
+    @staticmethod
+    def _close(server):
+        try:
+            server.close()
+        except Exception:
+            pass
+
+    def _quit(self, server):
+        try:
+            server.quit()
+        except Exception:
+            self._close(server)
+
+    def send_batch(self, messages):
+        """Sends (to_email, subject, html_content) messages over one connection.
+
+        Returns one result per message, in order: None if it was accepted, else the error.
+        """
+        results = []
+        server = None
+        connect_error = None
+        try:
+            for to_email, subject, content in messages:
+                if connect_error is not None:
+                    # Can't reach or log in to the server: the rest of the batch fails the same way
+                    results.append(connect_error)
+                    continue
+                msg = build_message(self.user, to_email, subject, content).as_string()
+                result = None
+                for _ in range(2):
+                    if server is None:
+                        try:
+                            server = self._acquire()
+                        except Exception as e:
+                            connect_error = result = e
+                            break
+                    try:
+                        with span("smtp.send") as s:
+                            s.bytes = len(msg)
+                            server.sendmail(self.user, [to_email], msg)
+                        result = None
+                        with self._lock:
+                            self.messages_sent += 1
+                        break
+                    except Exception as e:
+                        result = e
+                        if not is_connection_error(e):
+                            # The server refused this message; the connection is still usable
+                            break
+                        # The connection dropped: reconnect and retry this message once
+                        logger.warning("SMTP connection lost while sending to %s: %s", to_email, e)
+                        self._close(server)
+                        server = None
+                results.append(result)
+        finally:
+            if server is not None:
+                self._release(server)
+        return results
+
+    def send(self, to_email, subject, content):
+        """Sends one message; returns None on success or the error."""
+        return self.send_batch([(to_email, subject, content)])[0]
+
+    def close(self):
+        while True:
+            try:
+                server, _ = self._pool.get_nowait()
+            except queue.Empty:
+                return
+            self._quit(server)
+
+
+@st.cache_resource(show_spinner=False)
+def get_mail_sender():
+    """Creates the mail sender once per server process from the [gmail] secrets."""
+    config = st.secrets["gmail"]
+    return MailSender(
+        config["GMAIL_USER"],
+        config.get("GMAIL_PASSWORD"),
+        host=config.get("SMTP_HOST", SMTP_HOST),
+        port=int(config.get("SMTP_PORT", SMTP_PORT)),
+        use_tls=bool(config.get("SMTP_USE_TLS", True)),
+    )
@@ -0,0 +1,117 @@
+import struct
+
+# Limits advertised on the accident report upload widgets
+MAX_ACCIDENT_PHOTOS = 20
+MAX_MEDIA_SECONDS = 5 * 60
+
+# MPEG audio tables: bitrates (kbps) by [version is MPEG-1][layer][index], sample rates by version
+_MP3_BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def _iter_boxes(data, start, end):
+    """Yields (type, body_start, box_end) for the ISO-BMFF boxes between start and end."""
+    offset = start
+    while offset + 8 <= end:
+        size, box_type = struct.unpack(">I4s", data[offset:offset + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", data[offset + 8:offset + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header:
+            return
+        yield box_type, offset + header, min(offset + size, end)
+        offset += size
+
+
+def mp4_duration_seconds(data):
+    """Reads the movie duration from the mvhd box of an MP4, or None if it can't be found."""
+    for box_type, body, box_end in _iter_boxes(data, 0, len(data)):
+        if box_type != b"moov":
+            continue
+        for child_type, child_body, _ in _iter_boxes(data, body, box_end):
+            if child_type != b"mvhd":
+                continue
+            if data[child_body] == 1:
+                timescale, duration = struct.unpack(">IQ", data[child_body + 20:child_body + 32])
+            else:
+                timescale, duration = struct.unpack(">II", data[child_body + 12:child_body + 20])
+            return duration / timescale if timescale else None
+    return None
+
+
+def mp3_duration_seconds(data):
+    """Works out an MP3's duration from its Xing/Info frame count, or from the bitrate for CBR files."""
+    offset = 0
+    if bytes(data[:3]) == b"ID3" and len(data) >= 10:
+        # ID3v2 tag size is a 28-bit "syncsafe" integer
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        offset = 10 + size
+
+    # Find the first frame sync
+    while offset + 4 <= len(data):
+        if data[offset] == 0xFF and data[offset + 1] & 0xE0 == 0xE0:
+            break
+        offset += 1
+    else:
+        return None
+
+    header = struct.unpack(">I", data[offset:offset + 4])[0]
+    version_bits = (header >> 19) & 0x3
+    layer = 4 - ((header >> 17) & 0x3)
+    bitrate_index = (header >> 12) & 0xF
+    rate_index = (header >> 10) & 0x3
+    mono = ((header >> 6) & 0x3) == 3
+    if version_bits == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    mpeg1 = version_bits == 3
+    sample_rate = _MP3_SAMPLE_RATES[version_bits][rate_index]
+    bitrate = _MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    samples_per_frame = 384 if layer == 1 else (1152 if mpeg1 or layer == 2 else 576)
+
+    # VBR files carry the total frame count in a Xing/Info header inside the first frame
+    side_info = (32 if not mono else 17) if mpeg1 else (17 if not mono else 9)
+    xing = offset + 4 + side_info
+    if bytes(data[xing:xing + 4]) in (b"Xing", b"Info") and data[xing + 7] & 0x1:
+        frames = struct.unpack(">I", data[xing + 8:xing + 12])[0]
+        return frames * samples_per_frame / sample_rate
+
+    return (len(data) - offset) * 8 / bitrate
+
+
+def media_duration_seconds(uploaded_file, filename):
+    """Duration of an uploaded MP4/MP3 in seconds, or None when it can't be determined."""
+    data = uploaded_file.getbuffer()
+    try:
+        if filename.lower().endswith(".mp4"):
+            return mp4_duration_seconds(data)
+        if filename.lower().endswith(".mp3"):
+            return mp3_duration_seconds(data)
+    except (struct.error, IndexError, ZeroDivisionError):
+        return None
+    return None
+
+
+def check_media_limits(accident_images, media_files):
+    """Returns the problems with an evidence set before any of it is uploaded.
+
+    `media_files` is a list of (uploaded_file, filename) for videos and voice notes.
+    """
+    problems = []
+    if len(accident_images) > MAX_ACCIDENT_PHOTOS:
+        problems.append(f"Please upload at most {MAX_ACCIDENT_PHOTOS} accident scene photos ({len(accident_images)} selected).")
+    for uploaded_file, filename in media_files:
+        duration = media_duration_seconds(uploaded_file, filename)
+        if duration is not None and duration > MAX_MEDIA_SECONDS:
+            problems.append(f"{getattr(uploaded_file, 'name', filename)} is {duration / 60:.1f} minutes long; the limit is {MAX_MEDIA_SECONDS // 60} minutes.")
+    return problems
@@ -0,0 +1,207 @@
+import logging
+import random
+import threading
+import time
+import uuid
+
+import pandas as pd
+import streamlit as st
+
+import storage
+from mail_sender import get_mail_sender, is_permanent_failure
+
+logger = logging.getLogger(__name__)
+
+# Delivery: messages per SMTP connection use, how often the worker wakes up, and retry backoff
+BATCH_SIZE = 20
+POLL_INTERVAL_SECONDS = 2
+MAX_ATTEMPTS = 6
+MAX_BACKOFF_SECONDS = 600
+
+# Rate limit: sustained messages per minute, and how many may go out in one burst
+MESSAGES_PER_MINUTE = 60
+BURST = 20
+
+# Message states
+QUEUED = "queued"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+
+class NotificationOutbox:
+    """Durable queue of outgoing emails, delivered by a background worker.
+
+    `enqueue` stores the messages in SQLite and returns straight away, so a page can
+    queue any number of invitations in milliseconds. The worker sends due messages in
+    batches over the pooled mail sender, rate limited by a token bucket. Temporary
+    failures are retried with exponential backoff; permanent ones (the server rejected
+    the address) fail at once. Each message can carry a case number, and the status of
+    every message for a case can be listed.
+    """
+
+    def __init__(self, mail_sender, db_name="notifications.sqlite3"):
+        self.mail_sender = mail_sender
+        self._conn = storage.connect(db_name)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS notifications ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, message_id TEXT UNIQUE NOT NULL, case_number TEXT,"
+            " recipient TEXT NOT NULL, subject TEXT NOT NULL, content TEXT NOT NULL, status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL DEFAULT 0,"
+            " last_error TEXT, created_at REAL NOT NULL, sent_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS notifications_due ON notifications (status, next_attempt_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS notifications_case ON notifications (case_number)")
+        # Messages being sent when the process stopped are sent again (at-least-once delivery)
+        self._conn.execute("UPDATE notifications SET status = ? WHERE status = ?", (QUEUED, SENDING))
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._tokens = float(BURST)
+        self._refilled_at = time.monotonic()
+
+    # Producer side
+    def enqueue(self, recipients, subject, content, case_number=None):
+        """Queues the same message for every recipient; returns their message ids."""
+        now = time.time()
+        case_number = None if case_number is None else str(case_number)
+        rows = [(uuid.uuid4().hex, case_number, recipient, subject, content, QUEUED, now) for recipient in recipients]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO notifications (message_id, case_number, recipient, subject, content, status, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+        self._wake.set()
+        return [row[0] for row in rows]
+
+    def status_for_case(self, case_number):
+        """Every message queued for a case number, newest first, as a DataFrame."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT recipient, subject, status, attempts, last_error, created_at, sent_at FROM notifications"
+                " WHERE case_number = ? ORDER BY id DESC",
+                (str(case_number),),
+            ).fetchall()
+        df = pd.DataFrame(rows, columns=["recipient", "subject", "status", "attempts", "last_error", "created_at", "sent_at"])
+        for column in ("created_at", "sent_at"):
+            df[column] = pd.to_datetime(df[column], unit="s")
+        return df
+
+    def counts(self):
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM notifications GROUP BY status").fetchall())
+
+    def failed(self):
+        """Messages that were given up on, oldest first, as a DataFrame."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT message_id, case_number, recipient, subject, attempts, last_error, created_at FROM notifications"
+                " WHERE status = ? ORDER BY id",
+                (FAILED,),
+            ).fetchall()
+        df = pd.DataFrame(rows, columns=["message_id", "case_number", "recipient", "subject", "attempts", "last_error",
+                                         "created_at"])
+        df["created_at"] = pd.to_datetime(df["created_at"], unit="s")
+        return df
+
+    def retry_failed(self):
+        """Queues every failed message again; returns how many were requeued."""
+        with self._lock:
+            requeued = self._conn.execute(
+                "UPDATE notifications SET status = ?, attempts = 0, next_attempt_at = 0 WHERE status = ?", (QUEUED, FAILED)
+            ).rowcount
+            self._conn.commit()
+        self._wake.set()
+        return requeued
+
+    # Worker
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="notification-outbox-worker", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(POLL_INTERVAL_SECONDS)
+            self._wake.clear()
+            try:
+                while not self._stop.is_set() and self.deliver_once():
+                    pass
+            except Exception:
+                logger.exception("Notification delivery failed")
+
+    def _take_tokens(self, wanted):
+        """Waits for at least one send token and takes up to `wanted` of them."""
+        rate = MESSAGES_PER_MINUTE / 60
+        while True:
+            now = time.monotonic()
+            self._tokens = min(BURST, self._tokens + (now - self._refilled_at) * rate)
+            self._refilled_at = now
+            if self._tokens >= 1:
+                taken = min(wanted, int(self._tokens))
+                self._tokens -= taken
+                return taken
+            if self._stop.wait((1 - self._tokens) / rate):
+                return 0
+
+    def _due_batch(self, limit):
+        with self._lock:
+            batch = self._conn.execute(
+                "SELECT id, recipient, subject, content, attempts FROM notifications"
+                " WHERE status = ? AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (QUEUED, time.time(), limit),
+            ).fetchall()
+            self._conn.executemany("UPDATE notifications SET status = ? WHERE id = ?", [(SENDING, b[0]) for b in batch])
+            self._conn.commit()
+        return batch
+
+    def _has_due(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM notifications WHERE status = ? AND next_attempt_at <= ? LIMIT 1", (QUEUED, time.time())
+            ).fetchone() is not None
+
+    def deliver_once(self):
+        """Sends one rate-limited batch of due messages; returns False when nothing was due."""
+        if not self._has_due():
+            return False
+        limit = self._take_tokens(BATCH_SIZE)
+        batch = self._due_batch(limit) if limit else []
+        if not batch:
+            return False
+
+        results = self.mail_sender.send_batch([(b[1], b[2], b[3]) for b in batch])
+        updates = []
+        for (row_id, recipient, _, _, attempts), error in zip(batch, results):
+            if error is None:
+                updates.append((SENT, attempts + 1, 0, None, time.time(), row_id))
+                continue
+            attempts += 1
+            status = FAILED if is_permanent_failure(error) or attempts >= MAX_ATTEMPTS else QUEUED
+            delay = min(30 * 2 ** attempts, MAX_BACKOFF_SECONDS) * (0.5 + random.random())
+            logger.warning("Sending notification to %s failed (%s): %s", recipient, status, error)
+            updates.append((status, attempts, time.time() + delay, str(error), None, row_id))
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE notifications SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, sent_at = ?"
+                " WHERE id = ?",
+                updates,
+            )
+            self._conn.commit()
+        return True
+
+
+@st.cache_resource(show_spinner=False)
+def get_notification_outbox():
+    """Creates the notification outbox and starts its worker once per server process."""
+    outbox = NotificationOutbox(get_mail_sender())
+    outbox.start()
+    return outbox
@@ -0,0 +1,96 @@
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from fpdf import FPDF
+
+# Worker processes for bulk exports (FPDF rendering is CPU-bound, so threads wouldn't help)
+MAX_EXPORT_WORKERS = os.cpu_count() or 2
+
+# Jobs queued per worker; caps how many reports are held in memory at once
+JOBS_PER_WORKER = 4
+
+
+def render_report_pdf(report_data, report_type, pdf_path):
+    """Writes the one-page "field: value" PDF of a report to `pdf_path`."""
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+
+    pdf.cell(200, 10, txt=f"{report_type} Report", ln=True, align='C')
+    for key, value in report_data.items():
+        pdf.cell(200, 10, txt=f"{key}: {value}", ln=True)
+
+    pdf.output(pdf_path)
+    return pdf_path
+
+
+def safe_file_name(text):
+    """A file name component made of letters, digits, dashes and underscores only."""
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", str(text)).strip("_") or "report"
+
+
+def _render_job(job):
+    # Runs in a worker process: only plain data goes in and out
+    name, report_data, report_type, pdf_path = job
+    try:
+        render_report_pdf(report_data, report_type, pdf_path)
+        return name, pdf_path, None
+    except Exception as e:
+        return name, None, f"{type(e).__name__}: {e}"
+
+
+def _pool_context():
+    # Forking the multi-threaded Streamlit server can copy held locks into the children
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def export_reports_zip(reports, report_type, zip_path, max_workers=MAX_EXPORT_WORKERS, on_progress=None):
+    """Renders reports to PDFs on a process pool and streams them into a ZIP at `zip_path`.
+
+    `reports` is an iterable of (name, report_data) pairs and may be a generator: at most
+    max_workers * JOBS_PER_WORKER reports are in flight, and each PDF is written to its
+    own file in a private temp directory, moved into the ZIP as soon as it is done and
+    deleted. on_progress(done) is called from the calling thread after each report.
+    Returns {name: error} for the reports that could not be rendered.
+    """
+    errors = {}
+    done = 0
+    work_dir = tempfile.mkdtemp(prefix="raf_export_")
+    reports = iter(reports)
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=_pool_context()) as pool, \
+                zipfile.ZipFile(zip_path, "w", zipfile.ZIP_STORED) as archive:
+            pending = set()
+
+            def submit_next():
+                for index, (name, report_data) in enumerate(reports, start=done + len(pending)):
+                    pdf_path = os.path.join(work_dir, f"{index}.pdf")
+                    pending.add(pool.submit(_render_job, (name, report_data, report_type, pdf_path)))
+                    if len(pending) >= max_workers * JOBS_PER_WORKER:
+                        return
+
+            submit_next()
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    pending.discard(future)
+                    name, pdf_path, error = future.result()
+                    if error:
+                        errors[name] = error
+                    else:
+                        # PDFs are already compressed, so they are stored rather than deflated again
+                        archive.write(pdf_path, arcname=f"{name}.pdf")
+                        os.remove(pdf_path)
+                    done += 1
+                    if on_progress:
+                        on_progress(done)
+                submit_next()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return errors
@@ -0,0 +1,127 @@
+import os
+import tempfile
+
+import streamlit as st
+from fpdf import FPDF
+
+from html_reports import get_html_pdf_renderer
+from image_cache import get_image_cache
+from tracing import traced
+
+
+def generate_pdf_content(first_responder_info, report_data, report_type):
+    # Report HTML comes from the compiled templates in templates/, with every field escaped
+    return get_html_pdf_renderer().render_html(report_type, first_responder_info, report_data)
+
+
+def create_pdf_from_html(html_content, file_name=None):
+    """Converts report HTML to PDF bytes; with a file name, writes them to a per-call temp file and returns its path."""
+    pdf_bytes = get_html_pdf_renderer().to_pdf(html_content)
+    if file_name is None:
+        return pdf_bytes
+    pdf_path = os.path.join(tempfile.mkdtemp(prefix="raf_pdf_"), os.path.basename(file_name))
+    with open(pdf_path, "wb") as pdf_file:
+        pdf_file.write(pdf_bytes)
+    return pdf_path
+
+
+@traced("pdf.create_pdf")
+def create_pdf(first_responder_info, report_data, file_name):
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+
+    # Fetch every image of the report up front, in parallel, instead of one at a time while drawing
+    # Thumbnails are used where the report has them: they are drawn at most 180 mm wide anyway
+    driver_a_license_image_url = report_data.get('Driver A', {}).get('License Thumbnail') or report_data.get('Driver A', {}).get('License Image')
+    driver_b_license_image_url = report_data.get('Driver B', {}).get('License Thumbnail') or report_data.get('Driver B', {}).get('License Image')
+    accident_image_urls = report_data.get('Accident Image Thumbnails') or report_data.get('Accident Images', [])
+    images = get_image_cache().get_many([driver_a_license_image_url, driver_b_license_image_url, *accident_image_urls])
+    for img_url, (img_path, error) in images.items():
+        if error:
+            st.error(f"Error downloading image from URL: {img_url}")
+
+    # Title
+    pdf.set_font("Arial", 'B', 16)
+    pdf.cell(200, 10, txt="Accident Report", ln=True, align='C')
+    pdf.ln(10)
+
+    # First Responder Information
+    pdf.set_font("Arial", 'B', 14)
+    pdf.cell(200, 10, txt="First Responder Information", ln=True)
+    pdf.set_font("Arial", size=12)
+    pdf.cell(200, 10, txt=f"Officer Name: {first_responder_info.get('Officer Name', 'N/A')}", ln=True)
+    pdf.cell(200, 10, txt=f"Role: {first_responder_info.get('Role', 'N/A')}", ln=True)
+    pdf.cell(200, 10, txt=f"Department: {first_responder_info.get('Department', 'N/A')}", ln=True)
+    pdf.ln(10)
+    # Accident Report Summary
+    pdf.set_font("Arial", 'B', 14)
+    pdf.cell(200, 10, txt="Accident Report Summary", ln=True)
+    pdf.set_font("Arial", size=12)
+    pdf.cell(200, 10, txt=f"Case Number: {report_data.get('Accident Case Number', 'N/A')}", ln=True)
+    pdf.cell(200, 10, txt=f"Accident Date: {report_data.get('Accident Date', 'N/A')}", ln=True)
+    pdf.cell(200, 10, txt=f"Number of Vehicles: {report_data.get('Number of Vehicles', 'N/A')}", ln=True)
+    pdf.cell(200, 10, txt=f"Accident Time: {report_data.get('Accident Time', 'N/A')}", ln=True)
+    pdf.cell(200, 10, txt=f"Road Name: {report_data.get('Road Name', 'N/A')}", ln=True)
+    pdf.cell(200, 10, txt=f"Police Station: {report_data.get('Police Station', 'N/A')}", ln=True)
+    pdf.cell(200, 10, txt=f"Speed Limit: {report_data.get('Speed Limit', 'N/A')}", ln=True)
+    pdf.cell(200, 10, txt=f"Weather: {report_data.get('Weather', 'N/A')}", ln=True)
+    pdf.cell(200, 10, txt=f"Road Condition: {report_data.get('Road Condition', 'N/A')}", ln=True)
+    pdf.ln(10)
+
+    # Driver Information
+    pdf.set_font("Arial", 'B', 14)
+    pdf.cell(200, 10, txt="Driver Information", ln=True)
+    pdf.set_font("Arial", 'B', 12)
+
+    # Driver A
+    pdf.cell(200, 10, txt="Driver A", ln=True)
+    pdf.set_font("Arial", size=12)
+    pdf.cell(200, 10, txt=f"Name: {report_data.get('Driver A', {}).get('Name', 'N/A')}", ln=True)
+    pdf.cell(200, 10, txt=f"ID: {report_data.get('Driver A', {}).get('ID', 'N/A')}", ln=True)
+    pdf.cell(200, 10, txt=f"Injuries: {report_data.get('Driver A', {}).get('Injuries', 'N/A')}", ln=True)
+    # Add image
+    img_path = images.get(driver_a_license_image_url, (None, None))[0]
+    if img_path:
+        pdf.image(img_path, x=10, y=pdf.get_y(), w=100)
+    pdf.ln(10)
+
+    # Driver B
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(200, 10, txt="Driver B", ln=True)
+    pdf.set_font("Arial", size=12)
+    pdf.cell(200, 10, txt=f"Name: {report_data.get('Driver B', {}).get('Name', 'N/A')}", ln=True)
+    pdf.cell(200, 10, txt=f"ID: {report_data.get('Driver B', {}).get('ID', 'N/A')}", ln=True)
+    pdf.cell(200, 10, txt=f"Injuries: {report_data.get('Driver B', {}).get('Injuries', 'N/A')}", ln=True)
+    # Add image
+    img_path = images.get(driver_b_license_image_url, (None, None))[0]
+    if img_path:
+        pdf.image(img_path, x=10, y=pdf.get_y(), w=100)
+    pdf.ln(10)
+
+    # Accident Photos
+    pdf.set_font("Arial", 'B', 14)
+    pdf.cell(200, 10, txt="Accident Photos", ln=True)
+    pdf.set_font("Arial", size=12)
+
+    for img_url in accident_image_urls:
+        img_path = images.get(img_url, (None, None))[0]
+        if not img_path:
+            continue
+        pdf.image(img_path, x=10, y=pdf.get_y(), w=180)
+        pdf.ln(100)  # Adjust spacing for images
+
+    # Save PDF, in its own temp directory so concurrent exports of the same case don't overwrite each other
+    pdf_output_path = os.path.join(tempfile.mkdtemp(prefix="raf_pdf_"), os.path.basename(file_name))
+    pdf.output(pdf_output_path)
+
+    return pdf_output_path
+
+
+def download_image(image_url):
+    """Downloads an image from a URL (or reuses the cached copy) and returns the local file path."""
+    try:
+        return get_image_cache().get(image_url)
+    except Exception:
+        st.error(f"Error downloading image from URL: {image_url}")
+        return None
@@ -0,0 +1,241 @@
+import argparse
+import ast
+import json
+
+from gspread.utils import rowcol_to_a1
+
+# Version written into every structured cell, so the format can change without breaking old rows
+RECORD_FORMAT_VERSION = 1
+
+# Field order of the lists the accident report form builds (see driver_info_section)
+DRIVER_FIELDS = [
+    "name", "id", "injuries", "license_number", "license_date_issued", "license_endorsements",
+    "physical_mental_defects", "residential_address", "work_address", "employment_status", "company",
+    "medical_aid", "medical_aid_company", "car_insurance", "insurance_company", "under_influence", "license_url",
+]
+VEHICLE_FIELDS = ["registration_number", "make", "model", "year", "color"]
+WITNESS_FIELDS = ["name", "id", "contact"]
+
+# Structured columns of the AccidentReports sheet and what each holds
+STRUCTURED_COLUMNS = {
+    "vehicle_info": ("list", VEHICLE_FIELDS),
+    "driver_a_info": ("record", DRIVER_FIELDS),
+    "driver_b_info": ("record", DRIVER_FIELDS),
+    "witness_info": ("list", WITNESS_FIELDS),
+}
+
+
+# Fields of each report type
+report_type_map = {
+    "Accident Report": [
+        'case_number', 
+        'accident_date', 
+        'num_vehicles', 
+        'road_name', 
+        'accident_time', 
+        'police_station', 
+        'police_reference_number', 
+        'speed_limit', 
+        'weather', 
+        'road_condition', 
+        'vehicle_info',  # New field for vehicle information
+        'driver_a_info',  # New field for Driver A information
+        'driver_b_info',  # New field for Driver B information
+        'witness_info',  # New field for witness information
+        'accident_image_urls',  # Field for image URLs
+        'accident_video_url',  # Field for accident video URL
+        'voice_note_urls'  # Field for voice note URLs
+    ],
+    "Serious Injury Assessment Report": [
+        'patient_name', 
+        'assessment_date', 
+        'injury_description', 
+        'injury_severity', 
+        'treatment_given', 
+        'current_symptoms', 
+        'diagnosis', 
+        'clinical_studies'
+    ],
+    "RAF 1 Form": [
+        'claimant_name', 
+        'claimant_id', 
+        'claim_date', 
+        'claim_description', 
+        'claimant_dob', 
+        'claimant_residential_address', 
+        'claimant_postal_address', 
+        'claimant_email'
+    ],
+    "SUPPLIER CLAIM FORM": [
+        'supplier_name', 
+        'practice_number', 
+        'tax_reference_number', 
+        'supplier_physical_address', 
+        'supplier_email', 
+        'claim_for_emergency_treatment', 
+        'total_amount_claimed'
+    ]
+}
+
+# Worksheet holding each report type
+report_sheet_map = {
+    "Accident Report": "AccidentReports",
+    "Serious Injury Assessment Report": "InjuryAssessment",
+    "RAF 1 Form": "Claims",
+    "SUPPLIER CLAIM FORM": "SupplierClaims",
+}
+
+
+def _text(value):
+    return "" if value is None else str(value)
+
+
+# Encoding
+def encode_record(values, fields):
+    """JSON cell for one record given as a list in `fields` order (e.g. a driver)."""
+    record = {field: _text(value) for field, value in zip(fields, values)}
+    return json.dumps({"v": RECORD_FORMAT_VERSION, **record}, ensure_ascii=False)
+
+
+def encode_list(items, fields):
+    """JSON cell for a list of records, each given as a list in `fields` order (e.g. vehicles)."""
+    records = [{field: _text(value) for field, value in zip(fields, item)} for item in items]
+    return json.dumps({"v": RECORD_FORMAT_VERSION, "items": records}, ensure_ascii=False)
+
+
+# Decoding
+def _is_structured(cell):
+    return isinstance(cell, str) and cell.startswith("{") and '"v"' in cell
+
+
+def _legacy_driver(cell):
+    """Best-effort parse of the old ', '.join(map(str, driver_info)) cells."""
+    parts = cell.split(", ")
+    if len(parts) == len(DRIVER_FIELDS):
+        return dict(zip(DRIVER_FIELDS, parts))
+
+    # Free-text addresses may contain ", ": take the fixed fields from both ends, addresses from the middle
+    head, tail = 7, 8
+    if len(parts) < head + tail:
+        return {"_raw": cell}
+    record = dict(zip(DRIVER_FIELDS[:head], parts[:head]))
+    record.update(zip(DRIVER_FIELDS[-tail:], parts[-tail:]))
+    middle = parts[head:-tail]
+    if len(middle) == 2:
+        record["residential_address"], record["work_address"] = middle
+    else:
+        record["residential_address"], record["work_address"] = ", ".join(middle), ""
+        record["_raw"] = cell
+    return record
+
+
+def _legacy_list(cell, fields):
+    """Parses the old ', '.join(str(list) ...) cells, which are Python list literals."""
+    try:
+        items = ast.literal_eval(f"[{cell}]")
+    except (ValueError, SyntaxError):
+        return [{"_raw": cell}]
+    return [dict(zip(fields, map(_text, item))) for item in items if isinstance(item, (list, tuple))]
+
+
+def decode_record(cell, fields=DRIVER_FIELDS):
+    """Dict for a structured record cell; legacy cells are converted on the fly."""
+    if cell in (None, ""):
+        return {}
+    cell = str(cell)
+    if _is_structured(cell):
+        data = json.loads(cell)
+        data.pop("v", None)
+        return data
+    return _legacy_driver(cell) if fields is DRIVER_FIELDS else {"_raw": cell}
+
+
+def decode_list(cell, fields):
+    """List of dicts for a structured list cell; legacy cells are converted on the fly."""
+    if cell in (None, ""):
+        return []
+    cell = str(cell)
+    if _is_structured(cell):
+        return json.loads(cell).get("items", [])
+    return _legacy_list(cell, fields)
+
+
+def decode_cell(column, cell):
+    kind, fields = STRUCTURED_COLUMNS[column]
+    return decode_record(cell, fields) if kind == "record" else decode_list(cell, fields)
+
+
+def migrate_cell(column, cell):
+    """The structured form of a cell, or None if it is already structured or empty."""
+    if cell in (None, "") or _is_structured(str(cell)):
+        return None
+    kind, fields = STRUCTURED_COLUMNS[column]
+    if kind == "record":
+        record = decode_record(cell, fields)
+        return json.dumps({"v": RECORD_FORMAT_VERSION, **record}, ensure_ascii=False)
+    return json.dumps({"v": RECORD_FORMAT_VERSION, "items": decode_list(cell, fields)}, ensure_ascii=False)
+
+
+# Columnar access
+def expand_drivers(df):
+    """Adds flat driver_a_<field>/driver_b_<field> columns to an AccidentReports DataFrame.
+
+    Each cell is parsed once; filters are then plain vectorized column operations, e.g.
+    ``(df.driver_a_under_influence == "Yes") | (df.driver_b_under_influence == "Yes")``.
+    """
+    # pandas is imported here rather than at the top, so the form pages that only encode cells don't load it
+    import pandas as pd
+
+    out = df.copy()
+    for column in ("driver_a_info", "driver_b_info"):
+        if column not in out.columns:
+            continue
+        prefix = column[:-len("_info")]
+        flat = pd.DataFrame([decode_record(cell) for cell in out[column]], index=out.index)
+        flat = flat.reindex(columns=DRIVER_FIELDS).fillna("")
+        out = out.join(flat.add_prefix(f"{prefix}_"))
+    return out
+
+
+def sql_field(column, field):
+    """SQL expression for one field of a structured column in the local mirror (SQLite JSON1)."""
+    # Legacy cells aren't JSON; json_extract would raise on them, so they read as NULL
+    return f"(CASE WHEN json_valid(\"{column}\") THEN json_extract(\"{column}\", '$.{field}') END)"
+
+
+def migrate_accident_reports(services, title="AccidentReports", dry_run=False):
+    """One-time migration of the legacy list-string cells of a worksheet to the structured format.
+
+    Reads the structured columns only and rewrites the cells that still hold the old
+    format, one column range per batch_update. Already-migrated cells are left alone, so
+    running it again is harmless. Returns the number of cells converted.
+    """
+    headers = services.call_worksheet(title, lambda ws: ws.row_values(1))
+    converted = 0
+    for column in STRUCTURED_COLUMNS:
+        if column not in headers:
+            continue
+        index = headers.index(column) + 1
+        cells = services.call_worksheet(title, lambda ws: ws.col_values(index))[1:]
+        updates = []
+        for offset, cell in enumerate(cells):
+            new_cell = migrate_cell(column, cell)
+            if new_cell is not None:
+                updates.append({"range": rowcol_to_a1(offset + 2, index), "values": [[new_cell]]})
+        converted += len(updates)
+        if updates and not dry_run:
+            services.call_worksheet(title, lambda ws: ws.batch_update(updates, value_input_option="RAW"), write=True)
+    return converted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert legacy driver/vehicle/witness cells to the structured format.")
+    parser.add_argument("--dry-run", action="store_true", help="only count the cells that would change")
+    args = parser.parse_args()
+
+    from api_gateway import background
+    from google_services import get_google_services
+
+    with background():
+        count = migrate_accident_reports(get_google_services(), dry_run=args.dry_run)
+    print(f"{'Would convert' if args.dry_run else 'Converted'} {count} cells")
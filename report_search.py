@@ -0,0 +1,156 @@
+import re
+import threading
+
+import streamlit as st
+
+from local_store import get_local_store, quote
+
+# Columns that get a B-tree index for exact lookups and date-range filters
+ID_COLUMNS = ["case_number", "Case Number", "patient_id", "claimant_id", "claim_number", "police_reference_number", "submission_id"]
+DATE_COLUMNS = ["accident_date", "assessment_date"]
+
+DEFAULT_PAGE_SIZE = 25
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def match_expression(text):
+    """Turns free text into an FTS5 query: every token must match, each as a prefix."""
+    tokens = _TOKEN.findall(text)
+    return " AND ".join('"' + token.replace('"', '""') + '"*' for token in tokens)
+
+
+class ReportSearch:
+    """Full-text and filtered search over the local worksheet mirror.
+
+    Every mirrored worksheet gets an FTS5 table over all of its columns (the packed
+    driver, vehicle and witness text included) with prefix indexes, plus B-tree indexes
+    on ID and date columns. The indexes follow the mirror: appended rows are added as they
+    are synced and a full sync rebuilds them.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        store.add_sync_listener(self._on_sync)
+
+    @staticmethod
+    def fts_table(title):
+        return f"{title}_fts"
+
+    def _on_sync(self, title, numbered_rows, full):
+        if full or not self.store.has_table(self.fts_table(title)):
+            self.rebuild(title)
+        else:
+            self.index_rows(title, [row_number for row_number, _ in numbered_rows])
+
+    def rebuild(self, title):
+        """Recreates the search and lookup indexes of one worksheet from its mirror table."""
+        columns = self.store.columns(title, sync=False)
+        if not columns:
+            return
+        fts = quote(self.fts_table(title))
+        quoted = ", ".join(quote(c) for c in columns)
+        with self._lock, self.store.transaction() as conn:
+            conn.execute(f"DROP TABLE IF EXISTS {fts}")
+            conn.execute(f"CREATE VIRTUAL TABLE {fts} USING fts5({quoted}, tokenize='unicode61', prefix='2 3')")
+            conn.execute(f"INSERT INTO {fts} (rowid, {quoted}) SELECT _row, {quoted} FROM {quote(title)}")
+            for column in ID_COLUMNS + DATE_COLUMNS:
+                if column in columns:
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS {quote(f'{title}_{column}_idx')} ON {quote(title)} ({quote(column)})")
+
+    def index_rows(self, title, row_numbers):
+        """(Re)indexes the given sheet rows after they were added or changed in the mirror."""
+        if not row_numbers:
+            return
+        columns = self.store.columns(title, sync=False)
+        fts = quote(self.fts_table(title))
+        quoted = ", ".join(quote(c) for c in columns)
+        placeholders = ", ".join("?" for _ in row_numbers)
+        with self._lock, self.store.transaction() as conn:
+            conn.execute(f"DELETE FROM {fts} WHERE rowid IN ({placeholders})", row_numbers)
+            conn.execute(
+                f"INSERT INTO {fts} (rowid, {quoted}) SELECT _row, {quoted} FROM {quote(title)} WHERE _row IN ({placeholders})",
+                row_numbers,
+            )
+
+    def _where(self, title, columns, text=None, date_column=None, date_from=None, date_to=None, exact=None, conditions=None):
+        clauses, params = list(conditions or []), []
+        if text and match_expression(text):
+            clauses.append(f"_row IN (SELECT rowid FROM {quote(self.fts_table(title))} WHERE {quote(self.fts_table(title))} MATCH ?)")
+            params.append(match_expression(text))
+        if date_column in columns:
+            # Dates are stored as ISO text (YYYY-MM-DD), so string comparison orders them correctly
+            if date_from:
+                clauses.append(f"{quote(date_column)} >= ?")
+                params.append(str(date_from))
+            if date_to:
+                clauses.append(f"{quote(date_column)} <= ?")
+                params.append(str(date_to))
+        for column, value in (exact or {}).items():
+            if column in columns and value not in (None, ""):
+                clauses.append(f"{quote(column)} = ?")
+                params.append(str(value))
+        return " AND ".join(clauses) or None, params
+
+    def _prepare(self, title):
+        columns = self.store.columns(title)
+        if columns and not self.store.has_table(self.fts_table(title)):
+            self.rebuild(title)
+        return columns
+
+    def count(self, title, text=None, date_column=None, date_from=None, date_to=None, exact=None, conditions=None):
+        """Number of rows matching the filters (see `search`)."""
+        columns = self._prepare(title)
+        if not columns:
+            return 0
+        where, params = self._where(title, columns, text, date_column, date_from, date_to, exact, conditions)
+        return self.store.count(title, where, params)
+
+    def page(self, title, text=None, date_column=None, date_from=None, date_to=None, exact=None, conditions=None,
+             page=1, page_size=DEFAULT_PAGE_SIZE, columns=None):
+        """One page of matching rows as a DataFrame (see `search`)."""
+        all_columns = self._prepare(title)
+        if not all_columns:
+            return self.store.dataframe(title)
+        where, params = self._where(title, all_columns, text, date_column, date_from, date_to, exact, conditions)
+        offset = (max(page, 1) - 1) * page_size
+        return self.store.dataframe(title, where=where, params=params, columns=columns, limit=page_size, offset=offset)
+
+    def iter_chunks(self, title, text=None, date_column=None, date_from=None, date_to=None, exact=None, conditions=None,
+                    chunk_size=500):
+        """Yields every matching row, full records with `_row`, as DataFrames of at most `chunk_size` rows.
+
+        Chunks are read by keyset (`_row > last`) rather than OFFSET, so exporting a large
+        result set holds one chunk in memory and never rescans the rows already returned.
+        """
+        columns = self._prepare(title)
+        if not columns:
+            return
+        last_row = 0
+        while True:
+            where, params = self._where(title, columns, text, date_column, date_from, date_to, exact,
+                                        list(conditions or []) + [f"_row > {int(last_row)}"])
+            chunk = self.store.dataframe(title, where=where, params=params, columns=["_row"] + columns, limit=chunk_size)
+            if chunk.empty:
+                return
+            yield chunk
+            last_row = chunk["_row"].iloc[-1]
+
+    def search(self, title, text=None, date_column=None, date_from=None, date_to=None, exact=None, conditions=None,
+               page=1, page_size=DEFAULT_PAGE_SIZE, columns=None):
+        """Returns (page DataFrame, total matches) for a worksheet.
+
+        `text` matches whole words or word prefixes in any column, `date_from`/`date_to`
+        bound `date_column`, `exact` maps ID columns to values that must match exactly and
+        `conditions` are extra SQL clauses built by the app (never from user input).
+        """
+        filters = dict(text=text, date_column=date_column, date_from=date_from, date_to=date_to, exact=exact,
+                       conditions=conditions)
+        return self.page(title, page=page, page_size=page_size, columns=columns, **filters), self.count(title, **filters)
+
+
+@st.cache_resource(show_spinner=False)
+def get_report_search():
+    """Creates the report search index once per server process."""
+    return ReportSearch(get_local_store())
@@ -0,0 +1,129 @@
+import threading
+import uuid
+
+import streamlit as st
+from gspread.utils import rowcol_to_a1
+
+from google_services import get_google_services
+from local_store import get_local_store
+from sheet_cache import get_worksheet_cache
+
+# Header of the column holding each row's version, bumped on every edit
+VERSION_HEADER = "row_version"
+
+# Primary key column of each worksheet (first one present wins); only columns unique per row belong here
+PRIMARY_KEYS = {
+    "AccidentReports": ["case_number", "Case Number"],
+    "InjuryAssessment": ["patient_id"],
+    "Claims": ["claimant_id", "Claimant ID"],
+    "SupplierClaims": ["practice_number"],
+    "MedicalReports": ["case_number"],
+    "SAPReports": ["case_number"],
+}
+
+
+class EditConflict(Exception):
+    """The row changed in the sheet since the editor loaded it."""
+
+
+class ReportUpdater:
+    """Writes edits back to the sheet in place, one batch_update per save.
+
+    Rows are found through the mirror's row locator (primary key -> sheet row). A save
+    first reads the row's key and `row_version` cells; if either differs from what the
+    editor loaded, someone else saved in between and EditConflict is raised. Otherwise
+    only the changed cells plus the bumped version are written in a single batch_update.
+
+    Within one process saves of a row are serialized by a lock. Sheets has no
+    compare-and-set, so saves from another process (a second app replica) can pass the
+    check at the same time. Each save therefore writes a unique version and reads it back
+    afterwards: if another save's version is there, EditConflict is raised. Two saves that
+    each read back their own version before the other writes can still both succeed, with
+    the later one winning, so run a single process when that matters.
+    """
+
+    def __init__(self, services, store, sheet_cache):
+        self.services = services
+        self.store = store
+        self.sheet_cache = sheet_cache
+        self._row_locks = {}
+        self._guard = threading.Lock()
+
+    def _lock_for(self, title, row_number):
+        with self._guard:
+            return self._row_locks.setdefault((title, row_number), threading.Lock())
+
+    def primary_key(self, title):
+        columns = self.store.columns(title)
+        return next((c for c in PRIMARY_KEYS.get(title, []) if c in columns), None)
+
+    def locate(self, title, key_value):
+        """Sheet row number of the report with primary key `key_value`, or None.
+
+        Raises EditConflict when the worksheet has no unique key column or the report has
+        no key value, since any row found would only be a guess.
+        """
+        key_column = self.primary_key(title)
+        if key_column is None:
+            raise EditConflict(f"{title} has no unique key column, so the report's row can't be found again.")
+        if key_value is None or str(key_value) == "":
+            raise EditConflict(f"The report has no {key_column}, so its row in {title} can't be found again.")
+        return self.store.locate(title, key_column, key_value)
+
+    def update(self, title, row_number, original, values):
+        """Saves the fields of `values` that differ from `original`; returns the number of cells changed."""
+        changes = {c: v for c, v in values.items() if str(v) != str(original.get(c, ""))}
+        if not changes:
+            return 0
+
+        columns = self.store.columns(title, sync=False)
+        unknown = [c for c in changes if c not in columns]
+        if unknown:
+            raise KeyError(f"Columns not in {title}: {', '.join(unknown)}")
+        key_column = self.primary_key(title)
+        version_column = self.services.header_column(title, VERSION_HEADER)
+        if VERSION_HEADER not in columns:
+            # The version column was just added to the sheet; the mirror picks it up on its next full sync
+            self.store.mark_stale(title)
+
+        expected_version = str(original.get(VERSION_HEADER, "") or "")
+        # The count is for people reading the sheet; the suffix tells concurrent saves of the same count apart
+        count = expected_version.split("-", 1)[0]
+        new_version = f"{int(count) + 1 if count.isdigit() else 1}-{uuid.uuid4().hex[:8]}"
+        key_cell = rowcol_to_a1(row_number, columns.index(key_column) + 1) if key_column else None
+        version_cell = rowcol_to_a1(row_number, version_column)
+
+        with self._lock_for(title, row_number):
+            # Optimistic concurrency check: the row must still be the one (and the version) we loaded
+            ranges = [version_cell] + ([key_cell] if key_cell else [])
+            current = self.services.call_worksheet(title, lambda ws: ws.batch_get(ranges))
+            current_version = current[0][0][0] if current[0] and current[0][0] else ""
+            if str(current_version) != expected_version:
+                raise EditConflict(f"{title} row {row_number} was changed by someone else (version {current_version or 'none'}).")
+            if key_cell:
+                current_key = current[1][0][0] if current[1] and current[1][0] else ""
+                if str(current_key) != str(original.get(key_column, "")):
+                    raise EditConflict(f"{title} row {row_number} no longer holds {key_column} {original.get(key_column)}.")
+
+            data = [{"range": rowcol_to_a1(row_number, columns.index(c) + 1), "values": [[v]]} for c, v in changes.items()]
+            data.append({"range": version_cell, "values": [[new_version]]})
+            self.services.call_worksheet(title, lambda ws: ws.batch_update(data, value_input_option="RAW"), write=True)
+
+            # Another process may have passed the check too and written after us
+            written = self.services.call_worksheet(title, lambda ws: ws.get(version_cell))
+            written_version = written[0][0] if written and written[0] else ""
+            if str(written_version) != new_version:
+                self.store.mark_stale(title)
+                self.sheet_cache.invalidate(title)
+                raise EditConflict(f"{title} row {row_number} was saved by someone else at the same time "
+                                   f"(version {written_version or 'none'}).")
+
+        self.store.update_row(title, row_number, {**changes, VERSION_HEADER: new_version})
+        self.sheet_cache.invalidate(title)
+        return len(changes)
+
+
+@st.cache_resource(show_spinner=False)
+def get_report_updater():
+    """Creates the report updater once per server process."""
+    return ReportUpdater(get_google_services(), get_local_store(), get_worksheet_cache())
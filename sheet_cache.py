@@ -0,0 +1,102 @@
+import threading
+import time
+
+import streamlit as st
+
+from google_services import get_google_services
+
+# How long a downloaded worksheet is served before it is fetched again
+DEFAULT_TTL_SECONDS = 60
+
+
+class WorksheetCache:
+    """Read-through cache of whole worksheets as DataFrames, shared by every session.
+
+    Entries expire after `ttl_seconds` and are dropped whenever the app writes to the
+    worksheet through `append_row`/`update_row`. Concurrent misses for the same worksheet
+    wait on one fetch instead of each downloading the sheet.
+    """
+
+    def __init__(self, services, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.services = services
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}  # title -> (DataFrame, fetched_at)
+        self._versions = {}  # title -> bumped on every invalidation
+        self._locks = {}  # title -> lock held while fetching it
+        # Guards the entries, versions, stats and per-title locks; never held while fetching
+        self._guard = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _lock_for(self, title):
+        with self._guard:
+            return self._locks.setdefault(title, threading.Lock())
+
+    def _fresh_entry(self, title):
+        """The unexpired entry for `title`, counted as a hit, or None."""
+        with self._guard:
+            entry = self._entries.get(title)
+            if entry and time.monotonic() - entry[1] < self.ttl_seconds:
+                self.hits += 1
+                return entry
+        return None
+
+    def _fetch(self, title):
+        # Imported on first fetch: pages that only queue writes through the cache never need pandas
+        import pandas as pd
+
+        records = self.services.call_worksheet(title, lambda ws: ws.get_all_records())
+        return pd.DataFrame(records)
+
+    def get_dataframe(self, title):
+        """Returns the worksheet's records as a DataFrame the caller is free to modify."""
+        entry = self._fresh_entry(title)
+        if entry is None:
+            with self._lock_for(title):
+                # Another session may have fetched it while we waited for the lock
+                entry = self._fresh_entry(title)
+                if entry is None:
+                    version = self.version(title)
+                    df = self._fetch(title)
+                    entry = (df, time.monotonic())
+                    with self._guard:
+                        # Only store the result if no write happened while we were downloading
+                        if self._versions.get(title, 0) == version:
+                            self._entries[title] = entry
+                        self.misses += 1
+        return entry[0].copy()
+
+    def version(self, title):
+        """Data version of a worksheet, bumped every time the app writes to it."""
+        with self._guard:
+            return self._versions.get(title, 0)
+
+    def invalidate(self, title=None):
+        with self._guard:
+            titles = [title] if title else list(set(self._entries) | set(self._versions))
+            for name in titles:
+                self._entries.pop(name, None)
+                self._versions[name] = self._versions.get(name, 0) + 1
+
+    # Writes go through the cache so it never serves data older than the app's own changes
+    def append_row(self, title, row, **kwargs):
+        try:
+            return self.services.call_worksheet(title, lambda ws: ws.append_row(row, **kwargs), write=True, idempotent=False)
+        finally:
+            self.invalidate(title)
+
+    def update_row(self, title, row_number, values, **kwargs):
+        """Overwrites sheet row `row_number` (1-based, header is row 1) starting at column A."""
+        try:
+            return self.services.call_worksheet(
+                title, lambda ws: ws.update(values=[values], range_name=f"A{row_number}", **kwargs), write=True
+            )
+        finally:
+            self.invalidate(title)
+
+
+@st.cache_resource(show_spinner=False)
+def get_worksheet_cache():
+    """Creates the worksheet cache once per server process."""
+    ttl = st.secrets.get("cache", {}).get("SHEET_TTL_SECONDS", DEFAULT_TTL_SECONDS)
+    return WorksheetCache(get_google_services(), ttl_seconds=int(ttl))
@@ -0,0 +1,263 @@
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+
+import gspread
+import pandas as pd
+import streamlit as st
+
+import storage
+from api_gateway import background
+from google_services import get_google_services
+from sheet_cache import get_worksheet_cache
+
+logger = logging.getLogger(__name__)
+
+# Header of the column each appended row carries its idempotency key in
+KEY_HEADER = "submission_id"
+
+# Flushing: rows per append_rows call, how often the flusher wakes up, and retry backoff
+BATCH_SIZE = 50
+FLUSH_INTERVAL_SECONDS = 2
+MAX_ATTEMPTS = 8
+MAX_BACKOFF_SECONDS = 300
+
+# Errors after which Google certainly did not write the rows; anything else may have been written
+DEFINITE_FAILURE_CODES = (400, 403, 429)
+
+# Receipt states
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+
+class SheetOutbox:
+    """Durable write-behind queue for worksheet appends.
+
+    `enqueue` stores the row in a local SQLite database (WAL mode) and returns a receipt
+    straight away. A background thread drains pending rows to each worksheet with
+    `append_rows` in batches, retrying with exponential backoff. Every row carries its
+    receipt in the KEY_HEADER column; after an attempt whose outcome is unknown (timeout,
+    crash mid-request) the flusher reads that column back and skips rows that already
+    arrived, so each row is written exactly once.
+    """
+
+    def __init__(self, services, sheet_cache, db_name="outbox.sqlite3"):
+        self.services = services
+        self.sheet_cache = sheet_cache
+        self._conn = storage.connect(db_name)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, receipt TEXT UNIQUE NOT NULL, worksheet TEXT NOT NULL,"
+            " row_json TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0,"
+            " uncertain INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL DEFAULT 0,"
+            " last_error TEXT, created_at REAL NOT NULL, sent_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at)")
+        # Rows that were being sent when the process stopped may or may not have arrived
+        self._conn.execute("UPDATE outbox SET status = ?, uncertain = 1 WHERE status = ?", (PENDING, SENDING))
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.api_calls = 0
+
+    # Producer side
+    def enqueue(self, worksheet, row, extra=None, receipt=None):
+        """Queues a row for `worksheet` and returns its receipt (the row's idempotency key).
+
+        `extra` maps header names to values for columns that aren't part of the row's
+        fixed layout; they are placed by header, and missing headers are added to the sheet.
+        A caller that passes its own `receipt` may enqueue again after a crash: a receipt
+        that is already queued is ignored.
+        """
+        receipt = receipt or uuid.uuid4().hex
+        payload = {"row": row, "extra": extra} if extra else row
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO outbox (receipt, worksheet, row_json, status, created_at) VALUES (?, ?, ?, ?, ?)",
+                (receipt, worksheet, json.dumps(payload, default=str), PENDING, time.time()),
+            )
+            self._conn.commit()
+        self._wake.set()
+        return receipt
+
+    def status(self, receipt):
+        """Returns (status, last_error) for a receipt, or None if it is unknown."""
+        with self._lock:
+            return self._conn.execute("SELECT status, last_error FROM outbox WHERE receipt = ?", (receipt,)).fetchone()
+
+    def counts(self):
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+
+    def failed(self):
+        """Rows that were given up on, oldest first, as a DataFrame."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT receipt, worksheet, attempts, last_error, created_at FROM outbox WHERE status = ? ORDER BY id",
+                (FAILED,),
+            ).fetchall()
+        df = pd.DataFrame(rows, columns=["receipt", "worksheet", "attempts", "last_error", "created_at"])
+        df["created_at"] = pd.to_datetime(df["created_at"], unit="s")
+        return df
+
+    def retry_failed(self, receipts=None):
+        """Queues failed rows (all of them, or just `receipts`) again; returns how many were requeued.
+
+        A requeued row keeps its receipt and its uncertain flag, so one that may already have
+        arrived is still checked against the sheet before it is sent.
+        """
+        query = "UPDATE outbox SET status = ?, attempts = 0, next_attempt_at = 0 WHERE status = ?"
+        params = [PENDING, FAILED]
+        if receipts is not None:
+            receipts = list(receipts)
+            query += f" AND receipt IN ({', '.join('?' * len(receipts))})"
+            params += receipts
+        with self._lock:
+            requeued = self._conn.execute(query, params).rowcount
+            self._conn.commit()
+        self._wake.set()
+        return requeued
+
+    # Flusher
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="sheet-outbox-flusher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Give a burst of saves a moment to accumulate so they share one append_rows call
+            self._wake.wait(FLUSH_INTERVAL_SECONDS)
+            self._wake.clear()
+            try:
+                # Flushes yield the API quota to users waiting on a page
+                with background():
+                    while self.flush_once():
+                        pass
+            except Exception:
+                logger.exception("Outbox flush failed")
+
+    def _due_batch(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT worksheet FROM outbox WHERE status = ? AND next_attempt_at <= ? ORDER BY id LIMIT 1",
+                (PENDING, time.time()),
+            ).fetchone()
+            if row is None:
+                return None, []
+            worksheet = row[0]
+            batch = self._conn.execute(
+                "SELECT id, receipt, row_json, attempts, uncertain FROM outbox"
+                " WHERE status = ? AND worksheet = ? AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (PENDING, worksheet, time.time(), BATCH_SIZE),
+            ).fetchall()
+            self._conn.executemany("UPDATE outbox SET status = ? WHERE id = ?", [(SENDING, b[0]) for b in batch])
+            self._conn.commit()
+        return worksheet, batch
+
+    def _mark_sent(self, ids):
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE outbox SET status = ?, sent_at = ?, last_error = NULL WHERE id = ?",
+                [(SENT, time.time(), i) for i in ids],
+            )
+            self._conn.commit()
+
+    def _mark_failed_attempt(self, batch, error, uncertain):
+        updates = []
+        for row_id, _, _, attempts, was_uncertain in batch:
+            attempts += 1
+            status = FAILED if attempts >= MAX_ATTEMPTS else PENDING
+            delay = min(2 ** attempts, MAX_BACKOFF_SECONDS) * (0.5 + random.random())
+            updates.append((status, attempts, int(uncertain or was_uncertain), time.time() + delay, str(error), row_id))
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE outbox SET status = ?, attempts = ?, uncertain = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                updates,
+            )
+            self._conn.commit()
+
+    def _mark_rejected(self, ids, error):
+        """Fails rows for good, without another attempt."""
+        with self._lock:
+            self._conn.executemany("UPDATE outbox SET status = ?, last_error = ? WHERE id = ?",
+                                   [(FAILED, error, i) for i in ids])
+            self._conn.commit()
+
+    def _delivered_receipts(self, worksheet, key_column):
+        self.api_calls += 1
+        return set(self.services.call_worksheet(worksheet, lambda ws: ws.col_values(key_column)))
+
+    def flush_once(self):
+        """Sends one batch of due rows; returns False when nothing was due."""
+        worksheet, batch = self._due_batch()
+        if not batch:
+            return False
+
+        try:
+            key_column = self.services.header_column(worksheet, KEY_HEADER)
+
+            # A previous attempt may have reached the sheet; drop rows that are already there
+            if any(b[4] for b in batch):
+                delivered = self._delivered_receipts(worksheet, key_column)
+                already = [b[0] for b in batch if b[1] in delivered]
+                if already:
+                    self._mark_sent(already)
+                batch = [b for b in batch if b[1] not in delivered]
+                if not batch:
+                    return True
+
+            rows, overlapping = [], []
+            for entry in batch:
+                _, receipt, row_json, _, _ = entry
+                payload = json.loads(row_json)
+                row, extra = (payload["row"], payload["extra"]) if isinstance(payload, dict) else (payload, {})
+                placed = {self.services.header_column(worksheet, header): value for header, value in extra.items()}
+                placed[key_column] = receipt
+                if len(row) >= min(placed):
+                    # Sent as is, the row would overwrite its own key and could be written twice
+                    overlapping.append(entry)
+                    continue
+                row = row + [""] * (max(placed) - len(row))
+                for column, value in placed.items():
+                    row[column - 1] = value
+                rows.append(row)
+            if overlapping:
+                logger.error("%d rows for %s reach its %s column; not sending them", len(overlapping), worksheet, KEY_HEADER)
+                self._mark_rejected([b[0] for b in overlapping],
+                                    f"Row reaches the {KEY_HEADER} column (column {key_column}) of {worksheet}")
+                batch = [b for b in batch if b not in overlapping]
+                if not batch:
+                    return True
+
+            self.api_calls += 1
+            self.services.call_worksheet(worksheet, lambda ws: ws.append_rows(rows, value_input_option="RAW"),
+                                       write=True, idempotent=False)
+        except Exception as e:
+            definite = isinstance(e, gspread.exceptions.APIError) and e.code in DEFINITE_FAILURE_CODES
+            logger.warning("Appending %d rows to %s failed: %s", len(batch), worksheet, e)
+            self._mark_failed_attempt(batch, e, uncertain=not definite)
+            return False
+
+        self._mark_sent([b[0] for b in batch])
+        self.sheet_cache.invalidate(worksheet)
+        return True
+
+
+@st.cache_resource(show_spinner=False)
+def get_sheet_outbox():
+    """Creates the outbox and starts its flusher once per server process."""
+    outbox = SheetOutbox(get_google_services(), get_worksheet_cache())
+    outbox.start()
+    return outbox
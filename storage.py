@@ -0,0 +1,20 @@
+import os
+import sqlite3
+
+# Local state (upload index, caches, queues) lives here; override with RAF_DATA_DIR on deployments
+DATA_DIR = os.environ.get("RAF_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".raf_data"))
+
+
+def data_path(*parts):
+    """Returns a path inside the local data directory, creating parent folders as needed."""
+    path = os.path.join(DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def connect(name):
+    """Opens a SQLite database in the data directory that can be shared between threads."""
+    conn = sqlite3.connect(data_path(name), check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
@@ -0,0 +1,32 @@
+import pytest
+
+import storage
+from bench.fakes import Backend, install
+from bench.scenarios import SECRETS
+
+# Quotas high enough that no test waits on a bucket
+UNLIMITED = (1_000_000, 100_000)
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """Every test gets its own RAF_DATA_DIR, so SQLite stores and files never leak between tests."""
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def backend():
+    """In-process Sheets/Drive/SMTP fakes from the benchmarks, with no latency or errors."""
+    backend = Backend()
+    install(backend)
+    return backend
+
+
+@pytest.fixture
+def services(backend):
+    from api_gateway import QUOTAS, ApiGateway
+    from google_services import GoogleServices
+
+    return GoogleServices(SECRETS["gcp_service_account"], SECRETS["sheets"]["SHEET_URL"],
+                          ApiGateway({api: UNLIMITED for api in QUOTAS}))
@@ -0,0 +1,115 @@
+import pytest
+
+import api_gateway
+from api_gateway import BACKGROUND, INTERACTIVE, ApiGateway, TokenBucket, background, current_priority
+from bench.fakes import drive_error, sheets_error
+
+from .conftest import UNLIMITED
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(api_gateway, "BACKOFF_BASE_SECONDS", 0)
+
+
+def failing(*errors, result="ok"):
+    """A call that raises each of `errors` in turn, then returns `result`; counts its attempts."""
+    errors = list(errors)
+
+    def call():
+        call.attempts += 1
+        if errors:
+            raise errors.pop(0)
+        return result
+    call.attempts = 0
+    return call
+
+
+def test_bucket_starts_full_and_takes_tokens():
+    bucket = TokenBucket(60, 4)
+    for _ in range(4):
+        assert bucket.acquire() < 0.01
+    assert bucket.tokens < 1
+
+
+def test_bucket_caps_cost_at_capacity():
+    bucket = TokenBucket(60, 4)
+    assert bucket.acquire(cost=10) < 0.01
+    assert bucket.tokens < 1
+
+
+def test_background_leaves_the_interactive_reserve():
+    bucket = TokenBucket(60, 4)  # reserve is a quarter of the bucket: one token
+    for _ in range(3):
+        assert bucket.acquire(BACKGROUND) < 0.01
+    # The last token is only for interactive callers
+    assert bucket.acquire(INTERACTIVE) < 0.01
+
+
+def test_drain_empties_the_bucket():
+    bucket = TokenBucket(60, 4)
+    bucket.drain()
+    assert bucket.tokens <= 0
+
+
+def test_background_context_sets_priority_for_the_thread():
+    assert current_priority() == INTERACTIVE
+    with background():
+        assert current_priority() == BACKGROUND
+    assert current_priority() == INTERACTIVE
+
+
+def test_call_retries_rate_limited_calls_and_drains_the_bucket():
+    gateway = ApiGateway({"sheets_read": UNLIMITED})
+    call = failing(sheets_error(429))
+    assert gateway.call("sheets_read", call) == "ok"
+    assert call.attempts == 2
+    stats = gateway.stats()["sheets_read"]
+    assert stats["rate_limited"] == 1 and stats["retries"] == 1 and stats["calls"] == 2
+
+
+def test_call_retries_server_errors_of_idempotent_calls():
+    gateway = ApiGateway({"drive": UNLIMITED})
+    call = failing(drive_error(503), drive_error(500))
+    assert gateway.call("drive", call) == "ok"
+    assert call.attempts == 3
+
+
+def test_call_does_not_retry_server_errors_of_non_idempotent_calls():
+    gateway = ApiGateway({"sheets_write": UNLIMITED})
+    call = failing(sheets_error(503))
+    with pytest.raises(Exception):
+        gateway.call("sheets_write", call, idempotent=False)
+    assert call.attempts == 1
+    assert gateway.stats()["sheets_write"]["errors"] == 1
+
+
+def test_call_retries_rate_limits_of_non_idempotent_calls():
+    # A 429 means the request was refused, so even an append can be sent again
+    gateway = ApiGateway({"sheets_write": UNLIMITED})
+    call = failing(sheets_error(429))
+    assert gateway.call("sheets_write", call, idempotent=False) == "ok"
+    assert call.attempts == 2
+
+
+def test_call_does_not_retry_other_errors():
+    gateway = ApiGateway({"sheets_read": UNLIMITED})
+    call = failing(ValueError("bad range"))
+    with pytest.raises(ValueError):
+        gateway.call("sheets_read", call)
+    assert call.attempts == 1
+
+
+def test_call_gives_up_after_max_retries():
+    gateway = ApiGateway({"sheets_read": UNLIMITED})
+    call = failing(*[sheets_error(503)] * 3)
+    with pytest.raises(Exception):
+        gateway.call("sheets_read", call, max_retries=2)
+    assert call.attempts == 3
+
+
+def test_reserved_call_does_not_take_a_second_token():
+    gateway = ApiGateway({"sheets_read": UNLIMITED})
+    gateway.reserve("sheets_read")
+    gateway.call("sheets_read", failing(), reserved=True)
+    assert gateway.stats()["sheets_read"]["calls"] == 1
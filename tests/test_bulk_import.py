@@ -0,0 +1,168 @@
+import io
+
+import pandas as pd
+import pytest
+
+import bulk_import
+from bench.fakes import FakeWorksheet
+from bulk_import import (DONE, PAUSED, QUEUED, RUNNING, BulkImporter, JobTaken, job_fingerprint, map_columns,
+                         number_rows, read_chunks, validate_chunk)
+from sheet_cache import WorksheetCache
+from sheet_outbox import KEY_HEADER
+
+REPORT_TYPE = "RAF 1 Form"
+MAPPING = {"claimant_name": "Name", "claimant_id": "ID", "claim_description": "Description"}
+
+
+class Crash(BaseException):
+    """Stands in for the process being killed: nothing in the importer catches it."""
+
+
+def claims_csv(path, count):
+    # Every description holds a line break, so file lines and records differ
+    frame = pd.DataFrame({"Name": [f"Claimant {i}" for i in range(count)], "ID": [str(1000 + i) for i in range(count)],
+                          "Description": [f"Claim {i}\nsecond line" for i in range(count)]})
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def importer(backend, services):
+    backend.sheets["Claims"] = [["claimant_name", "claimant_id"]]
+    return BulkImporter(services, WorksheetCache(services), case_index=None)
+
+
+def imported_ids(backend):
+    headers = backend.sheets["Claims"][0]
+    return [row[headers.index("claimant_id")] for row in backend.sheets["Claims"][1:]]
+
+
+def imported_keys(backend):
+    headers = backend.sheets["Claims"][0]
+    return [row[headers.index(KEY_HEADER)] for row in backend.sheets["Claims"][1:]]
+
+
+# Reading
+def test_read_chunks_skips_records_not_lines(tmp_path):
+    path = claims_csv(tmp_path / "claims.csv", 10)
+    chunks = list(read_chunks(path, path, chunk_rows=3, skip_rows=4))
+    assert [list(chunk["ID"]) for chunk in chunks] == [["1004", "1005"], ["1006", "1007", "1008"], ["1009"]]
+    assert chunks[0]["Description"].iloc[0] == "Claim 4\nsecond line"
+    assert list(read_chunks(path, path, chunk_rows=3, skip_rows=10)) == []
+
+
+def test_map_columns_matches_by_name_and_takes_overrides():
+    headers = ["Claimant Name", "Claimant_ID", "Notes"]
+    assert map_columns(headers, REPORT_TYPE) == {"claimant_name": "Claimant Name", "claimant_id": "Claimant_ID"}
+    assert map_columns(headers, REPORT_TYPE, {"claim_description": "Notes"})["claim_description"] == "Notes"
+    with pytest.raises(ValueError):
+        map_columns(headers, REPORT_TYPE, {"claim_description": "Missing"})
+
+
+# Validation
+def test_validate_chunk_coerces_and_rejects():
+    frame = number_rows(pd.DataFrame({
+        "Name": ["Thandi", "", "Sipho", "Lerato"],
+        "Date": ["02/03/2021", "2021-03-02", "yesterday", "2 March 2021"],
+        "Email": ["thandi@example.com", "", "sipho@example.com", "not an email"],
+    }), 2)
+    rows, rejected = validate_chunk(frame, REPORT_TYPE, {"claimant_name": "Name", "claim_date": "Date",
+                                                         "claimant_email": "Email"})
+    assert list(rows.index) == [2]
+    assert rows.loc[2, "claim_date"] == "2021-03-02"
+    reasons = dict(zip(rejected["row"], rejected["reason"]))
+    assert reasons[3] == "claimant_name is empty"
+    assert reasons[4] == "claim_date is not a date"
+    assert reasons[5] == "claimant_email is not an email address"
+
+
+def test_validate_chunk_rejects_repeated_first_fields():
+    frame = number_rows(pd.DataFrame({"Case": ["A1", "a1", "B2", "C3"], "Speed": ["60", "60", "5", "80"]}), 2)
+    existing = {"c3"}
+    rows, rejected = validate_chunk(frame, "Accident Report", {"case_number": "Case", "speed_limit": "Speed"}, existing)
+    assert list(rows["case_number"]) == ["A1"]
+    assert list(rejected["row"]) == [3, 4, 5]
+    assert existing == {"a1", "c3"}
+
+
+# Jobs
+def test_import_writes_every_row_once_with_its_key(backend, importer, tmp_path):
+    path = claims_csv(tmp_path / "claims.csv", 25)
+    job_id = importer.create(REPORT_TYPE, path, MAPPING, chunk_rows=10)
+    job = importer.run(job_id)
+
+    assert (job["status"], job["rows_read"], job["rows_written"], job["rows_rejected"]) == (DONE, 25, 25, 0)
+    assert imported_ids(backend) == [str(1000 + i) for i in range(25)]
+    assert imported_keys(backend) == [f"{job_id}-{row}" for row in range(2, 27)]
+    assert backend.calls["sheets.append_rows"] == 3
+
+
+def test_import_killed_mid_chunk_resumes_without_duplicates(backend, services, importer, tmp_path, monkeypatch):
+    path = claims_csv(tmp_path / "claims.csv", 25)
+    job_id = importer.create(REPORT_TYPE, path, MAPPING, chunk_rows=10)
+    append_rows = FakeWorksheet.append_rows
+
+    def append_then_crash(self, values, **kwargs):
+        result = append_rows(self, values, **kwargs)
+        if backend.calls["sheets.append_rows"] == 2:
+            raise Crash()  # the second chunk reached the sheet, but its checkpoint was never written
+        return result
+
+    monkeypatch.setattr(FakeWorksheet, "append_rows", append_then_crash)
+    with pytest.raises(Crash):
+        importer.run(job_id)
+    job = importer.get(job_id)
+    assert (job["status"], job["rows_read"], job["uncertain"]) == (RUNNING, 10, 1)
+    monkeypatch.setattr(FakeWorksheet, "append_rows", append_rows)
+
+    # Another process takes the job over once the lease has run out
+    restarted = BulkImporter(services, WorksheetCache(services), case_index=None)
+    with pytest.raises(JobTaken):
+        restarted.run(job_id)
+    monkeypatch.setattr(bulk_import, "LEASE_SECONDS", -1)
+    job = restarted.run(job_id)
+
+    assert (job["status"], job["rows_read"], job["rows_written"]) == (DONE, 25, 25)
+    assert sorted(imported_ids(backend)) == [str(1000 + i) for i in range(25)]
+    assert len(set(imported_keys(backend))) == 25
+
+
+def test_paused_job_stops_after_its_chunk_and_resumes(backend, importer, tmp_path):
+    path = claims_csv(tmp_path / "claims.csv", 25)
+    job_id = importer.create(REPORT_TYPE, path, MAPPING, chunk_rows=10)
+
+    job = importer.run(job_id, on_progress=lambda job: importer.pause(job_id))
+    assert (job["status"], job["rows_read"]) == (PAUSED, 10)
+    with pytest.raises(JobTaken):
+        importer.run(job_id)
+
+    importer.resume(job_id)
+    assert importer.get(job_id)["status"] == QUEUED
+    job = importer.run(job_id)
+    assert (job["status"], job["rows_written"]) == (DONE, 25)
+    assert imported_ids(backend) == [str(1000 + i) for i in range(25)]
+
+
+def test_rejected_rows_are_reported(importer, tmp_path):
+    path = tmp_path / "claims.csv"
+    frame = pd.DataFrame({"Name": ["Thandi", "", "Sipho"], "ID": ["1", "2", "3"], "Description": ["", "", ""]})
+    frame.to_csv(path, index=False)
+    job = importer.run(importer.create(REPORT_TYPE, str(path), MAPPING))
+
+    assert (job["rows_written"], job["rows_rejected"]) == (2, 1)
+    rejected = pd.read_csv(job["rejected_path"])
+    assert list(rejected["row"]) == [3] and list(rejected["reason"]) == ["claimant_name is empty"]
+
+
+def test_same_file_and_mapping_reuse_the_job(importer, tmp_path):
+    def upload(data):
+        uploaded = io.BytesIO(data)
+        uploaded.name = "claims.csv"
+        return uploaded
+
+    first = importer.create(REPORT_TYPE, upload(b"Name,ID\nThandi,1\n"), MAPPING)
+    assert importer.create(REPORT_TYPE, upload(b"Name,ID\nThandi,1\n"), MAPPING) == first
+    assert importer.create(REPORT_TYPE, upload(b"Name,ID\nSipho,2\n"), MAPPING) != first
+    assert importer.create(REPORT_TYPE, upload(b"Name,ID\nThandi,1\n"), {"claimant_name": "Name"}) != first
+    assert len(importer.jobs()) == 3
+    assert importer.find(job_fingerprint(upload(b"Name,ID\nThandi,1\n"), REPORT_TYPE, MAPPING))["job_id"] == first
@@ -0,0 +1,68 @@
+import io
+
+import pytest
+
+import drive_uploads
+from drive_uploads import UploadIndex, drive_file_url, upload_files_to_drive, upload_key
+
+
+def upload(data, name="photo.jpg"):
+    uploaded = io.BytesIO(data)
+    uploaded.name = name
+    return uploaded
+
+
+@pytest.fixture
+def index():
+    return UploadIndex()
+
+
+def test_upload_key_is_content_and_name():
+    assert upload_key(upload(b"abc"), "a.jpg") == upload_key(upload(b"abc"), "a.jpg")
+    assert upload_key(upload(b"abc"), "a.jpg") != upload_key(upload(b"abd"), "a.jpg")
+    assert upload_key(upload(b"abc"), "a.jpg") != upload_key(upload(b"abc"), "b.jpg")
+
+
+def test_upload_index_survives_a_restart(index):
+    index.put("key", "file1", drive_file_url("file1"), "a.jpg", 3)
+    assert UploadIndex().get("key") == drive_file_url("file1")
+    index.forget("key")
+    assert index.get("key") is None
+    assert UploadIndex().get("key") is None
+
+
+def test_bulk_upload_sends_each_file_once_and_shares_them_in_one_batch(backend, services, index):
+    files = [upload(b"one"), upload(b"two"), upload(b"one")]
+    results = upload_files_to_drive(files, ["1.jpg", "2.jpg", "1.jpg"], services=services, index=index)
+
+    assert [r.error for r in results] == [None, None, None]
+    assert results[0].url == results[2].url != results[1].url
+    assert backend.calls["drive.files.create"] == 2
+    assert backend.calls["drive.batch"] == 1
+    assert index.get(upload_key(upload(b"two"), "2.jpg")) == results[1].url
+
+
+def test_uploaded_files_are_not_sent_again(backend, services, index):
+    first = upload_files_to_drive([upload(b"one")], ["1.jpg"], services=services, index=index)
+    again = upload_files_to_drive([upload(b"one")], ["1.jpg"], services=services, index=index)
+    assert again == first
+    assert backend.calls["drive.files.create"] == 1
+
+
+def test_files_that_cant_be_shared_are_deleted_and_not_indexed(backend, services, index, monkeypatch):
+    def refuse(gateway, drive_service, file_ids, http=None):
+        return {file_id: "Permission denied" for file_id in file_ids}
+
+    monkeypatch.setattr(drive_uploads, "_make_public_batch", refuse)
+    results = upload_files_to_drive([upload(b"one")], ["1.jpg"], services=services, index=index)
+
+    assert results[0].url is None and results[0].error == "Permission denied"
+    assert backend.drive_files == {}
+    assert index.get(upload_key(upload(b"one"), "1.jpg")) is None
+
+
+def test_progress_reaches_the_total(backend, services, index):
+    progress = []
+    upload_files_to_drive([upload(b"x" * 10), upload(b"y" * 5)], ["1.jpg", "2.jpg"], services=services, index=index,
+                          on_progress=lambda sent, total: progress.append((sent, total)))
+    assert progress[-1] == (15, 15)
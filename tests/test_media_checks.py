@@ -0,0 +1,58 @@
+import io
+import struct
+
+from media_checks import (MAX_MEDIA_SECONDS, check_media_limits, media_duration_seconds, mp3_duration_seconds,
+                          mp4_duration_seconds)
+
+
+def box(box_type, body):
+    return struct.pack(">I4s", 8 + len(body), box_type) + body
+
+
+def mp4(seconds, timescale=600, version=0):
+    if version == 1:
+        mvhd = bytes([1, 0, 0, 0]) + b"\0" * 16 + struct.pack(">IQ", timescale, int(seconds * timescale))
+    else:
+        mvhd = bytes([0, 0, 0, 0]) + b"\0" * 8 + struct.pack(">II", timescale, int(seconds * timescale))
+    return box(b"ftyp", b"isom\0\0\0\0") + box(b"moov", box(b"mvhd", mvhd + b"\0" * 80))
+
+
+def cbr_mp3(seconds):
+    # MPEG-1 layer III, 128 kbps, 44.1 kHz: 16,000 bytes a second
+    return b"\xff\xfb\x90\x00" + b"\0" * (int(seconds * 16000) - 4)
+
+
+def upload(data, name):
+    uploaded = io.BytesIO(data)
+    uploaded.name = name
+    return uploaded
+
+
+def test_mp4_duration_from_mvhd():
+    assert mp4_duration_seconds(mp4(90)) == 90
+    assert mp4_duration_seconds(mp4(42.5, timescale=1000, version=1)) == 42.5
+    assert mp4_duration_seconds(box(b"ftyp", b"isom")) is None
+
+
+def test_mp3_duration_of_a_constant_bitrate_file():
+    assert mp3_duration_seconds(cbr_mp3(3)) == 3
+    assert mp3_duration_seconds(b"\0" * 100) is None
+
+
+def test_mp3_duration_skips_an_id3_tag():
+    tag = b"ID3\x04\x00\x00" + bytes([0, 0, 0, 10]) + b"\0" * 10
+    assert mp3_duration_seconds(tag + cbr_mp3(2)) == 2
+
+
+def test_unreadable_media_has_no_duration():
+    assert media_duration_seconds(upload(b"moov", "clip.mp4"), "clip.mp4") is None
+    assert media_duration_seconds(upload(b"\xff\xfb", "note.mp3"), "note.mp3") is None
+    assert media_duration_seconds(upload(mp4(10), "clip.mov"), "clip.mov") is None
+
+
+def test_media_limits():
+    long_clip = upload(mp4(MAX_MEDIA_SECONDS + 60), "long.mp4")
+    short_note = upload(cbr_mp3(5), "note.mp3")
+    problems = check_media_limits([object()] * 3, [(long_clip, "long.mp4"), (short_note, "note.mp3")])
+    assert len(problems) == 1 and "long.mp4" in problems[0]
+    assert check_media_limits([object()] * 21, [])
@@ -0,0 +1,83 @@
+import json
+
+import pandas as pd
+
+from report_records import (DRIVER_FIELDS, VEHICLE_FIELDS, WITNESS_FIELDS, decode_cell, decode_list, decode_record,
+                            encode_list, encode_record, expand_drivers, migrate_cell)
+
+
+def driver(**values):
+    return [values.get(field, f"{field} value") for field in DRIVER_FIELDS]
+
+
+def test_record_round_trip():
+    values = driver(name="Sipho Ndlovu", residential_address="12 Main Rd, Soweto", under_influence="No")
+    cell = encode_record(values, DRIVER_FIELDS)
+    assert json.loads(cell)["v"] == 1
+    assert decode_record(cell) == dict(zip(DRIVER_FIELDS, values))
+
+
+def test_record_keeps_non_ascii_text_and_blanks_missing_values():
+    cell = encode_record(["Zoë Müller", None, 3], ["name", "id", "injuries"])
+    assert "Zoë Müller" in cell
+    assert decode_record(cell, ["name", "id", "injuries"]) == {"name": "Zoë Müller", "id": "", "injuries": "3"}
+
+
+def test_list_round_trip():
+    vehicles = [["CA 123-456", "Toyota", "Corolla", 2015, "White"], ["GP 1", "VW", "Polo", 2020, "Red"]]
+    cell = encode_list(vehicles, VEHICLE_FIELDS)
+    assert decode_list(cell, VEHICLE_FIELDS) == [dict(zip(VEHICLE_FIELDS, map(str, vehicle))) for vehicle in vehicles]
+    assert decode_list(encode_list([], WITNESS_FIELDS), WITNESS_FIELDS) == []
+
+
+def test_empty_cells_decode_to_nothing():
+    assert decode_record("") == {}
+    assert decode_record(None) == {}
+    assert decode_list("", VEHICLE_FIELDS) == []
+
+
+def test_legacy_driver_cell_is_parsed():
+    values = driver(name="Sipho", under_influence="Yes")
+    assert decode_record(", ".join(values)) == dict(zip(DRIVER_FIELDS, values))
+
+
+def test_legacy_driver_cell_with_commas_in_an_address():
+    # The fixed fields are taken from both ends; the two addresses can't be told apart, so the raw cell is kept
+    values = driver(residential_address="12 Main Rd, Soweto", work_address="1 Fox St")
+    cell = ", ".join(values)
+    record = decode_record(cell)
+    assert record["residential_address"] == "12 Main Rd, Soweto, 1 Fox St"
+    assert record["work_address"] == ""
+    assert record["license_url"] == values[-1] and record["name"] == values[0]
+    assert record["_raw"] == cell
+
+
+def test_legacy_list_cell_is_parsed():
+    cell = ", ".join(str(item) for item in [["CA 1", "Toyota", "Corolla", 2015, "White"]])
+    assert decode_list(cell, VEHICLE_FIELDS) == [
+        {"registration_number": "CA 1", "make": "Toyota", "model": "Corolla", "year": "2015", "color": "White"}]
+
+
+def test_unparseable_legacy_cells_are_kept_raw():
+    assert decode_list("not a list (", VEHICLE_FIELDS) == [{"_raw": "not a list ("}]
+    assert decode_record("too, short") == {"_raw": "too, short"}
+
+
+def test_migrate_cell_converts_legacy_cells_only():
+    legacy = ", ".join(driver())
+    migrated = migrate_cell("driver_a_info", legacy)
+    assert decode_cell("driver_a_info", migrated) == decode_record(legacy)
+    assert migrate_cell("driver_a_info", migrated) is None
+    assert migrate_cell("vehicle_info", "") is None
+
+
+def test_expand_drivers_adds_flat_columns():
+    df = pd.DataFrame({
+        "case_number": ["A1", "A2"],
+        "driver_a_info": [encode_record(driver(under_influence="Yes"), DRIVER_FIELDS), ""],
+        "driver_b_info": [", ".join(driver(under_influence="No")), encode_record(driver(), DRIVER_FIELDS)],
+    })
+    out = expand_drivers(df)
+    assert list(out["driver_a_under_influence"]) == ["Yes", ""]
+    assert list(out["driver_b_under_influence"]) == ["No", "under_influence value"]
+    assert "driver_a_info" in out.columns
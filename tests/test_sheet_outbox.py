@@ -0,0 +1,125 @@
+import pytest
+
+from bench.fakes import Faults
+from sheet_cache import WorksheetCache
+from sheet_outbox import FAILED, KEY_HEADER, PENDING, SENT, SheetOutbox
+
+HEADERS = ["claimant_name", "claimant_id"]
+
+
+@pytest.fixture
+def outbox(backend, services):
+    backend.sheets["Claims"] = [list(HEADERS)]
+    return SheetOutbox(services, WorksheetCache(services))
+
+
+def rows(backend):
+    return backend.sheets["Claims"][1:]
+
+
+def test_row_is_appended_with_its_receipt(backend, outbox):
+    receipt = outbox.enqueue("Claims", ["Thandi", "8001015009087"])
+    assert outbox.status(receipt) == (PENDING, None)
+
+    assert outbox.flush_once()
+    assert not outbox.flush_once()
+    key_column = backend.sheets["Claims"][0].index(KEY_HEADER)
+    assert rows(backend) == [["Thandi", "8001015009087"] + [""] * (key_column - 2) + [receipt]]
+    assert outbox.status(receipt) == (SENT, None)
+
+
+def test_a_burst_of_rows_goes_out_in_one_append(backend, outbox):
+    for i in range(5):
+        outbox.enqueue("Claims", [f"claimant {i}", str(i)])
+    outbox.flush_once()
+    assert backend.calls["sheets.append_rows"] == 1
+    assert len(rows(backend)) == 5
+
+
+def test_enqueueing_a_receipt_again_is_ignored(backend, outbox):
+    outbox.enqueue("Claims", ["Thandi", "1"], receipt="r1")
+    outbox.enqueue("Claims", ["Thandi", "1"], receipt="r1")
+    outbox.flush_once()
+    assert len(rows(backend)) == 1
+
+
+def test_extra_values_are_placed_by_header(backend, outbox):
+    outbox.enqueue("Claims", ["Thandi", "1"], extra={"claim_date": "2024-05-01"})
+    outbox.flush_once()
+    headers = backend.sheets["Claims"][0]
+    assert rows(backend)[0][headers.index("claim_date")] == "2024-05-01"
+
+
+def test_rows_that_may_have_arrived_are_read_back_not_sent_again(backend, outbox):
+    receipt = outbox.enqueue("Claims", ["Thandi", "1"])
+    outbox.flush_once()
+    # As after a timeout or a restart mid-request: the row is in the sheet but the outcome was unknown
+    with outbox._lock:
+        outbox._conn.execute("UPDATE outbox SET status = ?, uncertain = 1", (PENDING,))
+        outbox._conn.commit()
+
+    assert outbox.flush_once()
+    assert len(rows(backend)) == 1
+    assert backend.calls["sheets.append_rows"] == 1
+    assert outbox.status(receipt)[0] == SENT
+
+
+def test_server_error_leaves_the_row_pending_and_uncertain(backend, outbox):
+    receipt = outbox.enqueue("Claims", ["Thandi", "1"])
+    outbox.services.header_column("Claims", KEY_HEADER)
+    backend.faults["sheets"] = Faults(error_rate=1.0, error_status=503)
+
+    assert not outbox.flush_once()
+    status, error = outbox.status(receipt)
+    assert status == PENDING and error
+    assert outbox._conn.execute("SELECT attempts, uncertain FROM outbox").fetchone() == (1, 1)
+
+
+def test_rate_limit_leaves_the_row_certain(backend, outbox, monkeypatch):
+    import api_gateway
+
+    monkeypatch.setattr(api_gateway, "BACKOFF_BASE_SECONDS", 0)
+    outbox.enqueue("Claims", ["Thandi", "1"])
+    outbox.services.header_column("Claims", KEY_HEADER)
+    backend.faults["sheets"] = Faults(error_rate=1.0, error_status=429)
+
+    assert not outbox.flush_once()
+    assert outbox._conn.execute("SELECT uncertain FROM outbox").fetchone() == (0,)
+
+
+def test_row_reaching_the_key_column_is_rejected_and_can_be_retried(backend, outbox):
+    key_column = outbox.services.header_column("Claims", KEY_HEADER)
+    receipt = outbox.enqueue("Claims", ["x"] * key_column)
+
+    assert outbox.flush_once()
+    assert rows(backend) == []
+    assert outbox.status(receipt)[0] == FAILED
+    failed = outbox.failed()
+    assert list(failed["receipt"]) == [receipt]
+
+    assert outbox.retry_failed() == 1
+    assert outbox.status(receipt)[0] == PENDING
+    assert outbox.failed().empty
+
+
+def test_retry_failed_only_requeues_the_given_receipts(outbox):
+    first = outbox.enqueue("Claims", ["a", "1"])
+    second = outbox.enqueue("Claims", ["b", "2"])
+    with outbox._lock:
+        outbox._conn.execute("UPDATE outbox SET status = ?", (FAILED,))
+        outbox._conn.commit()
+
+    assert outbox.retry_failed([second]) == 1
+    assert outbox.status(first)[0] == FAILED
+    assert outbox.status(second)[0] == PENDING
+
+
+def test_rows_being_sent_at_a_restart_are_resent_as_uncertain(services, outbox):
+    outbox.enqueue("Claims", ["Thandi", "1"])
+    with outbox._lock:
+        outbox._conn.execute("UPDATE outbox SET status = 'sending'")
+        outbox._conn.commit()
+
+    restarted = SheetOutbox(services, WorksheetCache(services))
+    assert restarted.counts() == {PENDING: 1}
+    assert restarted._conn.execute("SELECT uncertain FROM outbox").fetchone() == (1,)
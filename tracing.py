@@ -0,0 +1,163 @@
+import functools
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+
+import streamlit as st
+
+import storage
+
+logger = logging.getLogger(__name__)
+
+# Latest durations kept per operation for the percentiles
+WINDOW = 2048
+
+# The Prometheus text file is rewritten this often (e.g. for node_exporter's textfile collector)
+EXPORT_INTERVAL_SECONDS = 60
+EXPORT_FILE = "metrics.prom"
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Span:
+    """What a traced block reports besides its duration: rows and bytes it handled."""
+
+    __slots__ = ("rows", "bytes")
+
+    def __init__(self):
+        self.rows = 0
+        self.bytes = 0
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values))) - 1))]
+
+
+class Tracer:
+    """Times named operations (spans) and keeps per-operation latency windows and totals.
+
+    Recording a span is two perf_counter calls and a deque append under a lock; the
+    percentiles are only computed when the diagnostics page or the exporter asks. Spans
+    can be used from any thread, including upload and flush workers.
+    """
+
+    def __init__(self, window=WINDOW):
+        self._lock = threading.Lock()
+        self._durations = defaultdict(lambda: deque(maxlen=window))
+        self._totals = defaultdict(Counter)
+        self._exporter = None
+
+    def record(self, name, seconds, rows=0, nbytes=0, error=False):
+        with self._lock:
+            self._durations[name].append(seconds)
+            totals = self._totals[name]
+            totals["count"] += 1
+            totals["seconds"] += seconds
+            totals["rows"] += rows
+            totals["bytes"] += nbytes
+            totals["errors"] += int(error)
+
+    @contextmanager
+    def span(self, name):
+        """Times the block under `name`; the yielded Span takes row and byte counts."""
+        span = Span()
+        started = time.perf_counter()
+        error = False
+        try:
+            yield span
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.record(name, time.perf_counter() - started, span.rows, span.bytes, error)
+
+    def traced(self, name=None):
+        """Decorator timing every call of a function (named after it unless `name` is given)."""
+        def decorate(func):
+            span_name = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def summary(self):
+        """One dict per operation: count, errors, rows, bytes, mean and p50/p95/p99/max in milliseconds."""
+        with self._lock:
+            snapshot = {name: (sorted(durations), dict(self._totals[name])) for name, durations in self._durations.items()}
+        rows = []
+        for name, (durations, totals) in sorted(snapshot.items()):
+            row = {"operation": name, "count": totals["count"], "errors": totals["errors"],
+                   "rows": totals["rows"], "bytes": totals["bytes"],
+                   "mean_ms": 1000 * totals["seconds"] / max(totals["count"], 1)}
+            for q in QUANTILES:
+                row[f"p{int(q * 100)}_ms"] = 1000 * percentile(durations, q)
+            row["max_ms"] = 1000 * (durations[-1] if durations else 0.0)
+            rows.append(row)
+        return rows
+
+    def prometheus_text(self):
+        """All operations in the Prometheus text exposition format."""
+        def label(name):
+            return name.replace("\\", "\\\\").replace('"', '\\"')
+
+        lines = ["# HELP raf_operation_seconds Latency of traced operations.", "# TYPE raf_operation_seconds summary"]
+        counters = []
+        for row in self.summary():
+            op = label(row["operation"])
+            for q in QUANTILES:
+                lines.append(f'raf_operation_seconds{{operation="{op}",quantile="{q}"}} {row[f"p{int(q * 100)}_ms"] / 1000:.6f}')
+            lines.append(f'raf_operation_seconds_sum{{operation="{op}"}} {row["mean_ms"] * row["count"] / 1000:.6f}')
+            lines.append(f'raf_operation_seconds_count{{operation="{op}"}} {row["count"]}')
+            counters.append((op, row))
+        for metric, key, help_text in (("raf_operation_errors_total", "errors", "Traced operations that raised."),
+                                       ("raf_operation_rows_total", "rows", "Rows handled by traced operations."),
+                                       ("raf_operation_bytes_total", "bytes", "Bytes handled by traced operations.")):
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            lines += [f'{metric}{{operation="{op}"}} {row[key]}' for op, row in counters]
+        return "\n".join(lines) + "\n"
+
+    def export_prometheus(self, path=None):
+        """Writes the metrics to `path` (default: metrics.prom in the data directory) atomically."""
+        path = path or storage.data_path(EXPORT_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as metrics_file:
+            metrics_file.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+        return path
+
+    def start_exporter(self, interval=EXPORT_INTERVAL_SECONDS):
+        """Rewrites the Prometheus file every `interval` seconds on a daemon thread."""
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.export_prometheus()
+                except Exception:
+                    logger.exception("Exporting metrics failed")
+
+        with self._lock:
+            if self._exporter is None:
+                self._exporter = threading.Thread(target=run, name="metrics-exporter", daemon=True)
+                self._exporter.start()
+
+
+# One tracer per process, used directly by modules that time their calls; get_tracer also starts the exporter
+TRACER = Tracer()
+span = TRACER.span
+traced = TRACER.traced
+
+
+@st.cache_resource(show_spinner=False)
+def get_tracer():
+    """Returns the process tracer and starts its Prometheus file exporter once per server process."""
+    TRACER.start_exporter()
+    return TRACER
@@ -0,0 +1 @@
+"""The app's pages, one module each. app.py imports a page's module the first time that page is shown."""
@@ -0,0 +1,58 @@
+import folium
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+from streamlit_folium import st_folium
+
+from tracing import span, traced
+
+
+@traced("page.accident_data_dashboard")
+def accident_data_dashboard():
+    st.title('Accident Data Dashboard')
+
+
+    # Sample data with 5 static locations
+    data = pd.DataFrame({
+        'Location': ['Location 1', 'Location 2', 'Location 3', 'Location 4', 'Location 5'],
+        'Accidents': [10, 15, 7, 5, 20],
+        'Severity': [2.5, 3.0, 1.8, 2.0, 4.5],
+        'Latitude': [-33.918861, -34.418861, -33.928861, -33.948861, -34.128861],
+        'Longitude': [18.423300, 19.423300, 18.533300, 18.623300, 19.223300]
+    })
+
+
+    # Simulate the user's current location
+    def simulate_geolocation():
+        return -33.918861, 18.423300
+
+
+    current_lat, current_lon = simulate_geolocation()
+    st.write(f"Simulated current location is: ({current_lat}, {current_lon})")
+
+
+    # Interactive Folium map centered on the user's location
+    m = folium.Map(location=[current_lat, current_lon], zoom_start=10)
+
+
+    # Adding markers for static accident locations
+    for i, row in data.iterrows():
+        folium.Marker(
+            location=[row['Latitude'], row['Longitude']],
+            popup=f"Location: {row['Location']}\nAccidents: {row['Accidents']}\nSeverity: {row['Severity']}",
+        ).add_to(m)
+
+
+    # Display the interactive map
+    with span("render.st_folium"):
+        st_folium(m, width=725)
+
+
+    # Filter data based on user selection
+    severity_filter = st.slider('Select Severity', min_value=1.0, max_value=5.0, step=0.1)
+    filtered_data = data[data['Severity'] >= severity_filter]
+
+
+    # Bar chart visualization for filtered data
+    fig = px.bar(filtered_data, x='Location', y='Accidents', color='Severity', title='Accidents by Location')
+    st.plotly_chart(fig)
@@ -0,0 +1,543 @@
+import json
+import secrets
+
+import streamlit as st
+
+from drafts import CONFLICT, DRAFT, QUEUED, READY, SYNCING, get_draft_store
+from google_services import get_google_services
+from media_checks import check_media_limits
+from report_records import DRIVER_FIELDS, VEHICLE_FIELDS, WITNESS_FIELDS
+from sheet_outbox import get_sheet_outbox
+from tracing import traced
+
+# Labels of the vehicle and witness fields, in VEHICLE_FIELDS / WITNESS_FIELDS order
+VEHICLE_LABELS = ["Registration Number", "Make", "Model", "Year", "Color"]
+WITNESS_LABELS = ["Name", "ID", "Contact Details (Phone, Email, etc.)"]
+
+# Session-state keys of the accident details and their defaults
+ACCIDENT_KEYS = [
+    "accident_case_number", "accident_date", "accident_road_name", "accident_time", "accident_police_station",
+    "accident_police_reference_number", "accident_speed_limit", "accident_weather", "accident_road_condition",
+]
+FIELD_DEFAULTS = {
+    "accident_road_name": "Unknown Road",
+    "accident_police_station": "Unknown Police Station",
+    **{f"{driver}_{field}": value for driver in ("driver_a", "driver_b")
+       for field, value in (("name", "Unknown"), ("id", "0000000000"), ("injuries", "None"))},
+}
+
+# Session-state keys of the evidence uploaders
+PHOTOS_KEY = "accident_images"
+VIDEO_KEY = "accident_video"
+VOICE_NOTES_KEY = "voice_notes"
+
+# Driver fields that only apply when the Yes/No question they follow was answered Yes
+DEPENDENT_DRIVER_FIELDS = {"company": "employment_status", "medical_aid_company": "medical_aid",
+                           "insurance_company": "car_insurance"}
+
+# The draft this session is editing is remembered in the session and in the URL (?draft=...),
+# so a reconnect or a reload picks it up again
+DRAFT_KEY = "draft_case_number"
+DRAFT_QUERY_PARAM = "draft"
+
+# Drafts are kept on the server for every session; each belongs to the random owner token of
+# the form that started it, also kept in the session and the URL (?owner=...)
+DRAFT_OWNER_KEY = "draft_owner"
+DRAFT_OWNER_PARAM = "owner"
+
+DRAFT_STATUS_LABELS = {
+    DRAFT: "Draft",
+    READY: "Waiting to sync",
+    SYNCING: "Syncing",
+    QUEUED: "Files uploaded, row queued",
+    CONFLICT: "Case number already exists",
+}
+
+
+def driver_key(driver_label, field):
+    """Session-state key of a driver field, e.g. driver_a_name."""
+    return f"{driver_label.lower().replace(' ', '_')}_{field}"
+
+
+def form_keys():
+    """Session-state keys of every value on the Accident Report tab (uploads aside)."""
+    state = st.session_state
+    keys = ACCIDENT_KEYS + ["num_vehicles", "num_witnesses"]
+    keys += [f"vehicle_{i}_{field}" for i in range(state.get("num_vehicles", 1)) for field in VEHICLE_FIELDS]
+    keys += [driver_key(driver, field) for driver in ("Driver A", "Driver B") for field in DRIVER_FIELDS[:-1]]
+    keys += [f"witness_{i}_{field}" for i in range(state.get("num_witnesses", 0)) for field in WITNESS_FIELDS]
+    return keys
+
+
+# Drafts
+def draft_owner():
+    """This form's owner token: taken from the URL after a reload, otherwise a new one."""
+    state = st.session_state
+    if DRAFT_OWNER_KEY not in state:
+        token = st.query_params.get(DRAFT_OWNER_PARAM, "")
+        state[DRAFT_OWNER_KEY] = token if len(token) >= 16 else secrets.token_urlsafe(16)
+    if st.query_params.get(DRAFT_OWNER_PARAM) != state[DRAFT_OWNER_KEY]:
+        st.query_params[DRAFT_OWNER_PARAM] = state[DRAFT_OWNER_KEY]
+    return state[DRAFT_OWNER_KEY]
+
+
+def open_draft(case_number):
+    """Loads one of this form's drafts into it (a button callback, so it runs before the widgets are drawn)."""
+    draft = get_draft_store().get(case_number, draft_owner())
+    if draft is None:
+        return
+    state = st.session_state
+    for key in form_keys():
+        state.pop(key, None)
+    for key, value in {**FIELD_DEFAULTS, **draft["fields"]}.items():
+        state[key] = value
+    state[DRAFT_KEY] = case_number
+    state["_draft_media"] = {}
+    state.pop("_draft_saved", None)
+    st.query_params[DRAFT_QUERY_PARAM] = case_number
+
+
+def discard_draft(case_number):
+    get_draft_store().discard(case_number, draft_owner())
+    if st.session_state.get(DRAFT_KEY) == case_number:
+        st.session_state.pop(DRAFT_KEY, None)
+        st.query_params.pop(DRAFT_QUERY_PARAM, None)
+
+
+def blocking_draft(case_number):
+    """Another draft for this case number, or this session's draft once it was submitted; None if saving may go ahead.
+
+    Someone else's draft comes back with only its case number, and status None.
+    """
+    drafts = get_draft_store()
+    draft = drafts.get(case_number, draft_owner())
+    if draft is None:
+        return {"case_number": case_number, "status": None} if drafts.is_taken(case_number, draft_owner()) else None
+    if case_number == st.session_state.get(DRAFT_KEY) and draft["status"] in (DRAFT, CONFLICT):
+        return None
+    return draft
+
+
+def autosave():
+    """Saves the form to this form's draft of its case number; returns that case number, or None if nothing was saved."""
+    state = st.session_state
+    case_number = str(state.get("accident_case_number") or "").strip()
+    if not case_number:
+        return None
+    values = {key: state[key] for key in form_keys() if key in state}
+    snapshot = (case_number, json.dumps(values, default=str, sort_keys=True))
+    if state.get("_draft_saved") == snapshot:
+        return case_number
+    if blocking_draft(case_number):
+        return None
+    if not get_draft_store().save_fields(case_number, values, draft_owner(), previous=state.get(DRAFT_KEY)):
+        return None
+    state["_draft_saved"] = snapshot
+    if state.get(DRAFT_KEY) != case_number:
+        state[DRAFT_KEY] = case_number
+        st.query_params[DRAFT_QUERY_PARAM] = case_number
+    return case_number
+
+
+def autosave_media(group, files):
+    """Keeps newly picked files with the draft; files kept earlier stay until replaced or removed."""
+    files = [f for f in files if f is not None]
+    case_number = autosave()
+    if not files or case_number is None:
+        return
+    saved = st.session_state.setdefault("_draft_media", {})
+    signature = (case_number, tuple((f.file_id, f.size) for f in files))
+    if saved.get(group) != signature and get_draft_store().save_media(case_number, group, files, draft_owner()):
+        saved[group] = signature
+
+
+def kept_files_note(groups, key):
+    """Lists the files kept with this session's draft for `groups`, with a button to remove them."""
+    case_number = st.session_state.get(DRAFT_KEY)
+    if not case_number:
+        return
+    kept = [(name, group, original_name)
+            for name, group, original_name, _ in get_draft_store().media(case_number, draft_owner()) if group in groups]
+    if not kept:
+        return
+    st.caption("Kept with the draft: " + ", ".join(original_name or name for name, _, original_name in kept))
+    if st.button("Remove kept files", key=key):
+        # The files still in the uploader aren't kept again unless they are picked anew
+        for group in groups:
+            get_draft_store().save_media(case_number, group, [], draft_owner())
+        st.rerun(scope="fragment")
+
+
+def drafts_section():
+    owner = draft_owner()
+    drafts = get_draft_store().drafts(owner)
+    if not drafts:
+        return
+    sheet_outbox = get_sheet_outbox()
+    with st.expander(f"Your drafts, kept on the server ({len(drafts)})", expanded=any(d["status"] == CONFLICT for d in drafts)):
+        for draft in drafts:
+            case_number, status = draft["case_number"], draft["status"]
+            label = DRAFT_STATUS_LABELS.get(status, status)
+            if status == QUEUED and draft["receipt"]:
+                row_status = sheet_outbox.status(draft["receipt"])
+                label = f"Row {row_status[0]}" if row_status else label
+            st.markdown(f"**Case {case_number}** · {label} · {draft['files']} file(s) kept")
+            if draft["last_error"]:
+                st.caption(draft["last_error"])
+            columns = st.columns(4)
+            if status in (DRAFT, CONFLICT):
+                columns[0].button("Open", key=f"draft_open_{case_number}", on_click=open_draft, args=(case_number,))
+            if status == CONFLICT:
+                columns[1].button("Send anyway", key=f"draft_force_{case_number}",
+                                  on_click=get_draft_store().send_anyway, args=(case_number, owner))
+            if status == READY and draft["last_error"]:
+                columns[1].button("Retry now", key=f"draft_retry_{case_number}",
+                                  on_click=get_draft_store().retry_now, args=(case_number, owner))
+            if status != SYNCING:
+                columns[3].button("Discard" if status != QUEUED else "Clear", key=f"draft_discard_{case_number}",
+                                  on_click=discard_draft, args=(case_number,))
+
+
+# Pages
+@traced("page.accident_report_page")
+def accident_report_page():
+    st.title("Accident Management System")
+    get_google_services().mark_rerun()
+
+    # A new session (reload, dropped connection) carries on with the draft named in the URL,
+    # if the URL's owner token is the draft's
+    state = st.session_state
+    if DRAFT_KEY not in state and st.query_params.get(DRAFT_QUERY_PARAM):
+        draft = get_draft_store().get(st.query_params[DRAFT_QUERY_PARAM], draft_owner())
+        if draft and draft["status"] in (DRAFT, CONFLICT):
+            open_draft(draft["case_number"])
+    for key, value in FIELD_DEFAULTS.items():
+        state.setdefault(key, value)
+
+    drafts_section()
+
+    # Every tab, and every block of the Accident Report tab, is a fragment: changing a field
+    # reruns only the block it is in. The Accident Report tab keeps its values and files in a
+    # draft on the server as they are entered; saving hands the draft to a background sync that uploads
+    # the files and writes the row once Google can be reached.
+    tabs = st.tabs(["Accident Report", "Serious Injury Assessment Report", "RAF 1 Form", "SUPPLIER CLAIM FORM"])
+
+    with tabs[0]:
+        accident_report_tab()
+    with tabs[1]:
+        injury_assessment_tab()
+    with tabs[2]:
+        raf1_form_tab()
+    with tabs[3]:
+        supplier_claim_tab()
+
+
+# Accident Report Tab
+@st.fragment
+def accident_report_tab():
+    st.subheader("Accident Report")
+    accident_details_section()
+
+    # Vehicle Information (Dynamically adding vehicles)
+    st.markdown("### Vehicles Involved")
+    vehicles_section()
+
+    driver_info_section("Driver A")
+    driver_info_section("Driver B")
+
+    # Witness Information (Dynamically adding witnesses)
+    st.markdown("### Witness Information")
+    witnesses_section()
+
+    # File upload section for accident images, videos, and voice notes
+    st.markdown("### File Uploads")
+    evidence_section()
+
+    if st.button("Save Report"):
+        submit_accident_report()
+
+
+@st.fragment
+def accident_details_section():
+    # Accident information fields with validation
+    # Drafts are keyed by case number, so there is no default one for every new form to share
+    case_number = st.text_input("Case Number", placeholder="123456", key="accident_case_number")
+    if not case_number:
+        st.error("Case Number is required!")
+    else:
+        blocking = blocking_draft(case_number.strip())
+        if blocking and blocking["status"] is None:
+            st.warning(f"Someone else already has a draft for case {blocking['case_number']}; this form is not saved.")
+        elif blocking and blocking["status"] in (DRAFT, CONFLICT):
+            st.warning(f"You already have a draft for case {blocking['case_number']}. "
+                       "Open it from the drafts list to carry on with it; this form is not saved over it.")
+        elif blocking:
+            st.warning(f"Case {blocking['case_number']} was already saved; changes to it are not kept.")
+
+    accident_date = st.date_input("Accident Date", key="accident_date")
+    if not accident_date:
+        st.error("Accident Date is required!")
+
+    st.text_input("Road Name", key="accident_road_name")
+    st.time_input("Accident Time", key="accident_time")
+    st.text_input("Police Station", key="accident_police_station")
+    st.text_input("Police Reference Number", key="accident_police_reference_number")
+    st.number_input("Speed Limit", min_value=10, max_value=200, key="accident_speed_limit")
+    st.selectbox("Weather", ["Clear", "Rainy", "Foggy", "Snowy"], key="accident_weather")
+    st.selectbox("Road Condition", ["Good", "Wet", "Icy"], key="accident_road_condition")
+    autosave()
+
+
+@st.fragment
+def vehicles_section():
+    num_vehicles = st.number_input("Number of Vehicles", min_value=1, step=1, key="num_vehicles")
+    for i in range(num_vehicles):
+        vehicle_block(i)
+    autosave()
+
+
+@st.fragment
+def vehicle_block(i):
+    with st.expander(f"Vehicle {i+1} Details", expanded=True):
+        for field, label in zip(VEHICLE_FIELDS, VEHICLE_LABELS):
+            st.text_input(f"Vehicle {i+1} {label}", key=f"vehicle_{i}_{field}")
+    autosave()
+
+
+@st.fragment
+def witnesses_section():
+    num_witnesses = st.number_input("Number of Witnesses", min_value=0, step=1, key="num_witnesses")
+    for i in range(num_witnesses):
+        witness_block(i)
+    autosave()
+
+
+@st.fragment
+def witness_block(i):
+    with st.expander(f"Witness {i+1} Details", expanded=True):
+        for field, label in zip(WITNESS_FIELDS, WITNESS_LABELS):
+            st.text_input(f"Witness {i+1} {label}", key=f"witness_{i}_{field}")
+    autosave()
+
+
+@st.fragment
+def driver_info_section(driver_label):
+    def key(field):
+        return driver_key(driver_label, field)
+
+    st.markdown(f"### {driver_label} Information")
+    st.text_input(f"{driver_label} Name", key=key("name"))
+    st.text_input(f"{driver_label} ID", key=key("id"))
+    st.text_input(f"{driver_label} Injuries", key=key("injuries"))
+    st.text_input(f"{driver_label} License Number", key=key("license_number"))
+    st.date_input(f"{driver_label} License Date Issued", key=key("license_date_issued"))
+    st.text_input(f"{driver_label} License Endorsements (if any)", key=key("license_endorsements"))
+    st.text_input(f"{driver_label} Physical/Mental Defects (if any)", key=key("physical_mental_defects"))
+    st.text_input(f"{driver_label} Residential Address", key=key("residential_address"))
+    st.text_input(f"{driver_label} Work Address", key=key("work_address"))
+    if st.radio(f"{driver_label} Employment Status", ["Yes", "No"], key=key("employment_status")) == "Yes":
+        st.text_input(f"{driver_label} Company of Employment", key=key("company"))
+    if st.radio(f"{driver_label} Medical Aid", ["Yes", "No"], key=key("medical_aid")) == "Yes":
+        st.text_input(f"{driver_label} Medical Aid Company Name", key=key("medical_aid_company"))
+    if st.radio(f"{driver_label} Car Insurance", ["Yes", "No"], key=key("car_insurance")) == "Yes":
+        st.text_input(f"{driver_label} Insurance Company Name", key=key("insurance_company"))
+    st.radio(f"{driver_label} Under the Influence", ["Yes", "No"], key=key("under_influence"))
+
+    # Driver's license image, kept with the draft and uploaded with the other evidence files after saving
+    license_image = st.file_uploader(f"Upload {driver_label}'s License Image", type=['jpg', 'png'], key=key("license_image"))
+    autosave_media(f"{driver_label.lower()}_license", [license_image])
+    kept_files_note([f"{driver_label.lower()}_license"], key=key("remove_license_image"))
+
+
+@st.fragment
+def evidence_section():
+    accident_images = st.file_uploader("Upload accident scene photos (max 20)", type=['jpg', 'png'], accept_multiple_files=True, key=PHOTOS_KEY) or []
+    accident_video = st.file_uploader("Upload accident video (max 5 min)", type=['mp4'], key=VIDEO_KEY)
+    voice_notes = st.file_uploader("Upload voice notes (max 5 min each)", type=['mp3'], accept_multiple_files=True, key=VOICE_NOTES_KEY) or []
+
+    # Enforce the photo count and 5 minute limits as soon as files are picked
+    media_files = [(accident_video, "accident_video.mp4")] if accident_video is not None else []
+    media_files += [(note, f"voice_note_{i}.mp3") for i, note in enumerate(voice_notes)]
+    problems = check_media_limits(accident_images, media_files)
+    for problem in problems:
+        st.error(problem)
+
+    # Files within the limits are kept with the draft straight away
+    if not problems:
+        autosave_media("accident_image", accident_images)
+        autosave_media("accident_video", [accident_video])
+        autosave_media("voice_note", voice_notes)
+    kept_files_note(["accident_image", "accident_video", "voice_note"], key="remove_kept_evidence")
+
+
+def driver_info(driver_label):
+    """A driver's form values in DRIVER_FIELDS order, without the licence image URL the sync adds."""
+    state = st.session_state
+
+    def value(field, default=""):
+        return state.get(driver_key(driver_label, field), default)
+
+    info = []
+    for field in DRIVER_FIELDS[:-1]:
+        depends_on = DEPENDENT_DRIVER_FIELDS.get(field)
+        if depends_on and value(depends_on, "Yes") != "Yes":
+            info.append("N/A")
+        else:
+            info.append(value(field))
+    return info
+
+
+def report_from_form(case_number):
+    """The AccidentReports values of the form; drafts.accident_report_row adds the file URLs."""
+    state = st.session_state
+    accident_time = state.get("accident_time")
+    return {
+        "case_number": case_number,
+        "accident_date": state["accident_date"].strftime("%Y-%m-%d"),  # Format accident date
+        "num_vehicles": state.get("num_vehicles", 1),
+        "road_name": state.get("accident_road_name"),
+        "accident_time": accident_time.strftime("%H:%M") if accident_time else "",  # Format accident time
+        "police_station": state.get("accident_police_station"),
+        "police_reference_number": state.get("accident_police_reference_number"),
+        "speed_limit": state.get("accident_speed_limit"),
+        "weather": state.get("accident_weather"),
+        "road_condition": state.get("accident_road_condition"),
+        "vehicles": [[state.get(f"vehicle_{i}_{field}", "") for field in VEHICLE_FIELDS] for i in range(state.get("num_vehicles", 1))],
+        "driver_a": driver_info("Driver A"),
+        "driver_b": driver_info("Driver B"),
+        "witnesses": [[state.get(f"witness_{i}_{field}", "") for field in WITNESS_FIELDS] for i in range(state.get("num_witnesses", 0))],
+    }
+
+
+@traced("save.accident_report")
+def submit_accident_report():
+    """Validates the Accident Report tab and hands its draft to the background sync; no network calls."""
+    state = st.session_state
+
+    # Form Validation: Ensure required fields are not empty
+    if not state.get("accident_case_number") or not state.get("accident_date"):
+        st.error("Please fill in all required fields!")
+        return
+    case_number = autosave()
+    if case_number is None:
+        st.error("This case number was already saved, or someone else has a draft for it; see the warning under Case Number.")
+        return
+
+    drafts = get_draft_store()
+    files = drafts.media_files(case_number)
+    problems = check_media_limits([f for f, name in files if name.startswith("accident_image_")],
+                                  [(f, name) for f, name in files if not name.endswith(".jpg")])
+    if problems:
+        for problem in problems:
+            st.error(problem)
+        st.error("Please fix the file upload problems above before saving.")
+        return
+
+    try:
+        receipt = drafts.submit(case_number, report_from_form(case_number), draft_owner())
+        # The next case number typed starts a new draft
+        state.pop(DRAFT_KEY, None)
+        state["_draft_media"] = {}
+        st.query_params.pop(DRAFT_QUERY_PARAM, None)
+        st.success(f"Accident report saved on the server! (receipt {receipt[:8]}) "
+                   "Its files and row are sent to Google in the background as soon as there is a connection.")
+    except Exception as e:
+        st.error(f"Error saving accident report: {e}")
+
+
+# Serious Injury Assessment Report Tab
+@st.fragment
+def injury_assessment_tab():
+    st.subheader("Serious Injury Assessment Report")
+
+    # Typing in a form doesn't rerun anything; the fields are read when the form is submitted
+    with st.form("injury_assessment_form"):
+        # Add input fields specific to the Serious Injury Assessment Report
+        patient_name = st.text_input("Patient Name")
+        patient_id = st.text_input("Patient ID")
+        claim_number = st.text_input("Claim Number (if available)")
+        contact_number = st.text_input("Contact Number")
+        assessment_date = st.date_input("Assessment Date")
+        accident_date = st.date_input("Date of Accident")
+        medical_practitioner_name = st.text_input("Medical Practitioner Name")
+        practitioner_hpcsa_bhf = st.text_input("Practice Number (HPCSA and/or BHF)")
+        practitioner_contact = st.text_input("Medical Practitioner Contact Number")
+        practitioner_email = st.text_input("Medical Practitioner Email")
+
+        # Injury Details
+        injury_description = st.text_area("Injury Description")
+        injury_severity = st.selectbox("Injury Severity", ["Mild", "Moderate", "Severe"])
+
+        # Additional Assessment Fields
+        treatment_given = st.text_area("Medical Treatment Rendered (from date of accident to present)")
+        current_symptoms = st.text_area("Current Symptoms and Complaints")
+        diagnosis = st.text_area("Diagnosis")
+        clinical_studies = st.text_area("Clinical Studies (X-rays, MRI, etc.)")
+        medical_history = st.text_area("Medical History")
+        personal_history = st.text_area("Social and Personal History")
+        educational_occupational_history = st.text_area("Educational and Occupational History")
+        has_reached_mmi = st.selectbox("Has the Patient Reached Maximum Medical Improvement (MMI)?", ["Yes", "No"])
+
+        submitted = st.form_submit_button("Save Serious Injury Report")
+
+    # Save the report to Google Sheets
+    if submitted:
+        report_data = [
+            patient_name, patient_id, claim_number, contact_number, assessment_date.strftime("%Y-%m-%d"),
+            accident_date.strftime("%Y-%m-%d"), medical_practitioner_name, practitioner_hpcsa_bhf, practitioner_contact,
+            practitioner_email, injury_description, injury_severity, treatment_given, current_symptoms,
+            diagnosis, clinical_studies, medical_history, personal_history, educational_occupational_history,
+            has_reached_mmi
+        ]
+        try:
+            receipt = get_sheet_outbox().enqueue("InjuryAssessment", report_data)
+            st.success(f"Serious Injury Assessment Report saved successfully! (receipt {receipt[:8]})")
+        except Exception as e:
+            st.error(f"Error saving report: {e}")
+
+
+# RAF 1 Form Tab
+@st.fragment
+def raf1_form_tab():
+    st.subheader("RAF 1 Form")
+
+    with st.form("raf1_form"):
+        # Add fields relevant to RAF 1 Form (similar to Serious Injury Form)
+        form_fields = [
+            "Claimant Name", "Claimant ID", "Claim Number", "Date of Birth", "Residential Address", "Postal Address",
+            "Phone Number", "Email Address", "Occupation", "Employer Name", "Employer Address"
+        ]
+        raf_1_data = [st.text_input(field) for field in form_fields]
+        submitted = st.form_submit_button("Save RAF 1 Form")
+
+    # Save the form to Google Sheets
+    if submitted:
+        try:
+            receipt = get_sheet_outbox().enqueue("Claims", raf_1_data)
+            st.success(f"RAF 1 Form saved successfully! (receipt {receipt[:8]})")
+        except Exception as e:
+            st.error(f"Error saving RAF 1 Form: {e}")
+
+
+# Supplier Claim Form Tab
+@st.fragment
+def supplier_claim_tab():
+    st.subheader("SUPPLIER CLAIM FORM")
+
+    with st.form("supplier_claim_form"):
+        # Add fields relevant to Supplier Claim Form
+        supplier_name = st.text_input("Supplier Name")
+        supplier_contact = st.text_input("Supplier Contact Number")
+        supplier_email = st.text_input("Supplier Email Address")
+        claim_amount = st.number_input("Claim Amount", min_value=0.0)
+        claim_description = st.text_area("Claim Description")
+        submitted = st.form_submit_button("Save Supplier Claim")
+
+    # Save the form to Google Sheets
+    if submitted:
+        supplier_claim_data = [supplier_name, supplier_contact, supplier_email, claim_amount, claim_description]
+        try:
+            receipt = get_sheet_outbox().enqueue("SupplierClaims", supplier_claim_data)
+            st.success(f"Supplier Claim saved successfully! (receipt {receipt[:8]})")
+        except Exception as e:
+            st.error(f"Error saving Supplier Claim: {e}")
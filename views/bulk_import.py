@@ -0,0 +1,114 @@
+import os
+
+import pandas as pd
+import streamlit as st
+
+from bulk_import import (CHUNK_ROWS, DONE, FAILED, PAUSED, QUEUED, RUNNING, get_bulk_importer, job_fingerprint,
+                         map_columns, number_rows, read_chunks, read_headers, validate_chunk)
+from report_records import report_type_map
+from tracing import traced
+
+NOT_IN_FILE = "(not in the file)"
+
+# Rows of the file validated for the preview before an import is started
+PREVIEW_ROWS = 200
+
+# How often the job list refreshes while an import runs
+JOBS_REFRESH_SECONDS = 3
+
+
+@traced("page.bulk_import")
+def bulk_import_page():
+    st.title("Bulk Import")
+    st.caption("Import historical reports from a CSV or Excel file. Large files are imported in the background, "
+               f"{CHUNK_ROWS} rows at a time, and can be paused and resumed. "
+               "Files over the upload limit can be imported with `python -m bulk_import FILE --type TYPE`.")
+
+    report_type = st.selectbox("Report type", list(report_type_map))
+    source = st.file_uploader("CSV or Excel file", type=["csv", "xlsx"], key="bulk_import_file")
+    if source is not None:
+        import_form(report_type, source)
+
+    import_jobs()
+
+
+def import_form(report_type, source):
+    try:
+        headers = read_headers(source, source.name)
+    except Exception as e:
+        st.error(f"Error reading {source.name}: {e}")
+        return
+
+    # Columns named like a field are mapped to it; any mapping can be changed here
+    st.markdown("### Columns")
+    matched = map_columns(headers, report_type)
+    options = [NOT_IN_FILE] + headers
+    mapping = {}
+    columns = st.columns(2)
+    for i, field in enumerate(report_type_map[report_type]):
+        column = columns[i % 2].selectbox(field, options, index=options.index(matched.get(field, NOT_IN_FILE)),
+                                          key=f"bulk_import_map_{report_type}_{field}")
+        if column != NOT_IN_FILE:
+            mapping[field] = column
+    unused = [header for header in headers if header not in mapping.values()]
+    if unused:
+        st.caption(f"Not imported: {', '.join(unused)}")
+
+    required = report_type_map[report_type][0]
+    if required not in mapping:
+        st.error(f"Choose the column holding {required}; every row needs one.")
+        return
+
+    # Preview: the first rows, validated exactly as the import will
+    try:
+        preview = number_rows(next(read_chunks(source, source.name, PREVIEW_ROWS), pd.DataFrame(columns=headers)), 2)
+        rows, rejected = validate_chunk(preview, report_type, mapping)
+    except Exception as e:
+        st.error(f"Error reading {source.name}: {e}")
+        return
+    finally:
+        source.seek(0)
+    st.markdown("### Preview")
+    st.write(f"Of the first {len(preview)} rows, {len(rows)} would be imported and {len(rejected)} rejected.")
+    st.dataframe(rows.head(20), use_container_width=True)
+    if not rejected.empty:
+        st.dataframe(rejected[["row", "reason"]].head(20), use_container_width=True, hide_index=True)
+
+    if st.button("Start import"):
+        try:
+            # A second click, or the same file uploaded again with the same columns, finds the job already made
+            importer = get_bulk_importer()
+            job = importer.find(job_fingerprint(source, report_type, mapping))
+            if job is not None:
+                st.info(f"This file was already imported with these columns as import {job['job_id']} ({job['status']}).")
+            else:
+                job_id = importer.create(report_type, source, mapping)
+                st.success(f"Import {job_id} started. Its progress is shown below.")
+        except Exception as e:
+            st.error(f"Error starting the import: {e}")
+
+
+@st.fragment(run_every=JOBS_REFRESH_SECONDS)
+def import_jobs():
+    importer = get_bulk_importer()
+    jobs = importer.jobs()
+    if not jobs:
+        return
+
+    st.markdown("### Imports")
+    for job in jobs:
+        job_id, status = job["job_id"], job["status"]
+        st.markdown(f"**{job['source_name']}** → {job['worksheet']} · {status}")
+        st.write(f"{job['rows_read']} rows read, {job['rows_written']} written, {job['rows_rejected']} rejected")
+        if job["last_error"]:
+            st.caption(job["last_error"])
+        columns = st.columns(3)
+        if status in (QUEUED, RUNNING):
+            columns[0].button("Pause", key=f"bulk_import_pause_{job_id}", on_click=importer.pause, args=(job_id,))
+        if status in (PAUSED, FAILED):
+            columns[0].button("Resume", key=f"bulk_import_resume_{job_id}", on_click=importer.resume, args=(job_id,))
+        # The report is read only once the job has stopped, not on every refresh while it runs
+        if job["rows_rejected"] and status in (DONE, PAUSED, FAILED) and os.path.exists(job["rejected_path"]):
+            with open(job["rejected_path"], "rb") as rejected_file:
+                columns[1].download_button("Rejected rows (CSV)", rejected_file.read(), file_name=f"{job_id}-rejected.csv",
+                                           mime="text/csv", key=f"bulk_import_rejected_{job_id}")
@@ -0,0 +1,136 @@
+import datetime
+
+import streamlit as st
+
+from case_index import get_case_index
+from drive_uploads import upload_file_to_drive
+from google_services import get_google_services
+from notification_outbox import get_notification_outbox
+from sheet_outbox import get_sheet_outbox
+from tracing import traced
+
+# Case numbers offered at once by the typeahead case-number selectboxes
+CASE_NUMBER_MATCHES = 50
+
+
+def get_case_numbers():
+    """
+    Fetches the case numbers from the AccidentReports worksheet in Google Sheets.
+
+    Returns:
+        A list of case numbers.
+    """
+    try:
+        # Served from the shared case-number index (one read of the case-number column per data version)
+        return get_case_index().case_numbers()
+
+    except Exception as e:
+        st.error(f"Error fetching case numbers: {e}")
+        return []
+
+
+def case_number_selectbox(label, key):
+    """Selectbox of case numbers narrowed by a typeahead box, so it never lists thousands of entries."""
+    query = st.text_input(f"{label} (type to search)", key=f"{key}_query")
+    try:
+        matches = get_case_index().lookup(query, limit=CASE_NUMBER_MATCHES)
+    except Exception as e:
+        st.error(f"Error fetching case numbers: {e}")
+        matches = []
+    return st.selectbox(label, ["Select a case"] + matches, key=key)
+
+
+
+@traced("page.collaboration_sharing")
+def collaboration_sharing():
+    st.title('Collaboration and Sharing')
+    get_google_services().mark_rerun()
+
+    # Report rows are queued for the sheets; emails are queued and delivered by a background worker
+    sheet_outbox = get_sheet_outbox()
+    notification_outbox = get_notification_outbox()
+
+    # Subtabs for Medical Report, SAP Report, and Invite Collaborators
+    tab1, tab2, tab3 = st.tabs(["Medical Report Form", "SAP Report Form", "Invite Collaborators"])
+
+    # Medical Report Form tab
+    with tab1:
+        st.header("Medical Report Form")
+
+        # Input fields for Medical Report
+        hospital_name = st.text_input("Name of Hospital")
+        doctor_name = st.text_input("Name of Doctor")
+        hospital_location = st.text_input("Location of Hospital")
+        case_number_link = case_number_selectbox("Link to Case Number", key="medical_case_number_link")  # Unique key
+        medical_report_date = st.date_input("Date", value=datetime.date.today(), key="medical_report_date")  # Unique key for date
+        medical_report_upload = st.file_uploader("Upload Medical Report", type=["pdf", "docx"], key="medical_report_upload")
+
+        if st.button("Submit Medical Report", key="submit_medical_report"):
+            # Save Medical Report data to Google Sheets
+            medical_report_data = [hospital_name, doctor_name, hospital_location, case_number_link, str(medical_report_date)]
+            if medical_report_upload is not None:
+                file_url = upload_file_to_drive(medical_report_upload, f"medical_report_{hospital_name}.pdf")
+                medical_report_data.append(file_url)
+            else:
+                medical_report_data.append("No document uploaded")
+
+            # Queue medical report data for the MedicalReports sheet
+            receipt = sheet_outbox.enqueue("MedicalReports", medical_report_data)
+
+            st.success(f"Medical report submitted successfully! (receipt {receipt[:8]})")
+
+    # SAP Report Form tab
+    with tab2:
+        st.header("SAP Report Form")
+
+        # Input fields for SAP Report
+        police_station_name = st.text_input("Name of Police Station")
+        officer_name = st.text_input("Name of Officer")
+        police_station_location = st.text_input("Location of Police Station")
+        case_number_link = case_number_selectbox("Link to Case Number", key="sap_case_number_link")  # Unique key
+        sap_report_date = st.date_input("Date", value=datetime.date.today(), key="sap_report_date")  # Unique key for date
+        sap_report_upload = st.file_uploader("Upload SAP Report", type=["pdf", "docx"], key="sap_report_upload")
+
+        if st.button("Submit SAP Report", key="submit_sap_report"):
+            # Save SAP Report data to Google Sheets
+            sap_report_data = [police_station_name, officer_name, police_station_location, case_number_link, str(sap_report_date)]
+            if sap_report_upload is not None:
+                file_url = upload_file_to_drive(sap_report_upload, f"sap_report_{police_station_name}.pdf")
+                sap_report_data.append(file_url)
+            else:
+                sap_report_data.append("No document uploaded")
+
+            # Queue SAP report data for the SAPReports sheet
+            receipt = sheet_outbox.enqueue("SAPReports", sap_report_data)
+
+            st.success(f"SAP report submitted successfully! (receipt {receipt[:8]})")
+
+    # Invite Collaborators tab
+    with tab3:
+        st.header("Invite Collaborators")
+
+        # Existing invite collaborators section
+        emails = st.text_area('Enter email addresses separated by commas')
+        subject = st.text_input("Subject")
+        document_upload = st.file_uploader("Upload Document", type=["pdf", "docx", "xlsx"], key="collaborator_document_upload")
+        case_number_link = case_number_selectbox("Link to Case Number", key="collaborators_case_number_link")  # Unique key
+
+        if st.button('Send Invitations', key="send_invitations"):
+            # Logic to send invitations (email function, link document and case number, etc.)
+            if document_upload is not None:
+                file_url = upload_file_to_drive(document_upload, f"collaboration_document_{subject}.pdf")
+            else:
+                file_url = "No document uploaded"
+
+            # Queue the email with the document; the notification worker sends it in the background
+            content = f"Subject: {subject}\nLinked Case Number: {case_number_link}\nDocument: {file_url}"
+            recipients = [email.strip() for email in emails.split(",") if email.strip()]
+            notification_outbox.enqueue(recipients, subject, content, case_number=case_number_link)
+            st.success(f'Invitations queued for: {", ".join(recipients)}')
+
+        # Delivery status of the invitations sent for the linked case
+        if case_number_link:
+            invitations = notification_outbox.status_for_case(case_number_link)
+            if not invitations.empty:
+                st.caption(f"Invitations for case {case_number_link}")
+                st.dataframe(invitations, hide_index=True)
@@ -0,0 +1,69 @@
+import hmac
+
+import pandas as pd
+import streamlit as st
+
+from google_services import get_google_services
+from image_cache import get_image_cache
+from notification_outbox import get_notification_outbox
+from sheet_cache import get_worksheet_cache
+from sheet_outbox import get_sheet_outbox
+from tracing import get_tracer
+
+
+def diagnostics_page():
+    """Hidden admin page (open the app with ?page=diagnostics&token=...) with latency percentiles and API counters.
+
+    The page stays disabled until a [diagnostics] TOKEN is set in the secrets.
+    """
+    st.title("Diagnostics")
+    token = st.secrets.get("diagnostics", {}).get("TOKEN")
+    if not token:
+        st.error("The diagnostics page is disabled. Set [diagnostics] TOKEN in the secrets to enable it.")
+        return
+    if not hmac.compare_digest(st.query_params.get("token", "").encode(), str(token).encode()):
+        st.error("Add the diagnostics token to the URL (&token=...) to see this page.")
+        return
+
+    tracer = get_tracer()
+    services = get_google_services()
+    sheet_outbox = get_sheet_outbox()
+    notification_outbox = get_notification_outbox()
+    sheet_cache = get_worksheet_cache()
+    image_cache = get_image_cache()
+
+    st.subheader("Latency per operation (ms)")
+    st.dataframe(pd.DataFrame(tracer.summary()), hide_index=True)
+    st.subheader("Google API gateway")
+    st.dataframe(pd.DataFrame(services.gateway.stats()).T)
+    st.subheader("Queues and caches")
+    st.json({
+        "sheet_outbox": sheet_outbox.counts(),
+        "notification_outbox": notification_outbox.counts(),
+        "sheet_cache": {"hits": sheet_cache.hits, "misses": sheet_cache.misses},
+        "image_cache": {"hits": image_cache.hits, "misses": image_cache.misses},
+        "google_handles": services.stats(),
+    })
+    failed_outbox(sheet_outbox, notification_outbox)
+    if st.button("Export Prometheus metrics now"):
+        st.success(f"Metrics written to {tracer.export_prometheus()}")
+    st.code(tracer.prometheus_text(), language="text")
+
+
+def failed_outbox(sheet_outbox, notification_outbox):
+    """Rows and messages the outboxes gave up on; they stay here until they are retried."""
+    failed_rows, failed_messages = sheet_outbox.failed(), notification_outbox.failed()
+    st.subheader(f"Failed sheet writes ({len(failed_rows)})")
+    if failed_rows.empty:
+        st.write("None.")
+    else:
+        st.dataframe(failed_rows, hide_index=True)
+        if st.button("Retry failed sheet writes"):
+            st.success(f"{sheet_outbox.retry_failed()} rows queued again.")
+    st.subheader(f"Failed notifications ({len(failed_messages)})")
+    if failed_messages.empty:
+        st.write("None.")
+    else:
+        st.dataframe(failed_messages, hide_index=True)
+        if st.button("Retry failed notifications"):
+            st.success(f"{notification_outbox.retry_failed()} messages queued again.")
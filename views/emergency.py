@@ -0,0 +1,23 @@
+import streamlit as st
+
+from tracing import traced
+
+
+@traced("page.emergency_assistance_dashboard")
+def emergency_assistance_dashboard():
+    st.title("Emergency Assistance Dashboard")
+
+    st.subheader("Emergency Services")
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        if st.button('🚑 Call Ambulance'):
+            st.write("[Click here to call an ambulance](tel:+911)")
+
+    with col2:
+        if st.button('🚓 Call Police'):
+            st.write("[Click here to call the police](tel:+10111)")
+
+    with col3:
+        if st.button('🚗 Call Car Crash Service'):
+            st.write("[Click here to call car crash services](tel:+0800-123-456)")
@@ -0,0 +1,245 @@
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+import streamlit as st
+
+from google_services import get_google_services
+from local_store import get_local_store
+from pdf_export import export_reports_zip, render_report_pdf, safe_file_name
+from report_records import report_sheet_map, report_type_map, sql_field
+from report_search import DATE_COLUMNS, get_report_search
+from report_updates import EditConflict, get_report_updater
+from tracing import span, traced
+
+# Rows shown per page on the View Reports page
+PAGE_SIZE = 25
+
+# Columns shown in the View Reports grid; the rest of a record is loaded when it is opened
+SUMMARY_COLUMNS = {
+    "Accident Report": ['case_number', 'accident_date', 'accident_time', 'road_name', 'police_station', 'num_vehicles', 'weather', 'road_condition'],
+    "Serious Injury Assessment Report": ['patient_name', 'assessment_date', 'injury_severity', 'diagnosis'],
+    "RAF 1 Form": ['claimant_name', 'claimant_id', 'claim_date', 'claimant_email'],
+    "SUPPLIER CLAIM FORM": ['supplier_name', 'practice_number', 'supplier_email', 'total_amount_claimed'],
+}
+
+
+@traced("page.view_reports")
+def view_reports():
+    st.title("View All Reports")
+    get_google_services().mark_rerun()
+
+    # Local SQLite mirror of the worksheets, with full-text, ID and date indexes over it
+    local_store = get_local_store()
+    report_search = get_report_search()
+
+    # Create tabs for report types
+    selected_tab = st.selectbox("Select Report Type", ["Accident Report", "Serious Injury Assessment Report", "RAF 1 Form", "SUPPLIER CLAIM FORM"])
+
+    # Get headers for selected report type
+    expected_headers = report_type_map.get(selected_tab, [])
+    sheet_name = report_sheet_map[selected_tab]
+
+    try:
+        # Before the local mirror exists, show pages read straight from the sheet while it loads in the background
+        if not local_store.is_mirrored(sheet_name):
+            local_store.sync_in_background(sheet_name)
+            browse_sheet_directly(sheet_name, selected_tab, expected_headers)
+            return
+
+        # Query the local mirror of the selected sheet instead of downloading it (values are stored as text)
+        columns = local_store.columns(sheet_name)
+
+        if local_store.count(sheet_name):
+            # Ensure the expected headers are present in the mirrored sheet
+            if expected_headers and expected_headers[0] in columns:
+                search_column = expected_headers[0]
+
+                # Search every column by word/prefix, look up an exact ID and filter by date
+                search_term = st.text_input("Search all fields")
+                col1, col2 = st.columns(2)
+                exact_id = col1.text_input(f"Exact {search_column}")
+                date_column = next((c for c in DATE_COLUMNS if c in columns), None)
+                date_range = col2.date_input(f"{date_column} between", value=()) if date_column else ()
+                conditions = []
+                if "driver_a_info" in columns and st.checkbox("Only accidents where either driver was under the influence"):
+                    conditions.append(f"({sql_field('driver_a_info', 'under_influence')} = 'Yes'"
+                                      f" OR {sql_field('driver_b_info', 'under_influence')} = 'Yes')")
+                filters = dict(
+                    conditions=conditions,
+                    text=search_term,
+                    date_column=date_column,
+                    date_from=date_range[0] if len(date_range) > 0 else None,
+                    date_to=date_range[1] if len(date_range) > 1 else None,
+                    exact={search_column: exact_id},
+                )
+
+                # Results come back one page at a time, with only the summary columns
+                total = report_search.count(sheet_name, **filters)
+                page_count = max(1, -(-total // PAGE_SIZE))
+                page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1,
+                                       key=f"report_page_{sheet_name}_{total}_{hash(repr(filters))}")  # back to page 1 when the results change
+                df = report_search.page(sheet_name, page=page, page_size=PAGE_SIZE, columns=summary_columns(selected_tab, columns), **filters)
+
+                # Display the data
+                st.caption(f"{total} matching {selected_tab}s")
+                export_reports_section(sheet_name, selected_tab, search_column, filters, total)
+                show_report_page(df, selected_tab, search_column, lambda row: local_store.record(sheet_name, row))
+            else:
+                st.warning(f"Expected column '{expected_headers[0]}' not found in the data.")
+        else:
+            st.warning(f"No {selected_tab} data found.")
+
+    except TypeError as te:
+        st.error(f"TypeError encountered: {te}")
+    except Exception as e:
+        st.error(f"Error fetching reports: {e}")
+
+
+def summary_columns(report_type, columns):
+    """Columns shown in the report grid: `_row` plus the report's summary fields that exist in the sheet."""
+    wanted = [c for c in SUMMARY_COLUMNS.get(report_type, []) if c in columns]
+    return ["_row"] + (wanted or columns)
+
+
+def browse_sheet_directly(sheet_name, report_type, expected_headers):
+    """Pages through a sheet with range reads while its local mirror is still being built."""
+    local_store = get_local_store()
+    st.info("Search will be available as soon as the local copy of this sheet has finished loading.")
+    search_column = expected_headers[0] if expected_headers else None
+    page = st.number_input("Page", min_value=1, value=1, key=f"direct_page_{sheet_name}")
+    columns = SUMMARY_COLUMNS.get(report_type) or None
+    df = local_store.sheet_page(sheet_name, page, PAGE_SIZE, columns=columns)
+    if df.empty:
+        st.warning(f"No {report_type} data found.")
+        return
+    show_report_page(df, report_type, search_column, lambda row: local_store.sheet_record(sheet_name, row))
+
+
+def show_report_page(df, report_type, search_column, load_record):
+    """Shows one page of report summaries; the full record is only loaded once a row is opened."""
+    st.write(f"All {report_type}s", df.drop(columns=["_row"]))
+
+    # Allow user to select a specific report to edit
+    if not df.empty:
+        labels = df[search_column].astype(str) if search_column in df.columns else df["_row"].astype(str)
+        labels = dict(zip(df["_row"], labels))
+        selected_row = st.selectbox(f"Select a {report_type} to edit", list(labels), format_func=lambda row: labels[row])
+
+        if selected_row:
+            # Load the full record (media URLs and packed details included) for the selected row
+            report_to_edit = load_record(selected_row)
+
+            if report_to_edit:
+                edit_report(report_to_edit, df, report_type, row_number=selected_row)
+            else:
+                st.warning(f"No matching {report_type} found for the selected report.")
+    else:
+        st.warning(f"No {report_type} data found after filtering.")
+
+
+
+
+
+
+
+
+def edit_report(report_data, df, report_type, row_number=None):
+    st.subheader(f"Edit {report_type}")
+    updated_values = {}
+
+    # Editing form for Accident Report
+    if report_type == "Accident Report":
+        case_number = st.text_input("Case Number", report_data['case_number'])
+        accident_date = st.date_input("Accident Date", pd.to_datetime(report_data['accident_date']))
+        num_vehicles = st.number_input("Number of Vehicles", min_value=1, max_value=10, value=int(report_data['num_vehicles']))
+        updated_values = {
+            'case_number': case_number,
+            'accident_date': accident_date.strftime("%Y-%m-%d"),
+            'num_vehicles': num_vehicles,
+        }
+
+        # Photo gallery from the thumbnails (reports saved before thumbnails existed show the photos)
+        photos = str(report_data.get('accident_image_thumbnail_urls') or report_data.get('accident_image_urls') or '')
+        photo_urls = [url for url in photos.split(', ') if url.startswith('http')]
+        if photo_urls:
+            st.image(photo_urls, width=160)
+        # Add the rest of the fields here...
+    else:
+        # Plain text fields for the other report types
+        for field in report_type_map.get(report_type, []):
+            if field in report_data:
+                updated_values[field] = st.text_input(field.replace('_', ' ').title(), str(report_data[field]), key=f"edit_{field}")
+
+    # Save changes button
+    if st.button("Save Changes"):
+        # In-place report edits: row locator plus optimistic-concurrency batch updates
+        report_updater = get_report_updater()
+        sheet_name = report_sheet_map[report_type]
+        # Write only the changed cells back to the sheet in one batch update
+        try:
+            if row_number is None:
+                # Find the report's sheet row from its primary key
+                row_number = report_updater.locate(sheet_name, report_data.get(report_updater.primary_key(sheet_name)))
+            if row_number is None:
+                st.error("This report can't be saved because its row in the sheet could not be found.")
+            else:
+                changed = report_updater.update(sheet_name, row_number, report_data, updated_values)
+                if changed:
+                    st.success(f"{report_type} updated successfully!")
+                else:
+                    st.info("No changes to save.")
+        except EditConflict as e:
+            st.error(f"{e} Reload the report and make your changes again.")
+        except Exception as e:
+            st.error(f"Error updating {report_type}: {e}")
+
+    # PDF Generation
+    if st.button("Generate PDF"):
+        pdf_path = generate_and_download_pdf(report_data, report_type)
+        with open(pdf_path, "rb") as file:
+            st.download_button(f"Download {report_type} PDF", data=file, file_name=os.path.basename(pdf_path))
+
+@traced("pdf.generate_and_download_pdf")
+def generate_and_download_pdf(report_data, report_type):
+    # Each PDF gets its own temp directory, so concurrent users never overwrite each other's file
+    pdf_output = os.path.join(tempfile.mkdtemp(prefix="raf_pdf_"), f"{safe_file_name(report_type)}_report.pdf")
+    return render_report_pdf(report_data, report_type, pdf_output)
+
+
+def export_reports_section(sheet_name, report_type, search_column, filters, total):
+    """Bulk export: every report matching the current filters as PDFs in one ZIP."""
+    with st.expander(f"Export all {total} matching {report_type}s as PDFs"):
+        if not st.button("Build ZIP", disabled=not total):
+            return
+        report_search = get_report_search()
+
+        def reports():
+            # Records are read from the mirror a chunk at a time while the pool renders earlier ones
+            for chunk in report_search.iter_chunks(sheet_name, **filters):
+                for record in chunk.to_dict("records"):
+                    row = record.pop("_row")
+                    yield f"{row}_{safe_file_name(record.get(search_column, ''))}", record
+
+        progress = st.progress(0.0, text=f"Rendering 0 of {total} PDFs")
+        zip_dir = tempfile.mkdtemp(prefix="raf_zip_")
+        zip_path = os.path.join(zip_dir, "reports.zip")
+        try:
+            with span("pdf.export_zip") as export_span:
+                errors = export_reports_zip(
+                    reports(), report_type, zip_path,
+                    on_progress=lambda done: progress.progress(min(done / total, 1.0), text=f"Rendering {done} of {total} PDFs"),
+                )
+                export_span.rows, export_span.bytes = total, os.path.getsize(zip_path)
+            with open(zip_path, "rb") as file:
+                zip_bytes = file.read()
+        except Exception as e:
+            st.error(f"Error exporting reports: {e}")
+            return
+        finally:
+            shutil.rmtree(zip_dir, ignore_errors=True)
+
+        if errors:
+            st.warning(f"{len(errors)} reports could not be rendered: " + "; ".join(f"{name} ({error})" for name, error in list(errors.items())[:10]))
+        st.download_button("Download ZIP", data=zip_bytes, file_name=f"{safe_file_name(report_type)}_reports.zip", mime="application/zip")